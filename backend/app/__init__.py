@@ -15,6 +15,21 @@ def create_app():
     db.init_app(app)
     from .extensions import login_manager
     login_manager.init_app(app)
+    from . import metrics, enrollment_index, ratelimit, exports, analytics, jobs
+    from .attendance import registry, writebehind, autoclose, timetable, live, qr, summaries
+    metrics.init_app(app)
+    ratelimit.init_app(app)
+    registry.init_app(app)
+    enrollment_index.init_app(app)
+    writebehind.init_app(app)
+    live.init_app(app)
+    qr.init_app(app)
+    autoclose.init_app(app)
+    timetable.init_app(app)
+    summaries.init_app(app)
+    exports.init_app(app)
+    analytics.init_app(app)
+    jobs.init_app(app)
 
     # CSRF: ensure token exists and validate unsafe methods
     @app.context_processor
@@ -45,9 +60,10 @@ def create_app():
                 flash('Invalid CSRF token.', 'danger')
                 return redirect(url_for('index'))
 
-    # Ensure tables exist for MVP (no migrations)
+    # Ensure tables exist for MVP (no migrations); summary tables added since are backfilled
     with app.app_context():
         db.create_all()
+        summaries.backfill_summaries()
 
     from .models import User
     @login_manager.user_loader
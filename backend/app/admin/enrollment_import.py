@@ -0,0 +1,361 @@
+"""Set-based bulk enrollment import (admin CSV upload).
+
+Rows are parsed first, then everything they reference is resolved with a handful of IN
+queries (sections, users by email, taken usernames, existing enrollments) and the new
+users and enrollments are written with bulk INSERTs, so the cost no longer grows by
+several queries per row.
+
+Students created for unknown emails are pending (unapproved) and all share one password
+hash computed once per process, instead of running the password KDF for every row.
+
+Large uploads go through import_enrollments_stream instead: the file is decoded line by
+line as it is read and handled CHUNK_ROWS rows at a time with a commit per chunk, so memory and
+lock time are bounded by the chunk rather than the file. Only the first
+MAX_REPORTED_ERRORS (see app/admin/import_utils.py) error messages are kept; the rest are only
+counted. enqueue_upload runs the same streamed import as a background job (see app/jobs.py), reporting bytes read as
+progress and the tallies as the partial result.
+
+sync_enrollments treats the file as the complete roster of every section it names: students
+listed but not enrolled are added and enrolled students not listed are removed, as one
+bulk INSERT and one bulk DELETE in a single transaction (or only counted, with dry_run).
+"""
+import csv
+import os
+import tempfile
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import select, insert, delete, or_
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.security import generate_password_hash
+
+from app.admin.import_utils import chunks, report_error
+from app.enrollment_index import enrollments_changed
+from app.extensions import db
+from app.jobs import job, enqueue
+from app.models import User, Section, Enrollment
+
+CHUNK_ROWS = 5000
+PLACEHOLDER_PASSWORD = 'changeme'
+_USERNAME_MAX = 30
+
+
+@lru_cache(maxsize=1)
+def placeholder_password_hash() -> str:
+    return generate_password_hash(PLACEHOLDER_PASSWORD)
+
+
+def _is_header(row) -> bool:
+    low = [c.strip().lower() for c in row]
+    return 'email' in low or 'username' in low
+
+
+def parse_rows(rows: Iterable[Sequence[str]], section_override_id: Optional[int], results: Dict,
+               first_line: int = 1) -> List[tuple]:
+    """Validate raw CSV rows into (line_no, email, username, section_id); problems go to results['errors']."""
+    parsed = []
+    for line_no, row in enumerate(rows, start=first_line):
+        if not row or (len(row) == 1 and row[0].strip() == ''):
+            continue
+        if line_no == 1 and _is_header(row):
+            continue
+
+        cols = [c.strip() for c in row]
+        email = cols[0] if len(cols) > 0 else ''
+        username = cols[1] if len(cols) > 1 else ''
+        section_id = section_override_id
+        if section_id is None and len(cols) > 2 and cols[2]:
+            try:
+                section_id = int(cols[2])
+            except ValueError:
+                report_error(results, f'Line {line_no}: invalid section_id value')
+                continue
+
+        if not section_id:
+            report_error(results, f'Line {line_no}: missing section_id and no override selected')
+            continue
+
+        if not email or '@' not in email:
+            report_error(results, f'Line {line_no}: invalid email')
+            continue
+
+        parsed.append((line_no, email.lower(), username, section_id))
+    return parsed
+
+
+def _existing_sections(section_ids) -> set:
+    found = set()
+    for chunk in chunks(section_ids):
+        found.update(db.session.execute(select(Section.id).where(Section.id.in_(chunk))).scalars())
+    return found
+
+
+def _users_by_email(emails) -> Dict[str, tuple]:
+    users = {}
+    for chunk in chunks(emails):
+        for user_id, email, role in db.session.execute(
+                select(User.id, User.email, User.role).where(User.email.in_(chunk))):
+            users[email] = (user_id, role)
+    return users
+
+
+def _taken_usernames(bases: Sequence[str]) -> set:
+    """Existing usernames that could collide with the given bases or their numbered variants.
+
+    Variants are needed for a base that is already taken and for bases that share a
+    prefix within the batch, since all but the first of those get numbered too.
+    """
+    taken = set()
+    for chunk in chunks(set(bases)):
+        taken.update(db.session.execute(select(User.username).where(User.username.in_(chunk))).scalars())
+    prefix_counts = Counter(b[:_USERNAME_MAX - 3] for b in bases)
+    prefixes = sorted({b[:_USERNAME_MAX - 3] for b in bases
+                       if b in taken or prefix_counts[b[:_USERNAME_MAX - 3]] > 1})
+    for chunk in chunks(prefixes, 100):
+        taken.update(db.session.execute(
+            select(User.username).where(or_(*[User.username.startswith(p, autoescape=True) for p in chunk]))
+        ).scalars())
+    return taken
+
+
+def _unique_username(base: str, taken: set) -> str:
+    candidate = base
+    suffix = 1
+    while candidate in taken:
+        # ensure stays under 30 chars
+        candidate = f"{base[:_USERNAME_MAX - 3]}{suffix:02d}"
+        suffix += 1
+    taken.add(candidate)
+    return candidate
+
+
+def _create_students(emails_and_names: Dict[str, str]) -> Dict[str, int]:
+    """Bulk-insert pending students for {email: username hint}; return {email: new user id}."""
+    bases = {email: ((hint or email.split('@')[0]).strip()[:_USERNAME_MAX] or 'student')
+             for email, hint in emails_and_names.items()}
+    taken = _taken_usernames(list(bases.values()))
+    password = placeholder_password_hash()
+    rows = [{'username': _unique_username(base, taken), 'email': email, 'password': password,
+             'role': 'student', 'is_approved': False} for email, base in bases.items()]
+    created = {}
+    for chunk in chunks(rows):
+        for user_id, email in db.session.execute(insert(User).returning(User.id, User.email), chunk):
+            created[email] = user_id
+    return created
+
+
+def _existing_enrollments(student_ids, section_ids) -> set:
+    pairs = set()
+    for chunk in chunks(student_ids):
+        pairs.update(db.session.execute(
+            select(Enrollment.section_id, Enrollment.student_id)
+            .where(Enrollment.student_id.in_(chunk), Enrollment.section_id.in_(section_ids))).all())
+    return pairs
+
+
+def apply_rows(parsed: List[tuple], create_missing: bool, results: Dict) -> int:
+    """Resolve and write one batch of parsed rows, updating results; return enrollments added. Does not commit."""
+    if not parsed:
+        return 0
+    sections = _existing_sections({r[3] for r in parsed})
+    users = _users_by_email({r[1] for r in parsed})
+
+    to_create = {}
+    for line_no, email, username, section_id in parsed:
+        if section_id in sections and email not in users and create_missing:
+            to_create.setdefault(email, username)
+    if to_create:
+        for email, user_id in _create_students(to_create).items():
+            users[email] = (user_id, 'student')
+        results['created_pending'] += len(to_create)
+
+    student_ids = {user_id for user_id, role in users.values() if role == 'student'}
+    enrolled = _existing_enrollments(student_ids, sections) if student_ids and sections else set()
+    new_rows = []
+    for line_no, email, username, section_id in parsed:
+        if section_id not in sections:
+            report_error(results, f'Line {line_no}: section {section_id} not found')
+            continue
+        if email not in users:
+            report_error(results, f'Line {line_no}: user not found and create-missing disabled')
+            continue
+        user_id, role = users[email]
+        if role != 'student':
+            report_error(results, f'Line {line_no}: user role must be student (found {role})')
+            continue
+        if (section_id, user_id) in enrolled:
+            results['duplicates'] += 1
+            continue
+        enrolled.add((section_id, user_id))
+        new_rows.append({'section_id': section_id, 'student_id': user_id})
+
+    for chunk in chunks(new_rows):
+        db.session.execute(insert(Enrollment), chunk)
+    results['enrolled'] += len(new_rows)
+    return len(new_rows)
+
+
+def new_results() -> Dict:
+    return {
+        'enrolled': 0,
+        'duplicates': 0,
+        'created_pending': 0,
+        'errors': [],
+        'errors_omitted': 0
+    }
+
+
+def import_enrollments(rows: Iterable[Sequence[str]], section_override_id: Optional[int],
+                       create_missing: bool) -> Dict:
+    """Enroll students from CSV rows (email, username optional, section_id optional). Does not commit."""
+    results = new_results()
+    apply_rows(parse_rows(rows, section_override_id, results), create_missing, results)
+    return results
+
+
+def decoded_lines(stream: BinaryIO) -> Iterator[str]:
+    """Decode the upload one line at a time (UTF-8, optional BOM), so a bad byte is reported at its own line."""
+    encoding = 'utf-8-sig'
+    for raw in stream:
+        yield raw.decode(encoding)
+        encoding = 'utf-8'
+
+
+def _read_chunk(reader, n: int, results: Dict, first_line: int):
+    """Return (up to n rows, whether the file can still be read)."""
+    rows = []
+    try:
+        for row in islice(reader, n):
+            rows.append(row)
+    except (UnicodeDecodeError, csv.Error) as e:
+        report_error(results, f'Line {first_line + len(rows)}: could not read file ({e}); stopped here')
+        return rows, False
+    return rows, True
+
+
+def import_enrollments_stream(stream: BinaryIO, section_override_id: Optional[int], create_missing: bool,
+                              chunk_rows: int = CHUNK_ROWS, on_chunk: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Enroll students from a binary CSV stream, committing after every chunk_rows rows.
+
+    Tallies carry across chunks (on_chunk, if given, sees them after each chunk). A chunk
+    that fails to save is rolled back and reported; chunks before it stay committed and the
+    import carries on with the next one.
+    """
+    results = new_results()
+    reader = csv.reader(decoded_lines(stream))
+    line_no = 1
+    readable = True
+    while readable:
+        rows, readable = _read_chunk(reader, chunk_rows, results, line_no)
+        if not rows:
+            break
+        first_line, line_no = line_no, line_no + len(rows)
+        saved = {key: results[key] for key in ('enrolled', 'duplicates', 'created_pending')}
+        try:
+            if apply_rows(parse_rows(rows, section_override_id, results, first_line), create_missing, results):
+                enrollments_changed()
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            results.update(saved)
+            report_error(results, f'Lines {first_line}-{line_no - 1}: not saved ({e.__class__.__name__})')
+        if on_chunk is not None:
+            on_chunk(results)
+    return results
+
+
+def sync_enrollments(rows: Iterable[Sequence[str]], section_override_id: Optional[int], create_missing: bool,
+                     dry_run: bool = False) -> Dict:
+    """Make the enrollments of every section in the file match the file exactly. Does not commit.
+
+    With dry_run nothing is written: students that would be created are counted, and their
+    enrollments are counted as additions. A file with any unreadable or invalid row is only
+    previewed as a dry run, since the rows it is missing would otherwise turn into removals.
+    """
+    results = new_results()
+    results.update({'mode': 'sync', 'dry_run': dry_run, 'removed': 0, 'unchanged': 0, 'sections': []})
+    try:
+        parsed = parse_rows(list(rows), section_override_id, results)
+    except (UnicodeDecodeError, csv.Error) as e:
+        report_error(results, f'Could not read file ({e}); nothing was changed')
+        return results
+    sections = _existing_sections({r[3] for r in parsed})
+    users = _users_by_email({r[1] for r in parsed})
+
+    desired = set()
+    to_create = {}
+    for line_no, email, username, section_id in parsed:
+        if section_id not in sections:
+            report_error(results, f'Line {line_no}: section {section_id} not found')
+        elif email in users:
+            user_id, role = users[email]
+            if role != 'student':
+                report_error(results, f'Line {line_no}: user role must be student (found {role})')
+            else:
+                desired.add((section_id, user_id))
+        elif create_missing:
+            to_create.setdefault(email, username)
+            desired.add((section_id, email))
+        else:
+            report_error(results, f'Line {line_no}: user not found and create-missing disabled')
+    if results['errors'] and not dry_run:
+        dry_run = results['dry_run'] = True
+        report_error(results, 'Sync not applied because of the errors above; nothing was changed')
+    results['created_pending'] = len(to_create)
+    if to_create and not dry_run:
+        created = _create_students(to_create)
+        desired = {(sec, created.get(stu, stu)) for sec, stu in desired}
+
+    current = {}
+    for chunk in chunks(sections):
+        for enrollment_id, section_id, student_id in db.session.execute(
+                select(Enrollment.id, Enrollment.section_id, Enrollment.student_id)
+                .where(Enrollment.section_id.in_(chunk))):
+            current[(section_id, student_id)] = enrollment_id
+    adds = desired - current.keys()
+    removals = [enrollment_id for key, enrollment_id in current.items() if key not in desired]
+    results['enrolled'] = len(adds)
+    results['removed'] = len(removals)
+    results['unchanged'] = len(desired) - len(adds)
+
+    per_section = {sec: {'section_id': sec, 'added': 0, 'removed': 0, 'unchanged': 0} for sec in sorted(sections)}
+    for sec, _ in adds:
+        per_section[sec]['added'] += 1
+    for sec, _ in current.keys() - desired:
+        per_section[sec]['removed'] += 1
+    for sec, _ in desired & current.keys():
+        per_section[sec]['unchanged'] += 1
+    results['sections'] = list(per_section.values())
+
+    if not dry_run:
+        for chunk in chunks(sorted(adds)):
+            db.session.execute(insert(Enrollment), [{'section_id': sec, 'student_id': stu} for sec, stu in chunk])
+        for chunk in chunks(removals):
+            db.session.execute(delete(Enrollment).where(Enrollment.id.in_(chunk)))
+    return results
+
+
+@job('enrollment_upload')
+def enrollment_upload_job(ctx, path: str, section_id: Optional[int], create_missing: bool,
+                          chunk_rows: int = CHUNK_ROWS) -> Dict:
+    """Background variant of the upload: import the spooled file at path, then delete it."""
+    try:
+        with open(path, 'rb') as fh:
+            total = os.fstat(fh.fileno()).st_size
+            return import_enrollments_stream(fh, section_id, create_missing, chunk_rows,
+                                             on_chunk=lambda results: ctx.progress(fh.tell(), total, results))
+    finally:
+        os.unlink(path)
+
+
+def enqueue_upload(upload, section_override_id: Optional[int], create_missing: bool, chunk_rows: int,
+                   spool_dir: Optional[str] = None, user_id: Optional[int] = None) -> int:
+    """Spool an uploaded file to disk and start an enrollment_upload job for it; return the job id."""
+    fd, path = tempfile.mkstemp(prefix='enrollments-', suffix='.csv', dir=spool_dir)
+    with os.fdopen(fd, 'wb') as out:
+        upload.save(out)
+    return enqueue('enrollment_upload', {'path': path, 'section_id': section_override_id,
+                                         'create_missing': create_missing, 'chunk_rows': chunk_rows},
+                   user_id=user_id)
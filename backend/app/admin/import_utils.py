@@ -0,0 +1,21 @@
+"""Helpers shared by the admin CSV imports (enrollment_import and user_import)."""
+from typing import Dict, Sequence
+
+# Values per IN (...) lookup, kept well under the bound-parameter limits of SQLite and Postgres
+IN_CHUNK = 500
+# Error messages kept in an import's results; any further errors are only counted in errors_omitted
+MAX_REPORTED_ERRORS = 500
+
+
+def chunks(values: Sequence, size: int = IN_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def report_error(results: Dict, message: str):
+    """Append message to results['errors'], or count it once MAX_REPORTED_ERRORS are kept."""
+    if len(results['errors']) < MAX_REPORTED_ERRORS:
+        results['errors'].append(message)
+    else:
+        results['errors_omitted'] += 1
@@ -1,9 +1,21 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.extensions import db
-from app.models import User, Department, Course, Section, Enrollment
+from app.models import User, Department, Course, Section, Enrollment, Job
+from app.enrollment_index import enrollments_changed
+from app.admin.enrollment_import import (import_enrollments, import_enrollments_stream, enqueue_upload,
+                                         sync_enrollments, decoded_lines)
+from app.admin.user_import import (import_users, enqueue_user_import, supplied_password_count,
+                                   UNSET_PASSWORD, ROLES)
+from app.auth.tokens import make_set_password_token
+from app.exports import stream_rows, csv_response
+from app.jobs import job_info
+from app.attendance.summaries import section_deleted, student_deleted
+from app.metrics import get_metrics
+from app.pagination import keyset_page
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 import io, csv
-from werkzeug.security import generate_password_hash
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -14,6 +26,59 @@ def _ensure_admin():
         return redirect(url_for('auth.login'))
     return None
 
+def _int_arg(name):
+    return request.args.get(name, type=int)
+
+def _pager(endpoint, page, filters=None):
+    """Next/first page links for a keyset page, keeping the active filters."""
+    active = {k: v for k, v in (filters or {}).items() if v}
+    return {
+        'next_url': url_for(endpoint, after=page.next_after, **active) if page.next_after else None,
+        'first_url': url_for(endpoint, **active) if _int_arg('after') else None,
+    }
+
+def _pending_users_page():
+    return keyset_page(User.query.filter_by(is_approved=False), User.id, _int_arg('after'))
+
+# The course and section catalogues are too large for page-wide dropdowns: filter dropdowns only list
+# the courses of the chosen department and the sections of the chosen course, and forms take codes/emails
+def _course_choices(department_id, selected_id=None):
+    if department_id:
+        return Course.query.filter_by(department_id=department_id).order_by(Course.code).all()
+    return [c for c in [db.session.get(Course, selected_id)] if c] if selected_id else []
+
+def _section_choices(course_id, selected_id=None):
+    if course_id:
+        return (Section.query.options(joinedload(Section.course))
+                .filter_by(course_id=course_id).order_by(Section.section_code).all())
+    return [s for s in [db.session.get(Section, selected_id)] if s] if selected_id else []
+
+def _form_course():
+    course_id = request.form.get('course_id', type=int)
+    if course_id:
+        return db.session.get(Course, course_id)
+    code = request.form.get('course_code', '').strip().upper()
+    return Course.query.filter_by(code=code).first() if code else None
+
+def _form_section():
+    """Section picked by id, or typed as course code + section code. None if not given or not found."""
+    section_id = request.form.get('section_id', type=int)
+    if section_id:
+        return db.session.get(Section, section_id)
+    course_code = request.form.get('course_code', '').strip().upper()
+    section_code = request.form.get('section_code', '').strip()
+    if not course_code or not section_code:
+        return None
+    return (Section.query.join(Course, Course.id == Section.course_id)
+            .filter(Course.code == course_code, Section.section_code == section_code).first())
+
+def _form_user(id_field, email_field, role):
+    user_id = request.form.get(id_field, type=int)
+    if user_id:
+        return db.session.get(User, user_id)
+    email = request.form.get(email_field, '').strip().lower()
+    return User.query.filter_by(email=email, role=role).first() if email else None
+
 # -------- Dashboard & Approvals --------
 @admin_bp.route('/', endpoint='admin_dashboard')
 @login_required
@@ -21,8 +86,9 @@ def admin_dashboard():
     guard = _ensure_admin()
     if guard:
         return guard
-    pending_users = User.query.filter_by(is_approved=False).all()
-    return render_template('admin_dashboard.html', pending_users=pending_users)
+    page = _pending_users_page()
+    return render_template('admin_dashboard.html', pending_users=page.items,
+                           more_pending=page.next_after is not None)
 
 @admin_bp.route('/users/approvals', methods=['GET'], endpoint='users_approvals')
 @login_required
@@ -30,8 +96,58 @@ def users_approvals():
     guard = _ensure_admin()
     if guard:
         return guard
-    pending_users = User.query.filter_by(is_approved=False).all()
-    return render_template('admin_users_approvals.html', pending_users=pending_users)
+    page = _pending_users_page()
+    return render_template('admin_users_approvals.html', pending_users=page.items,
+                           **_pager('admin.users_approvals', page))
+
+@admin_bp.route('/users/import', methods=['GET', 'POST'], endpoint='import_users')
+@login_required
+def import_users_view():
+    guard = _ensure_admin()
+    if guard:
+        return guard
+    if request.method == 'GET':
+        return render_template('admin_users_import.html', result=None, roles=ROLES)
+
+    file = request.files.get('csv_file') or request.files.get('file')
+    if not file or file.filename == '':
+        flash('Please select a CSV file.', 'danger')
+        return redirect(url_for('admin.import_users'))
+    try:
+        text = file.read().decode('utf-8-sig')
+    except Exception as e:
+        flash(f'Could not read file: {e}', 'danger')
+        return redirect(url_for('admin.import_users'))
+
+    hash_workers = current_app.config.get('PASSWORD_HASH_WORKERS') or None
+    # Hashing many supplied passwords takes a while: do it in a background job rather than the request
+    if (request.form.get('background') or supplied_password_count(csv.reader(io.StringIO(text)))
+            > current_app.config.get('USER_IMPORT_INLINE_PASSWORDS', 200)):
+        job_id = enqueue_user_import(text, hash_workers, current_app.config.get('JOB_SPOOL_DIR'), current_user.id)
+        flash('Import queued; progress is shown below.', 'info')
+        return redirect(url_for('admin.job_progress', job_id=job_id))
+
+    results = import_users(csv.reader(io.StringIO(text)), hash_workers)
+    db.session.commit()
+    return render_template('admin_users_import.html', result=results, roles=ROLES)
+
+@admin_bp.route('/users/set-password-links.csv', methods=['GET'], endpoint='set_password_links')
+@login_required
+def set_password_links():
+    guard = _ensure_admin()
+    if guard:
+        return guard
+    # Every account still waiting for its first password; links are stateless, so re-downloading is safe
+    stmt = select(User.id, User.username, User.email, User.role, User.password).where(User.password == UNSET_PASSWORD)
+    role = request.args.get('role')
+    if role in ROLES:
+        stmt = stmt.where(User.role == role)
+    base_url = (current_app.config.get('BASE_URL') or request.url_root).rstrip('/')
+    rows = ([
+        username, email, user_role,
+        base_url + url_for('auth.set_password', token=make_set_password_token(user_id, password))
+    ] for user_id, username, email, user_role, password in stream_rows(stmt.order_by(User.id)))
+    return csv_response(['username', 'email', 'role', 'set_password_url'], rows, 'set_password_links.csv')
 
 @admin_bp.route('/approve/<int:user_id>', methods=['POST'], endpoint='approve_user')
 @login_required
@@ -52,11 +168,22 @@ def reject_user(user_id):
     if guard:
         return guard
     user = User.query.get_or_404(user_id)
+    student_deleted(user.id)
     db.session.delete(user)
+    enrollments_changed()
     db.session.commit()
     flash(f'User {user.username} rejected and deleted.', 'success')
     return redirect(url_for('admin.admin_dashboard'))
 
+# -------- Metrics --------
+@admin_bp.route('/metrics', methods=['GET'], endpoint='metrics')
+@login_required
+def metrics():
+    guard = _ensure_admin()
+    if guard:
+        return guard
+    return jsonify(get_metrics().snapshot())
+
 # -------- Departments --------
 @admin_bp.route('/departments', methods=['GET', 'POST'], endpoint='manage_departments')
 @login_required
@@ -111,8 +238,13 @@ def manage_courses():
             db.session.commit()
             flash('Course added.', 'success')
         return redirect(url_for('admin.manage_courses'))
-    courses = Course.query.all()
-    return render_template('courses.html', courses=courses, departments=departments)
+    filters = {'department_id': _int_arg('department_id')}
+    query = Course.query.options(joinedload(Course.department))
+    if filters['department_id']:
+        query = query.filter(Course.department_id == filters['department_id'])
+    page = keyset_page(query, Course.id, _int_arg('after'))
+    return render_template('courses.html', courses=page.items, departments=departments, filters=filters,
+                           **_pager('admin.manage_courses', page, filters))
 
 @admin_bp.route('/courses/delete/<int:course_id>', methods=['POST'], endpoint='delete_course')
 @login_required
@@ -133,31 +265,40 @@ def manage_sections():
     guard = _ensure_admin()
     if guard:
         return guard
-    courses = Course.query.all()
-    lecturers = User.query.filter_by(role='lecturer').all()
-    tas = User.query.filter_by(role='ta').all()
     if request.method == 'POST':
-        course_id = request.form.get('course_id')
+        course = _form_course()
         section_code = request.form.get('section_code', '').strip()
-        instructor_id = request.form.get('instructor_id')
-        ta_id = request.form.get('ta_id') or None
-        if not course_id or not section_code or not instructor_id:
-            flash('Course, Section Code and Instructor are required.', 'danger')
-        elif Section.query.filter_by(course_id=course_id, section_code=section_code).first():
+        instructor = _form_user('instructor_id', 'instructor_email', 'lecturer')
+        ta = _form_user('ta_id', 'ta_email', 'ta')
+        ta_given = request.form.get('ta_id') or request.form.get('ta_email', '').strip()
+        if not course or not section_code or not instructor:
+            flash('Course, Section Code and Instructor are required (check the course code and lecturer email).', 'danger')
+        elif ta_given and not ta:
+            flash('No teaching assistant with that email.', 'danger')
+        elif Section.query.filter_by(course_id=course.id, section_code=section_code).first():
             flash('Section code already exists for this course.', 'danger')
         else:
             section = Section(
-                course_id=course_id,
+                course_id=course.id,
                 section_code=section_code,
-                instructor_id=instructor_id,
-                ta_id=ta_id
+                instructor_id=instructor.id,
+                ta_id=ta.id if ta else None
             )
             db.session.add(section)
             db.session.commit()
             flash('Section created.', 'success')
         return redirect(url_for('admin.manage_sections'))
-    sections = Section.query.all()
-    return render_template('admin_sections.html', sections=sections, courses=courses, lecturers=lecturers, tas=tas)
+    filters = {'course_id': _int_arg('course_id'), 'department_id': _int_arg('department_id')}
+    query = Section.query.options(joinedload(Section.course), joinedload(Section.instructor), joinedload(Section.ta))
+    if filters['course_id']:
+        query = query.filter(Section.course_id == filters['course_id'])
+    if filters['department_id']:
+        query = query.join(Course, Course.id == Section.course_id).filter(Course.department_id == filters['department_id'])
+    page = keyset_page(query, Section.id, _int_arg('after'))
+    return render_template('admin_sections.html', sections=page.items,
+                           courses=_course_choices(filters['department_id'], filters['course_id']),
+                           departments=Department.query.order_by(Department.name).all(), filters=filters,
+                           **_pager('admin.manage_sections', page, filters))
 
 @admin_bp.route('/sections/delete/<int:section_id>', methods=['POST'], endpoint='delete_section')
 @login_required
@@ -166,7 +307,9 @@ def delete_section(section_id):
     if guard:
         return guard
     section = Section.query.get_or_404(section_id)
+    section_deleted(section.id)
     db.session.delete(section)
+    enrollments_changed()
     db.session.commit()
     flash('Section deleted.', 'success')
     return redirect(url_for('admin.manage_sections'))
@@ -178,23 +321,47 @@ def manage_enrollments():
     guard = _ensure_admin()
     if guard:
         return guard
-    sections = Section.query.all()
-    students = User.query.filter_by(role='student').all()
     if request.method == 'POST':
-        section_id = request.form.get('section_id')
+        section = _form_section()
+        section_id = section.id if section else None
         student_id = request.form.get('student_id')
+        email = request.form.get('student_email', '').strip().lower()
+        if not student_id and email:
+            # Students are picked by email: the student table is too large for a dropdown
+            student = User.query.filter_by(email=email, role='student').first()
+            student_id = student.id if student else None
+            if not student:
+                flash('No student with that email.', 'danger')
+                return redirect(url_for('admin.manage_enrollments'))
         if not section_id or not student_id:
-            flash('Section and Student are required.', 'danger')
+            flash('Section and Student are required (check the course and section codes).', 'danger')
         elif Enrollment.query.filter_by(section_id=section_id, student_id=student_id).first():
             flash('Student already enrolled in this section.', 'danger')
         else:
             enr = Enrollment(section_id=section_id, student_id=student_id)
             db.session.add(enr)
+            enrollments_changed()
             db.session.commit()
             flash('Enrollment added.', 'success')
         return redirect(url_for('admin.manage_enrollments'))
-    enrollments = Enrollment.query.all()
-    return render_template('admin_enrollments.html', enrollments=enrollments, sections=sections, students=students)
+    filters = {'section_id': _int_arg('section_id'), 'course_id': _int_arg('course_id'),
+               'department_id': _int_arg('department_id')}
+    query = Enrollment.query.options(joinedload(Enrollment.section).joinedload(Section.course),
+                                     joinedload(Enrollment.student))
+    if filters['section_id']:
+        query = query.filter(Enrollment.section_id == filters['section_id'])
+    if filters['course_id'] or filters['department_id']:
+        query = query.join(Section, Section.id == Enrollment.section_id).join(Course, Course.id == Section.course_id)
+        if filters['course_id']:
+            query = query.filter(Course.id == filters['course_id'])
+        if filters['department_id']:
+            query = query.filter(Course.department_id == filters['department_id'])
+    page = keyset_page(query, Enrollment.id, _int_arg('after'))
+    return render_template('admin_enrollments.html', enrollments=page.items,
+                           sections=_section_choices(filters['course_id'], filters['section_id']),
+                           courses=_course_choices(filters['department_id'], filters['course_id']),
+                           departments=Department.query.order_by(Department.name).all(), filters=filters,
+                           **_pager('admin.manage_enrollments', page, filters))
 
 @admin_bp.route('/enrollments/delete/<int:enrollment_id>', methods=['POST'], endpoint='delete_enrollment')
 @login_required
@@ -204,6 +371,7 @@ def delete_enrollment(enrollment_id):
         return guard
     enr = Enrollment.query.get_or_404(enrollment_id)
     db.session.delete(enr)
+    enrollments_changed()
     db.session.commit()
     flash('Enrollment deleted.', 'success')
     return redirect(url_for('admin.manage_enrollments'))
@@ -217,9 +385,8 @@ def upload_enrollments():
     if guard:
         return guard
 
-    sections = Section.query.all()
     if request.method == 'GET':
-        return render_template('admin_enrollments_upload.html', sections=sections, result=None)
+        return render_template('admin_enrollments_upload.html', result=None)
 
     # POST
     section_override_raw = (request.form.get('section_id') or '').strip()
@@ -230,6 +397,12 @@ def upload_enrollments():
         except Exception:
             flash('Invalid section selected.', 'danger')
             return redirect(url_for('admin.upload_enrollments'))
+    elif request.form.get('course_code', '').strip() or request.form.get('section_code', '').strip():
+        section = _form_section()
+        if section is None:
+            flash('No section with that course and section code.', 'danger')
+            return redirect(url_for('admin.upload_enrollments'))
+        section_override_id = section.id
 
     create_missing = bool(request.form.get('create_missing'))
 
@@ -238,95 +411,60 @@ def upload_enrollments():
         flash('Please select a CSV file.', 'danger')
         return redirect(url_for('admin.upload_enrollments'))
 
+    if request.form.get('mode') == 'sync':
+        # Roster sync: the whole file is one change set, applied (or previewed) in one transaction
+        results = sync_enrollments(csv.reader(decoded_lines(file.stream)), section_override_id, create_missing,
+                                   dry_run=bool(request.form.get('dry_run')))
+        if results['dry_run']:
+            db.session.rollback()
+        else:
+            if results['enrolled'] or results['removed']:
+                enrollments_changed()
+            db.session.commit()
+        return render_template('admin_enrollments_upload.html', result=results)
+
+    chunk_rows = current_app.config.get('ENROLLMENT_UPLOAD_CHUNK_ROWS', 5000)
+    if request.form.get('background'):
+        job_id = enqueue_upload(file, section_override_id, create_missing, chunk_rows,
+                                current_app.config.get('JOB_SPOOL_DIR'), current_user.id)
+        flash('Upload queued; progress is shown below.', 'info')
+        return redirect(url_for('admin.job_progress', job_id=job_id))
+
+    size = request.content_length or 0
+    if size > current_app.config.get('ENROLLMENT_UPLOAD_STREAM_BYTES', 2 * 1024 * 1024):
+        # Large files: decode as we go and commit chunk by chunk
+        results = import_enrollments_stream(file.stream, section_override_id, create_missing, chunk_rows)
+        return render_template('admin_enrollments_upload.html', result=results)
+
     try:
         text = file.read().decode('utf-8-sig')
     except Exception as e:
         flash(f'Could not read file: {e}', 'danger')
         return redirect(url_for('admin.upload_enrollments'))
 
-    reader = csv.reader(io.StringIO(text))
-
-    def is_header(row):
-        low = [c.strip().lower() for c in row]
-        return 'email' in low or 'username' in low
-
-    results = {
-        'enrolled': 0,
-        'duplicates': 0,
-        'created_pending': 0,
-        'errors': []
-    }
-
-    line_no = 0
-    for row in reader:
-        line_no += 1
-        if not row or (len(row) == 1 and row[0].strip() == ''):
-            continue
-        if line_no == 1 and is_header(row):
-            continue
-
-        cols = [c.strip() for c in row]
-        email = cols[0] if len(cols) > 0 else ''
-        username = cols[1] if len(cols) > 1 else ''
-        section_id = section_override_id
-        if section_id is None and len(cols) > 2 and cols[2]:
-            try:
-                section_id = int(cols[2])
-            except Exception:
-                results['errors'].append(f'Line {line_no}: invalid section_id value')
-                continue
-
-        if not section_id:
-            results['errors'].append(f'Line {line_no}: missing section_id and no override selected')
-            continue
-
-        if not email or '@' not in email:
-            results['errors'].append(f'Line {line_no}: invalid email')
-            continue
-
-        section = Section.query.get(section_id)
-        if not section:
-            results['errors'].append(f'Line {line_no}: section {section_id} not found')
-            continue
-
-        user = User.query.filter_by(email=email.lower()).first()
-        if not user:
-            if not create_missing:
-                results['errors'].append(f'Line {line_no}: user not found and create-missing disabled')
-                continue
-            # Create pending student user
-            base_username = (username or email.split('@')[0]).strip()[:30] or 'student'
-            candidate = base_username
-            suffix = 1
-            while User.query.filter_by(username=candidate).first():
-                # ensure stays under 30 chars
-                candidate = f"{base_username[:27]}{suffix:02d}"
-                suffix += 1
-            user = User(
-                username=candidate,
-                email=email.lower(),
-                password=generate_password_hash('changeme'),
-                role='student',
-                is_approved=False
-            )
-            db.session.add(user)
-            db.session.flush()
-            results['created_pending'] += 1
-
-        if user.role != 'student':
-            results['errors'].append(f'Line {line_no}: user role must be student (found {user.role})')
-            continue
-
-        if Enrollment.query.filter_by(section_id=section_id, student_id=user.id).first():
-            results['duplicates'] += 1
-            continue
+    results = import_enrollments(csv.reader(io.StringIO(text)), section_override_id, create_missing)
+    if results['enrolled']:
+        enrollments_changed()
+    db.session.commit()
+    return render_template('admin_enrollments_upload.html', result=results)
 
-        enr = Enrollment(section_id=section_id, student_id=user.id)
-        db.session.add(enr)
-        results['enrolled'] += 1
+# -------- Background jobs --------
+@admin_bp.route('/jobs/<int:job_id>', methods=['GET'], endpoint='job_progress')
+@login_required
+def job_progress(job_id):
+    guard = _ensure_admin()
+    if guard:
+        return guard
+    job = Job.query.get_or_404(job_id)
+    return render_template('admin_job.html', job=job_info(job))
 
-    db.session.commit()
-    return render_template('admin_enrollments_upload.html', sections=sections, result=results)
+@admin_bp.route('/jobs/<int:job_id>.json', methods=['GET'], endpoint='job_status')
+@login_required
+def job_status(job_id):
+    guard = _ensure_admin()
+    if guard:
+        return guard
+    return jsonify(job_info(Job.query.get_or_404(job_id)))
 
 # -------- Alerts: Admin compose (manual multi-select, in-app only) --------
 @admin_bp.route('/alerts', methods=['GET', 'POST'], endpoint='admin_alerts')
@@ -0,0 +1,151 @@
+"""Bulk user provisioning (admin CSV import).
+
+Rows of username, email, role (student, lecturer or ta) and an optional initial password
+are checked against existing accounts with chunked IN queries and inserted, pre-approved,
+with bulk INSERTs. Rows without a password get UNSET_PASSWORD, which never matches at
+login; those users choose a password through a one-time set-password link (see
+app/auth/tokens.py), downloadable for everyone still pending from
+/admin/users/set-password-links.csv. Passwords that are supplied are hashed in a process
+pool of PASSWORD_HASH_WORKERS processes, as the KDF is deliberately slow. The pool is created
+once per process and starts its workers with forkserver (or spawn), never by forking the
+multi-threaded server. Files with more than USER_IMPORT_INLINE_PASSWORDS passwords, or
+ticked "Run in background", are imported by a user_import job (see app/jobs.py) instead of
+in the request.
+"""
+import csv
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select, insert
+from werkzeug.security import generate_password_hash
+
+from app.admin.import_utils import chunks, report_error
+from app.extensions import db
+from app.jobs import job, enqueue
+from app.models import User
+
+INSERT_CHUNK = 1000
+UNSET_PASSWORD = '!'
+ROLES = ('student', 'lecturer', 'ta')
+_EMAIL_DOMAINS = {'student': '@st.ug.edu.gh', 'lecturer': '@staff.ug.edu.gh', 'ta': '@staff.ug.edu.gh'}
+# Below this many passwords a process pool costs more than it saves
+_POOL_MIN = 16
+
+
+_pool_lock = threading.Lock()
+_pool = None  # (workers, ProcessPoolExecutor)
+
+
+def _hash_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool[0] != workers:
+            if _pool is not None:
+                _pool[1].shutdown(wait=False)
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = (workers, ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method)))
+        return _pool[1]
+
+
+def hash_passwords(passwords: Sequence[str], workers: Optional[int] = None) -> List[str]:
+    """generate_password_hash for each password, spread over a process pool when worthwhile."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) < _POOL_MIN:
+        return [generate_password_hash(p) for p in passwords]
+    return list(_hash_pool(workers).map(generate_password_hash, passwords,
+                                        chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def _is_header(row) -> bool:
+    low = [c.strip().lower() for c in row]
+    return 'email' in low and 'username' in low
+
+
+def supplied_password_count(rows: Iterable[Sequence[str]]) -> int:
+    """Number of rows with something in the password column (header included, which is harmless)."""
+    return sum(1 for row in rows if len(row) > 3 and row[3].strip())
+
+
+def _taken(column, values) -> set:
+    found = set()
+    for chunk in chunks(values):
+        found.update(db.session.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def import_users(rows: Iterable[Sequence[str]], hash_workers: Optional[int] = None) -> Dict:
+    """Create pre-approved users from CSV rows (username, email, role, password optional). Does not commit."""
+    results = {'created': 0, 'needs_password': 0, 'skipped_existing': 0, 'errors': [], 'errors_omitted': 0}
+    parsed = []
+    seen_usernames, seen_emails = set(), set()
+    for line_no, row in enumerate(rows, start=1):
+        if not row or (len(row) == 1 and row[0].strip() == ''):
+            continue
+        if line_no == 1 and _is_header(row):
+            continue
+        cols = [c.strip() for c in row] + ['', '', '', '']
+        username, email, role, password = cols[0], cols[1].lower(), cols[2].lower(), cols[3]
+        if not username or len(username) < 3:
+            report_error(results, f'Line {line_no}: username must be at least 3 characters')
+        elif not email or '@' not in email:
+            report_error(results, f'Line {line_no}: invalid email')
+        elif role not in ROLES:
+            report_error(results, f'Line {line_no}: role must be one of {", ".join(ROLES)}')
+        elif not email.endswith(_EMAIL_DOMAINS[role]):
+            report_error(results, f'Line {line_no}: {role} email must end with {_EMAIL_DOMAINS[role]}')
+        elif password and len(password) < 6:
+            report_error(results, f'Line {line_no}: password must be at least 6 characters')
+        elif username in seen_usernames or email in seen_emails:
+            report_error(results, f'Line {line_no}: username or email repeated in the file')
+        else:
+            seen_usernames.add(username)
+            seen_emails.add(email)
+            parsed.append((line_no, username, email, role, password))
+
+    taken_usernames = _taken(User.username, seen_usernames)
+    taken_emails = _taken(User.email, seen_emails)
+    new_rows = []
+    for line_no, username, email, role, password in parsed:
+        if username in taken_usernames or email in taken_emails:
+            results['skipped_existing'] += 1
+            continue
+        new_rows.append({'username': username, 'email': email, 'password': password,
+                         'role': role, 'is_approved': True})
+
+    supplied = [r for r in new_rows if r['password']]
+    for r, hashed in zip(supplied, hash_passwords([r['password'] for r in supplied], hash_workers)):
+        r['password'] = hashed
+    for r in new_rows:
+        if not r['password']:
+            r['password'] = UNSET_PASSWORD
+            results['needs_password'] += 1
+
+    for chunk in chunks(new_rows, INSERT_CHUNK):
+        db.session.execute(insert(User), chunk)
+    results['created'] = len(new_rows)
+    return results
+
+
+@job('user_import')
+def user_import_job(ctx, path: str, hash_workers: Optional[int] = None) -> Dict:
+    """Background variant of the import: import the spooled file at path, then delete it."""
+    try:
+        with open(path, encoding='utf-8-sig', newline='') as fh:
+            results = import_users(csv.reader(fh), hash_workers)
+        db.session.commit()
+        return results
+    finally:
+        os.unlink(path)
+
+
+def enqueue_user_import(text: str, hash_workers: Optional[int] = None, spool_dir: Optional[str] = None,
+                        user_id: Optional[int] = None) -> int:
+    """Spool a decoded CSV to disk and start a user_import job for it; return the job id."""
+    fd, path = tempfile.mkstemp(prefix='users-', suffix='.csv', dir=spool_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as out:
+        out.write(text)
+    return enqueue('user_import', {'path': path, 'hash_workers': hash_workers}, user_id=user_id)
@@ -0,0 +1,242 @@
+"""Attendance analytics over a compact students x sessions matrix.
+
+A matrix is loaded with three narrow queries (sessions, enrollments, present records) read as
+plain integer tuples, with no ORM objects. The result is two boolean arrays:
+
+- present: the student has a record for the session
+- expected: the student is enrolled in the session's section
+
+Only sessions that have been held count: scheduled (never opened) sessions and sessions
+starting after the as_of cutoff (default now) are left out, so timetable sessions generated
+for the rest of the term are not counted as absences.
+
+Rows are sorted student ids and columns are session ids in scheduled order. Both arrays are
+stored packed, eight sessions per byte, so a term of 30k students x 24k sessions takes about
+90 MB per array. Everything else is vectorized NumPy: per-student and per-session rates,
+consecutive-absence streaks and threshold filters. Per-student rates are popcounts over the
+packed rows.
+
+    flask absenteeism-report --start 2026-09-07 --end 2026-12-18 [--department-id N]
+                             [--below 0.75] [--streak 3]
+"""
+from datetime import date, datetime
+from typing import Optional
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import Course, Section, ClassSession, Enrollment, AttendanceRecord
+from app.exports import session_conditions
+
+
+BLOCK_ROWS = 1024
+
+
+def _ids(rows, cols: int) -> np.ndarray:
+    return np.array(rows, dtype=np.int64).reshape(-1, cols)
+
+
+def _lookup(sorted_ids: np.ndarray, values: np.ndarray):
+    """Return (positions of values in sorted_ids, mask of values that were found)."""
+    if not len(sorted_ids):
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_ids, values), len(sorted_ids) - 1)
+    return pos, sorted_ids[pos] == values
+
+
+def _set_bits(bits: np.ndarray, rows: np.ndarray, cols: np.ndarray):
+    np.bitwise_or.at(bits, (rows, cols >> 3), (np.uint8(0x80) >> (cols & 7).astype(np.uint8)))
+
+
+def _get_bits(bits: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    return (bits[rows, cols >> 3] >> (7 - (cols & 7)).astype(np.uint8)) & 1 == 1
+
+
+class AttendanceMatrix:
+    """Students x sessions attendance, stored as packed bits (8 sessions per byte per student).
+
+    Besides the two bit arrays, the coordinates of the expected cells are kept sorted by
+    student then session, so session totals and streaks cost O(expected cells) rather than
+    O(students x sessions); a student sees only their own sections' sessions.
+    """
+
+    def __init__(self, student_ids: np.ndarray, session_ids: np.ndarray,
+                 present_bits: np.ndarray, expected_bits: np.ndarray,
+                 cell_rows: np.ndarray, cell_cols: np.ndarray):
+        self.student_ids = student_ids
+        self.session_ids = session_ids
+        self.present_bits = present_bits
+        self.expected_bits = expected_bits
+        self._cell_rows = cell_rows
+        self._cell_cols = cell_cols
+        self._cell_present = _get_bits(present_bits, cell_rows, cell_cols)
+
+    @classmethod
+    def from_ids(cls, sessions: np.ndarray, enrollments: np.ndarray, records: np.ndarray) -> 'AttendanceMatrix':
+        """Build from (session_id, section_id), (section_id, student_id) and (session_id, student_id) arrays.
+
+        Sessions must already be in scheduled order. Enrollments and records that do not match a
+        loaded session (or an enrolled student) are ignored.
+        """
+        session_ids = sessions[:, 0]
+        student_ids = np.unique(enrollments[:, 1])
+        section_ids = np.unique(sessions[:, 1])
+        n_students, n_sessions = len(student_ids), len(session_ids)
+        width = (n_sessions + 7) // 8
+
+        # Expected cells: every session column of every enrolled section, per student
+        sec_idx, known = _lookup(section_ids, enrollments[:, 0])
+        enr_rows = np.searchsorted(student_ids, enrollments[known, 1])
+        enr_secs = sec_idx[known]
+        by_section = np.argsort(np.searchsorted(section_ids, sessions[:, 1]), kind='stable')
+        per_section = np.bincount(np.searchsorted(section_ids, sessions[:, 1]), minlength=len(section_ids))
+        section_start = np.concatenate(([0], np.cumsum(per_section)[:-1])).astype(np.int64)
+        counts = per_section[enr_secs]
+        cell_rows = np.repeat(enr_rows, counts)
+        offsets = np.arange(counts.sum(), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_cols = by_section[np.repeat(section_start[enr_secs], counts) + offsets]
+        # A student can only be enrolled once per section, so cells are unique; order them
+        key = np.sort(cell_rows * max(n_sessions, 1) + cell_cols)
+        cell_rows, cell_cols = key // max(n_sessions, 1), key % max(n_sessions, 1)
+
+        expected_bits = np.zeros((n_students, width), dtype=np.uint8)
+        _set_bits(expected_bits, cell_rows, cell_cols)
+
+        order = np.argsort(session_ids, kind='stable')
+        col, known_session = _lookup(session_ids[order], records[:, 0])
+        row, known_student = _lookup(student_ids, records[:, 1])
+        valid = known_session & known_student
+        present_bits = np.zeros((n_students, width), dtype=np.uint8)
+        _set_bits(present_bits, row[valid], order[col[valid]])
+        present_bits &= expected_bits
+        return cls(student_ids, session_ids, present_bits, expected_bits, cell_rows, cell_cols)
+
+    @property
+    def shape(self):
+        return len(self.student_ids), len(self.session_ids)
+
+    def _unpack(self, bits: np.ndarray) -> np.ndarray:
+        return np.unpackbits(bits, axis=1, count=len(self.session_ids)).astype(bool)
+
+    @property
+    def present(self) -> np.ndarray:
+        """Unpacked bool matrix (for small matrices; use blocks() for large ones)."""
+        return self._unpack(self.present_bits)
+
+    @property
+    def expected(self) -> np.ndarray:
+        return self._unpack(self.expected_bits)
+
+    def blocks(self):
+        """Yield (first row, present block, expected block) as unpacked bool arrays of BLOCK_ROWS rows."""
+        for lo in range(0, len(self.student_ids), BLOCK_ROWS):
+            yield lo, self._unpack(self.present_bits[lo:lo + BLOCK_ROWS]), self._unpack(self.expected_bits[lo:lo + BLOCK_ROWS])
+
+    def student_rates(self) -> np.ndarray:
+        """Fraction of expected sessions attended per student (0 where none were expected)."""
+        present = np.bitwise_count(self.present_bits).sum(axis=1, dtype=np.int64)
+        expected = np.bitwise_count(self.expected_bits).sum(axis=1, dtype=np.int64)
+        return np.divide(present, expected, out=np.zeros(len(expected)), where=expected > 0)
+
+    def _session_totals(self):
+        n = len(self.session_ids)
+        present = np.bincount(self._cell_cols[self._cell_present], minlength=n)
+        expected = np.bincount(self._cell_cols, minlength=n)
+        return present, expected
+
+    def session_rates(self) -> np.ndarray:
+        """Fraction of enrolled students present per session (0 for empty sections)."""
+        present, expected = self._session_totals()
+        return np.divide(present, expected, out=np.zeros(len(expected)), where=expected > 0)
+
+    def absence_streaks(self):
+        """Return (longest, current) runs of consecutive absences per student.
+
+        Only the student's own sessions count: other sections' sessions neither extend nor
+        break a streak.
+        """
+        longest = np.zeros(len(self.student_ids), dtype=np.int64)
+        current = np.zeros(len(self.student_ids), dtype=np.int64)
+        if not len(self._cell_rows):
+            return longest, current
+        absent = (~self._cell_present).astype(np.int64)
+        total = np.cumsum(absent)
+        starts = np.flatnonzero(np.diff(self._cell_rows, prepend=-1))
+        # Streaks restart after every present mark and at each student's first session
+        baseline = np.where(self._cell_present, total, 0)
+        baseline[starts] = np.maximum(baseline[starts], total[starts] - absent[starts])
+        runs = total - np.maximum.accumulate(baseline)
+        rows = self._cell_rows[starts]
+        longest[rows] = np.maximum.reduceat(runs, starts)
+        ends = np.append(starts[1:], len(runs)) - 1
+        current[rows] = runs[ends]
+        return longest, current
+
+    def longest_absence_streaks(self) -> np.ndarray:
+        return self.absence_streaks()[0]
+
+    def current_absence_streaks(self) -> np.ndarray:
+        return self.absence_streaks()[1]
+
+    def students_below(self, threshold: float) -> np.ndarray:
+        """Ids of students (with at least one expected session) attending less than threshold."""
+        mask = (self.student_rates() < threshold) & self.expected_bits.any(axis=1)
+        return self.student_ids[mask]
+
+    def sessions_below(self, threshold: float) -> np.ndarray:
+        present, expected = self._session_totals()
+        rates = np.divide(present, expected, out=np.zeros(len(expected)), where=expected > 0)
+        return self.session_ids[(rates < threshold) & (expected > 0)]
+
+
+def _load(conditions, as_of: Optional[datetime] = None) -> AttendanceMatrix:
+    base = (select(ClassSession.id, ClassSession.section_id)
+            .join(Section, Section.id == ClassSession.section_id)
+            .join(Course, Course.id == Section.course_id)
+            .where(*conditions,
+                   ClassSession.status != 'scheduled',
+                   ClassSession.scheduled_start <= (as_of or datetime.utcnow())))
+    sessions = _ids(db.session.execute(base.order_by(ClassSession.scheduled_start, ClassSession.id)).all(), 2)
+    selected = base.subquery()
+    enrollments = _ids(db.session.execute(
+        select(Enrollment.section_id, Enrollment.student_id)
+        .where(Enrollment.section_id.in_(select(selected.c.section_id).distinct()))).all(), 2)
+    records = _ids(db.session.execute(
+        select(AttendanceRecord.class_session_id, AttendanceRecord.student_id)
+        .where(AttendanceRecord.class_session_id.in_(select(selected.c.id)))).all(), 2)
+    return AttendanceMatrix.from_ids(sessions, enrollments, records)
+
+
+def load_section_matrix(section_id: int, start: Optional[date] = None, end: Optional[date] = None,
+                        as_of: Optional[datetime] = None) -> AttendanceMatrix:
+    return _load(session_conditions(start=start, end=end) + [ClassSession.section_id == section_id], as_of)
+
+
+def load_term_matrix(start: date, end: date, department_id: Optional[int] = None,
+                     as_of: Optional[datetime] = None) -> AttendanceMatrix:
+    return _load(session_conditions(department_id=department_id, start=start, end=end), as_of)
+
+
+@click.command('absenteeism-report')
+@click.option('--start', required=True, type=click.DateTime(formats=['%Y-%m-%d']), help='First day of term')
+@click.option('--end', required=True, type=click.DateTime(formats=['%Y-%m-%d']), help='Last day of term')
+@click.option('--department-id', type=int, help='Only this department')
+@click.option('--below', default=0.75, show_default=True, help='Flag students attending less than this fraction')
+@click.option('--streak', default=3, show_default=True, help='Flag students with this many consecutive absences')
+@with_appcontext
+def absenteeism_report_command(start, end, department_id, below, streak):
+    """List chronically absent students as CSV (student_id, rate, longest_streak, current_streak)."""
+    matrix = load_term_matrix(start.date(), end.date(), department_id)
+    rates = matrix.student_rates()
+    longest, current = matrix.absence_streaks()
+    flagged = matrix.expected_bits.any(axis=1) & ((rates < below) | (longest >= streak))
+    click.echo('student_id,rate,longest_streak,current_streak')
+    for i in np.flatnonzero(flagged):
+        click.echo(f'{matrix.student_ids[i]},{rates[i]:.3f},{longest[i]},{current[i]}')
+
+
+def init_app(app):
+    app.cli.add_command(absenteeism_report_command)
@@ -0,0 +1,87 @@
+"""Closing of expired open sessions.
+
+A session expires at min(scheduled_end, opened_at + ATTENDANCE_CODE_TTL_MINUTES). Expired
+sessions are closed with one UPDATE (served by ix_class_session_status_end) by a background
+thread every AUTO_CLOSE_INTERVAL_SECONDS, started by default outside of TESTING. Deployments
+that prefer a timer can set AUTO_CLOSE_SCHEDULER=0 and run `flask close-expired-sessions`
+from cron instead. The thread waits one interval before its first pass, so short CLI
+commands (which also create the app) exit before it does anything.
+Closed sessions are dropped from this worker's live counters and QR image cache.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import update, or_
+
+from app.extensions import db
+from app.models import ClassSession
+from app.attendance.registry import sessions_changed
+from app.attendance.live import get_live
+from app.attendance.qr import get_qr_cache
+
+
+def close_expired_sessions(now: Optional[datetime] = None, section_id: Optional[int] = None) -> int:
+    """Close every open session past its expiry; return how many were closed. Does not commit."""
+    now = now or datetime.utcnow()
+    ttl_minutes = current_app.config.get('ATTENDANCE_CODE_TTL_MINUTES', 15)
+    stmt = (update(ClassSession)
+            .where(ClassSession.status == 'open',
+                   or_(ClassSession.scheduled_end < now,
+                       ClassSession.opened_at < now - timedelta(minutes=ttl_minutes)))
+            .values(status='closed', closed_at=now)
+            .returning(ClassSession.id))
+    if section_id is not None:
+        stmt = stmt.where(ClassSession.section_id == section_id)
+    closed = db.session.execute(stmt).scalars().all()
+    if closed:
+        sessions_changed()
+        live, qr_cache = get_live(), get_qr_cache()
+        for session_id in closed:
+            live.forget(session_id)
+            qr_cache.evict_session(session_id)
+    return len(closed)
+
+
+def _run_scheduler(app, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        with app.app_context():
+            try:
+                closed = close_expired_sessions()
+                db.session.commit()
+                if closed:
+                    app.logger.info(f"sessions_auto_closed count={closed}")
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('auto_close_failed')
+
+
+@click.command('close-expired-sessions')
+@with_appcontext
+def close_expired_command():
+    """Close all open sessions whose marking window has expired."""
+    closed = close_expired_sessions()
+    db.session.commit()
+    click.echo(f'Closed {closed} expired session(s).')
+
+
+def start_scheduler(app) -> Optional[threading.Event]:
+    """Start the auto-close thread for this process; return the event that stops it (None if disabled)."""
+    interval = app.config.get('AUTO_CLOSE_INTERVAL_SECONDS', 60)
+    if not interval or interval <= 0:
+        return None
+    stop = threading.Event()
+    thread = threading.Thread(target=_run_scheduler, args=(app, interval, stop),
+                              name='session-auto-close', daemon=True)
+    thread.start()
+    app.extensions['session_auto_close'] = stop
+    return stop
+
+
+def init_app(app):
+    app.cli.add_command(close_expired_command)
+    if app.config.get('AUTO_CLOSE_SCHEDULER') and not app.config.get('TESTING'):
+        start_scheduler(app)
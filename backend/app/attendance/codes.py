@@ -0,0 +1,56 @@
+import hmac
+import secrets
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from app.security import hmac_sha256
+
+# Stored format for keyed digests: "hmac-sha256$<salt hex>$<digest hex>".
+# Anything else in ClassSession.open_code_hash is treated as a werkzeug KDF hash
+# (sessions opened before the HMAC mode existed keep verifying that way).
+HMAC_METHOD = 'hmac-sha256'
+_SALT_BYTES = 16
+# Empty purpose label: digests stored before app/security.py existed were computed over the bare message
+_PURPOSE = b''
+
+
+def _hmac_digest(salt_hex: str, session_id: int, code: str) -> str:
+    msg = f"{salt_hex}:{session_id}:{code}".encode('utf-8')
+    return hmac_sha256(_PURPOSE, msg).hex()
+
+
+def is_hmac_hash(stored: str) -> bool:
+    return bool(stored) and stored.startswith(HMAC_METHOD + '$')
+
+
+def hash_open_code(code: str, session_id: int) -> str:
+    """Hash a short-lived session code using the configured method.
+
+    ATTENDANCE_CODE_HASH_METHOD='hmac' (default) stores a keyed HMAC-SHA256 digest with a
+    per-session salt; 'kdf' keeps the previous werkzeug password hash.
+    """
+    method = current_app.config.get('ATTENDANCE_CODE_HASH_METHOD', 'hmac')
+    if method == 'kdf':
+        return generate_password_hash(code)
+    salt_hex = secrets.token_hex(_SALT_BYTES)
+    return f"{HMAC_METHOD}${salt_hex}${_hmac_digest(salt_hex, session_id, code)}"
+
+
+def verify_open_code(stored: str, code: str, session_id: int) -> bool:
+    if not stored or not code:
+        return False
+    if is_hmac_hash(stored):
+        try:
+            _, salt_hex, digest = stored.split('$', 2)
+        except ValueError:
+            return False
+        return hmac.compare_digest(digest, _hmac_digest(salt_hex, session_id, code))
+    return check_password_hash(stored, code)
+
+
+def needs_rehash(stored: str) -> bool:
+    """True for legacy KDF hashes that should be upgraded once a correct code is seen."""
+    if current_app.config.get('ATTENDANCE_CODE_HASH_METHOD', 'hmac') == 'kdf':
+        return False
+    return bool(stored) and not is_hmac_hash(stored)
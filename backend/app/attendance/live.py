@@ -0,0 +1,102 @@
+"""Live attendee counters for open sessions (feeds the lecturer's projector view).
+
+Counters live in memory. A session's counter is seeded from the database the first time
+someone watches it, and student_mark increments it for every recorded mark. Because each
+worker only sees its own marks, a watched counter is re-seeded every LIVE_RESYNC_SECONDS.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import current_app
+
+from app.extensions import db
+from app.models import AttendanceRecord, User
+
+_EXTENSION_KEY = 'live_attendance'
+RECENT_ARRIVALS = 10
+
+
+class _Counter:
+    __slots__ = ('count', 'recent', 'synced_at', 'seq')
+
+    def __init__(self):
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_ARRIVALS)
+        self.synced_at = 0.0
+        self.seq = 0
+
+
+class LiveAttendance:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._counters = {}
+
+    def record(self, session_id: int, username: str, recorded_at: datetime):
+        with self._cond:
+            counter = self._counters.get(session_id)
+            if counter is None:
+                # Nobody is watching; the next seed will include this mark
+                return
+            counter.count += 1
+            counter.recent.appendleft({'username': username, 'recorded_at': recorded_at.isoformat(timespec='seconds')})
+            counter.seq += 1
+            self._cond.notify_all()
+
+    def snapshot(self, session_id: int) -> dict:
+        resync = current_app.config.get('LIVE_RESYNC_SECONDS', 15)
+        with self._cond:
+            counter = self._counters.get(session_id)
+            stale = counter is None or time.monotonic() - counter.synced_at >= resync
+        if stale:
+            self._seed(session_id)
+        with self._cond:
+            counter = self._counters[session_id]
+            return {'session_id': session_id, 'count': counter.count, 'recent': list(counter.recent), 'seq': counter.seq}
+
+    def wait(self, session_id: int, since_seq: int, timeout: float) -> bool:
+        """Block until the counter moves past since_seq or the timeout passes; True if it moved."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                counter = self._counters.get(session_id)
+                if counter is not None and counter.seq != since_seq:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+
+    def forget(self, session_id: int):
+        with self._cond:
+            self._counters.pop(session_id, None)
+            self._cond.notify_all()
+
+    def _seed(self, session_id: int):
+        count = db.session.query(db.func.count(AttendanceRecord.id)).filter(
+            AttendanceRecord.class_session_id == session_id).scalar() or 0
+        rows = (db.session.query(User.username, AttendanceRecord.recorded_at)
+                .join(User, User.id == AttendanceRecord.student_id)
+                .filter(AttendanceRecord.class_session_id == session_id)
+                .order_by(AttendanceRecord.recorded_at.desc(), AttendanceRecord.id.desc())
+                .limit(RECENT_ARRIVALS)
+                .all())
+        with self._cond:
+            counter = self._counters.setdefault(session_id, _Counter())
+            if counter.count != count or not counter.synced_at:
+                counter.count = count
+                counter.recent = deque(
+                    ({'username': u, 'recorded_at': at.isoformat(timespec='seconds')} for u, at in rows),
+                    maxlen=RECENT_ARRIVALS)
+                counter.seq += 1
+                self._cond.notify_all()
+            counter.synced_at = time.monotonic()
+
+
+def init_app(app):
+    app.extensions[_EXTENSION_KEY] = LiveAttendance()
+
+
+def get_live() -> LiveAttendance:
+    return current_app.extensions[_EXTENSION_KEY]
@@ -0,0 +1,97 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import AttendanceRecord
+from app.attendance.summaries import mark_recorded, marks_recorded
+
+# Columns of uq_attendance_session_student
+_CONFLICT_COLUMNS = ['class_session_id', 'student_id']
+
+
+def _dialect_insert():
+    name = db.session.get_bind().dialect.name
+    if name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        return dialect_insert
+    if name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert
+    return None
+
+
+def insert_attendance(class_session_id: int, student_id: int, status: str = 'present') -> bool:
+    """Insert an attendance row unless one already exists; return True if a row was created.
+
+    Uses INSERT ... ON CONFLICT DO NOTHING on SQLite/PostgreSQL so a duplicate submit costs a
+    single statement and no rollback. Other backends fall back to a SAVEPOINT around a plain
+    INSERT. New rows are counted in the attendance summaries. Does not commit.
+    """
+    values = {
+        'class_session_id': class_session_id,
+        'student_id': student_id,
+        'status': status,
+        'recorded_at': datetime.utcnow(),
+    }
+    dialect_insert = _dialect_insert()
+    if dialect_insert is not None:
+        stmt = (dialect_insert(AttendanceRecord.__table__)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=_CONFLICT_COLUMNS))
+        if db.session.execute(stmt).rowcount != 1:
+            return False
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(AttendanceRecord.__table__).values(**values))
+        except IntegrityError:
+            return False
+    mark_recorded(class_session_id, student_id)
+    return True
+
+
+def insert_attendance_batch(pairs) -> set:
+    """Insert many (class_session_id, student_id) marks; return the set of pairs that were created.
+
+    Existing rows are found with one SELECT and the rest go in as a single executemany. Rows
+    inserted concurrently by another writer are skipped by ON CONFLICT DO NOTHING, with
+    RETURNING reporting which rows actually went in (or by a per-row retry on backends
+    without it). Only created rows are counted in the summaries. Does not commit.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return set()
+    session_ids = {p[0] for p in pairs}
+    student_ids = {p[1] for p in pairs}
+    existing = set(
+        db.session.query(AttendanceRecord.class_session_id, AttendanceRecord.student_id)
+        .filter(AttendanceRecord.class_session_id.in_(session_ids),
+                AttendanceRecord.student_id.in_(student_ids))
+        .all()
+    )
+    to_insert = pairs - existing
+    if not to_insert:
+        return set()
+    now = datetime.utcnow()
+    rows = [{'class_session_id': sid, 'student_id': stid, 'status': 'present', 'recorded_at': now}
+            for (sid, stid) in sorted(to_insert)]
+    dialect_insert = _dialect_insert()
+    if dialect_insert is not None:
+        table = AttendanceRecord.__table__
+        stmt = (dialect_insert(table)
+                .on_conflict_do_nothing(index_elements=_CONFLICT_COLUMNS)
+                .returning(table.c.class_session_id, table.c.student_id))
+        created = {tuple(r) for r in db.session.execute(stmt, rows)}
+        marks_recorded(created)
+        return created
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(AttendanceRecord.__table__), rows)
+    except IntegrityError:
+        # insert_attendance counts its own rows
+        return {(r['class_session_id'], r['student_id']) for r in rows
+                if insert_attendance(r['class_session_id'], r['student_id'])}
+    marks_recorded(to_insert)
+    return to_insert
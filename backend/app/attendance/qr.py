@@ -0,0 +1,64 @@
+"""Rendered QR images for open sessions, cached per worker.
+
+Images are keyed by (session_id, format, payload digest) in a small LRU (QR_CACHE_SIZE
+entries) and dropped when the session closes. The digest doubles as the HTTP ETag.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import segno
+from flask import current_app
+
+_EXTENSION_KEY = 'qr_cache'
+MIMETYPES = {'svg': 'image/svg+xml', 'png': 'image/png'}
+
+
+def payload_digest(payload: str) -> str:
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def render_qr(payload: str, fmt: str) -> bytes:
+    buf = io.BytesIO()
+    segno.make(payload).save(buf, kind=fmt, scale=5)
+    return buf.getvalue()
+
+
+class QRCache:
+    def __init__(self, max_entries: int = 256):
+        self._max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, session_id: int, fmt: str, payload: str):
+        """Return (image bytes, etag) for the payload, rendering it on a cache miss."""
+        etag = payload_digest(payload)
+        key = (session_id, fmt, etag)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data, etag
+        data = render_qr(payload, fmt)
+        with self._lock:
+            self._entries[key] = data
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return data, etag
+
+    def evict_session(self, session_id: int):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == session_id]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def init_app(app):
+    app.extensions[_EXTENSION_KEY] = QRCache(app.config.get('QR_CACHE_SIZE', 256))
+
+
+def get_qr_cache() -> QRCache:
+    return current_app.extensions[_EXTENSION_KEY]
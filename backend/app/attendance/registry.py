@@ -0,0 +1,129 @@
+"""In-process registry of open class sessions for the student marking hot path.
+
+The registry holds one compact record per open session, so the mark page does not need
+to load ClassSession (and its section/course) on every request. open_session, close_session
+and anything else that changes an open session bump the 'open_sessions' cache version;
+each worker re-reads that counter at most every OPEN_SESSION_REGISTRY_CHECK_SECONDS and
+reloads all open sessions in one query when it moved.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from flask import current_app
+
+from app import cache_versions
+from app.extensions import db
+from app.metrics import get_metrics
+from app.models import ClassSession, Section, Course
+
+VERSION_KEY = 'open_sessions'
+_EXTENSION_KEY = 'open_session_registry'
+
+
+class OpenSession(NamedTuple):
+    id: int
+    section_id: int
+    expires_at: datetime
+    code_hash: str
+    section_code: str
+    course_code: str
+    course_title: str
+    scheduled_start: datetime
+    scheduled_end: datetime
+
+
+def session_expires_at(opened_at: Optional[datetime], scheduled_end: datetime, ttl_minutes: int) -> datetime:
+    # Expiry is min(scheduled_end, opened_at + TTL) when opened_at exists
+    if opened_at:
+        return min(scheduled_end, opened_at + timedelta(minutes=ttl_minutes))
+    return scheduled_end
+
+
+def open_session_from_model(sess: ClassSession) -> OpenSession:
+    ttl_minutes = current_app.config.get('ATTENDANCE_CODE_TTL_MINUTES', 15)
+    return OpenSession(
+        id=sess.id,
+        section_id=sess.section_id,
+        expires_at=session_expires_at(sess.opened_at, sess.scheduled_end, ttl_minutes),
+        code_hash=sess.open_code_hash,
+        section_code=sess.section.section_code,
+        course_code=sess.section.course.code,
+        course_title=sess.section.course.title,
+        scheduled_start=sess.scheduled_start,
+        scheduled_end=sess.scheduled_end,
+    )
+
+
+class OpenSessionRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        """Force a version check on the next lookup (used after local writes)."""
+        self._checked_at = 0.0
+        self._version = None
+
+    def get(self, session_id: int) -> Optional[OpenSession]:
+        """Return the open-session record, or None when it is not known to be open."""
+        self._maybe_refresh()
+        entry = self._entries.get(session_id)
+        get_metrics().inc('open_session_registry.misses' if entry is None else 'open_session_registry.hits')
+        return entry
+
+    def _maybe_refresh(self):
+        interval = current_app.config.get('OPEN_SESSION_REGISTRY_CHECK_SECONDS', 1.0)
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < interval:
+            return
+        with self._lock:
+            if self._version is not None and now - self._checked_at < interval:
+                return
+            version = cache_versions.current(VERSION_KEY)
+            if version != self._version:
+                self._entries = self._load()
+                self._version = version
+                get_metrics().inc('open_session_registry.reloads')
+            self._checked_at = now
+
+    def _load(self):
+        ttl_minutes = current_app.config.get('ATTENDANCE_CODE_TTL_MINUTES', 15)
+        rows = (db.session.query(ClassSession.id, ClassSession.section_id, ClassSession.opened_at,
+                                 ClassSession.open_code_hash, ClassSession.scheduled_start,
+                                 ClassSession.scheduled_end, Section.section_code, Course.code, Course.title)
+                .join(Section, ClassSession.section_id == Section.id)
+                .join(Course, Section.course_id == Course.id)
+                .filter(ClassSession.status == 'open', ClassSession.open_code_hash.isnot(None))
+                .all())
+        entries = {}
+        for (sid, section_id, opened_at, code_hash, start, end, section_code, course_code, course_title) in rows:
+            entries[sid] = OpenSession(
+                id=sid,
+                section_id=section_id,
+                expires_at=session_expires_at(opened_at, end, ttl_minutes),
+                code_hash=code_hash,
+                section_code=section_code,
+                course_code=course_code,
+                course_title=course_title,
+                scheduled_start=start,
+                scheduled_end=end,
+            )
+        return entries
+
+
+def init_app(app):
+    app.extensions[_EXTENSION_KEY] = OpenSessionRegistry()
+
+
+def get_registry() -> OpenSessionRegistry:
+    return current_app.extensions[_EXTENSION_KEY]
+
+
+def sessions_changed():
+    """Record a change to open sessions. Call before committing the change."""
+    cache_versions.bump(VERSION_KEY)
+    get_registry().invalidate()
@@ -1,14 +1,26 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify, abort, Response
 from flask_login import login_required, current_user
-from datetime import datetime, timedelta
+from datetime import datetime
 import secrets
-import segno
-import io, csv, time
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy.exc import IntegrityError
+import json, time
+from sqlalchemy import select, and_, func
+from sqlalchemy.orm import joinedload
 
 from app.extensions import db
-from app.models import Section, ClassSession, Enrollment, AttendanceRecord
+from app.ratelimit import get_limiter
+from app.models import User, Section, ClassSession, Enrollment, AttendanceRecord, SessionAttendanceSummary
+from app.pagination import keyset_page
+from app.exports import stream_rows, csv_response, iter_attendance_matrix, MATRIX_HEADER
+from app.attendance.marks import insert_attendance
+from app.attendance.writebehind import get_mark_batcher
+from app.attendance.codes import hash_open_code, verify_open_code, needs_rehash
+from app.enrollment_index import get_enrollment_index
+from app.attendance.autoclose import close_expired_sessions
+from app.attendance.summaries import sessions_created
+from app.attendance.live import get_live
+from app.attendance.qr import get_qr_cache, MIMETYPES as QR_MIMETYPES
+from app.attendance.tokens import make_qr_token, verify_qr_token, token_is_current, seconds_left_in_window
+from app.attendance.registry import get_registry, open_session_from_model, session_expires_at, sessions_changed
 
 attendance_bp = Blueprint('attendance', __name__)
 
@@ -39,22 +51,21 @@ def _is_section_manager(section: Section) -> bool:
         return False
     return False
 
-# Simple in-process rate limit for student mark endpoint (IP-based)
-_STUDENT_MARK_RATE = {}  # ip -> [timestamps]
-_STUDENT_MARK_RATE_WINDOW_SEC = 60
-_STUDENT_MARK_RATE_MAX = 20
-
+# Rate limit for student mark endpoint (IP-based token bucket, see app/ratelimit.py)
 def _rate_limit_ok(ip: str) -> bool:
-    now = time.time()
-    bucket = _STUDENT_MARK_RATE.setdefault(ip, [])
-    # drop old entries
-    cutoff = now - _STUDENT_MARK_RATE_WINDOW_SEC
-    while bucket and bucket[0] < cutoff:
-        bucket.pop(0)
-    if len(bucket) >= _STUDENT_MARK_RATE_MAX:
-        return False
-    bucket.append(now)
-    return True
+    return get_limiter('student_mark').allow(ip)
+
+def _record_mark(class_session_id: int, student_id: int) -> bool:
+    # Write-behind batching when enabled; otherwise (or if the queue is saturated) a direct
+    # idempotent insert, where duplicates hit the unique constraint as a no-op
+    batcher = get_mark_batcher()
+    if batcher is not None:
+        created = batcher.submit(class_session_id, student_id)
+        if created is not None:
+            return created
+    created = insert_attendance(class_session_id, student_id)
+    db.session.commit()
+    return created
 
 # --------- Lecturer: Sessions for a Section ---------
 @attendance_bp.route('/lecturer/sections/<int:section_id>/sessions', methods=['GET', 'POST'], endpoint='lecturer_sessions')
@@ -86,6 +97,8 @@ def lecturer_sessions(section_id: int):
                 status='scheduled'
             )
             db.session.add(sess)
+            db.session.flush()
+            sessions_created({section.id: 1})
             db.session.commit()
             flash('Class session created.', 'success')
         except Exception as e:
@@ -93,59 +106,85 @@ def lecturer_sessions(section_id: int):
             flash(f'Failed to create session: {e}', 'danger')
         return redirect(url_for('attendance.lecturer_sessions', section_id=section.id))
 
+    # Read-only: expired sessions are closed by the auto-close scheduler (app/attendance/autoclose.py)
     sessions = ClassSession.query.filter_by(section_id=section.id).order_by(ClassSession.scheduled_start.desc()).all()
-    
-    # Soft auto-close expired open sessions (based on scheduled_end and TTL)
     now_utc = datetime.utcnow()
     ttl_minutes = current_app.config.get('ATTENDANCE_CODE_TTL_MINUTES', 15)
-    changed = False
-    for s in sessions:
-        if s.status == 'open':
-            # Compute expiry: min(scheduled_end, opened_at + TTL) when opened_at exists
-            if s.opened_at:
-                expires_at = min(s.scheduled_end, s.opened_at + timedelta(minutes=ttl_minutes))
-            else:
-                expires_at = s.scheduled_end
-            if now_utc > expires_at:
-                s.status = 'closed'
-                s.closed_at = now_utc
-                changed = True
-    if changed:
-        db.session.commit()
     
     opened_code = request.args.get('code')
     opened_session_id = request.args.get('opened_session_id', type=int)
-    qr_svg = None
+    qr_url = None
     opened_attendee_count = None
     opened_expires_at = None
     if opened_code and opened_session_id:
-        # Build QR payload deep link (absolute URL): /student/sessions/{id}/mark?code=NNNNNN
-        base_url = (current_app.config.get('BASE_URL') or request.url_root).rstrip('/')
-        path = url_for('attendance.student_mark', session_id=opened_session_id)
-        payload_url = f"{base_url}{path}?code={opened_code}"
-        qr = segno.make(payload_url)
-        # data URI SVG for easy embedding
-        qr_svg = qr.svg_data_uri(scale=5)
-        # Count attendees for this opened session
-        opened_attendee_count = AttendanceRecord.query.filter_by(class_session_id=opened_session_id).count()
+        # QR image is served (and cached) separately by attendance.session_qr
+        qr_url = url_for('attendance.session_qr', session_id=opened_session_id, fmt='svg', code=opened_code)
+        # Count attendees for this opened session (served from the live counter after the first load)
+        opened_attendee_count = get_live().snapshot(opened_session_id)['count']
         # Compute expiry time for banner display
         opened_sess = next((s for s in sessions if s.id == opened_session_id), None)
         if opened_sess:
-            if opened_sess.opened_at:
-                opened_expires_at = min(opened_sess.scheduled_end, opened_sess.opened_at + timedelta(minutes=ttl_minutes))
-            else:
-                opened_expires_at = opened_sess.scheduled_end
+            opened_expires_at = session_expires_at(opened_sess.opened_at, opened_sess.scheduled_end, ttl_minutes)
     
     return render_template('lecturer_sessions.html',
                            section=section,
                            sessions=sessions,
                            opened_code=opened_code,
                            opened_session_id=opened_session_id,
-                           qr_svg=qr_svg,
+                           qr_url=qr_url,
+                           qr_rotate_seconds=current_app.config['ATTENDANCE_QR_ROTATE_SECONDS'] if current_app.config.get('ATTENDANCE_QR_TOKENS') else 0,
                            opened_attendee_count=opened_attendee_count,
                            opened_expires_at=opened_expires_at,
                            now_utc=now_utc)
 
+def _open_session_record(session_id: int):
+    """Open-session record from the registry, or from the DB while this worker's registry has not caught up."""
+    sess = get_registry().get(session_id)
+    if sess is None:
+        db_sess = db.session.get(ClassSession, session_id)
+        if db_sess is not None and db_sess.status == 'open' and db_sess.open_code_hash:
+            sess = open_session_from_model(db_sess)
+    return sess
+
+
+def _qr_payload_url(sess, code: str) -> str:
+    # QR payload deep link (absolute URL): /student/sessions/{id}/mark?code=NNNNNN,
+    # or ?t=<signed token> for the current rotation window when QR tokens are enabled
+    base_url = (current_app.config.get('BASE_URL') or request.url_root).rstrip('/')
+    path = url_for('attendance.student_mark', session_id=sess.id)
+    if current_app.config.get('ATTENDANCE_QR_TOKENS'):
+        return f"{base_url}{path}?t={make_qr_token(sess.id, sess.section_id, sess.expires_at)}"
+    return f"{base_url}{path}?code={code}"
+
+
+@attendance_bp.route('/lecturer/sessions/<int:session_id>/qr.<fmt>', methods=['GET'], endpoint='session_qr')
+@login_required
+def session_qr(session_id: int, fmt: str):
+    guard = _require_roles('lecturer', 'ta')
+    if guard:
+        return guard
+    if fmt not in QR_MIMETYPES:
+        abort(404)
+
+    sess = _open_session_record(session_id)
+    code = request.args.get('code', '')
+    if sess is None or not verify_open_code(sess.code_hash, code, session_id):
+        abort(404)
+    if not _is_section_manager(db.session.get(Section, sess.section_id)):
+        abort(403)
+
+    data, etag = get_qr_cache().get_or_render(session_id, fmt, _qr_payload_url(sess, code))
+    resp = Response(data, mimetype=QR_MIMETYPES[fmt])
+    resp.set_etag(etag)
+    # The image carries the live code: cacheable by the lecturer's browser only, until the code expires
+    # (or, with rotating tokens, until the current window ends)
+    max_age = max(0, int((sess.expires_at - datetime.utcnow()).total_seconds()))
+    if current_app.config.get('ATTENDANCE_QR_TOKENS'):
+        max_age = min(max_age, seconds_left_in_window())
+    resp.cache_control.private = True
+    resp.cache_control.max_age = max_age
+    return resp.make_conditional(request)
+
 # --------- Lecturer: Open/Close Session ---------
 @attendance_bp.route('/lecturer/sessions/<int:session_id>/open', methods=['POST'], endpoint='open_session')
 @login_required
@@ -168,16 +207,19 @@ def open_session(session_id: int):
         flash('Session already open.', 'warning')
         return redirect(url_for('attendance.lecturer_sessions', section_id=sess.section_id))
     
-    # Prevent multiple open sessions for the same section
+    # Prevent multiple open sessions for the same section (expired ones no longer count)
+    if close_expired_sessions(section_id=sess.section_id):
+        db.session.commit()
     existing_open = ClassSession.query.filter_by(section_id=sess.section_id, status='open').first()
     if existing_open and existing_open.id != sess.id:
         flash('Another session for this section is already open.', 'danger')
         return redirect(url_for('attendance.lecturer_sessions', section_id=sess.section_id))
     
     code = f"{secrets.randbelow(1_000_000):06d}"
-    sess.open_code_hash = generate_password_hash(code)
+    sess.open_code_hash = hash_open_code(code, sess.id)
     sess.status = 'open'
     sess.opened_at = datetime.utcnow()
+    sessions_changed()
     db.session.commit()
     current_app.logger.info(f"session_opened section_id={sess.section_id} session_id={sess.id} by_user={current_user.id}")
     flash('Session opened. Code generated.', 'success')
@@ -202,83 +244,232 @@ def close_session(session_id: int):
 
     sess.status = 'closed'
     sess.closed_at = datetime.utcnow()
+    sessions_changed()
     db.session.commit()
+    get_live().forget(sess.id)
+    get_qr_cache().evict_session(sess.id)
     current_app.logger.info(f"session_closed section_id={sess.section_id} session_id={sess.id} by_user={current_user.id}")
     flash('Session closed.', 'success')
     return redirect(url_for('attendance.lecturer_sessions', section_id=sess.section_id))
 
-# --------- Student: Mark Attendance ---------
-@attendance_bp.route('/student/sessions/<int:session_id>/mark', methods=['GET', 'POST'], endpoint='student_mark')
+# --------- Lecturer: Live attendee counter (SSE / long-poll) ---------
+@attendance_bp.route('/lecturer/sessions/<int:session_id>/live', methods=['GET'], endpoint='session_live')
 @login_required
-def student_mark(session_id: int):
-    guard = _require_role('student')
+def session_live(session_id: int):
+    """Stream the present count and latest arrivals for a session.
+
+    Default is a text/event-stream (one event per change, keepalive comments in between,
+    closed after LIVE_STREAM_MAX_SECONDS so EventSource reconnects). With ?format=json it
+    returns one snapshot; adding since=<seq>&wait=<seconds> long-polls until the count moves.
+    """
+    guard = _require_roles('lecturer', 'ta')
     if guard:
         return guard
 
     sess = ClassSession.query.get_or_404(session_id)
-    
-    # Must be open
-    if sess.status != 'open' or not sess.open_code_hash:
-        flash('Session is not open for marking.', 'danger')
-        return redirect(url_for('student.student_sessions'))
-    
+    if not _is_section_manager(sess.section):
+        return jsonify({'error': 'forbidden'}), 403
+
+    live = get_live()
+    if request.args.get('format') == 'json':
+        since = request.args.get('since', type=int)
+        wait = min(request.args.get('wait', 0, type=float), 30.0)
+        if since is not None and wait > 0 and live.snapshot(session_id)['seq'] == since:
+            # Nothing loaded so far is needed after the wait, so do not hold the transaction through it
+            db.session.rollback()
+            live.wait(session_id, since, wait)
+        return jsonify(live.snapshot(session_id))
+
+    app = current_app._get_current_object()
+    max_seconds = app.config.get('LIVE_STREAM_MAX_SECONDS', 300)
+
+    def stream():
+        with app.app_context():
+            started = time.monotonic()
+            last_seq = None
+            while time.monotonic() - started < max_seconds:
+                snap = live.snapshot(session_id)
+                if snap['seq'] != last_seq:
+                    last_seq = snap['seq']
+                    yield f"data: {json.dumps(snap)}\n\n"
+                else:
+                    yield ": keepalive\n\n"
+                closed = _open_session_record(session_id) is None
+                # End the read transaction so the stream does not pin a connection between events
+                db.session.rollback()
+                if closed:
+                    yield "event: closed\ndata: {}\n\n"
+                    return
+                live.wait(session_id, last_seq, min(15.0, max(0.0, max_seconds - (time.monotonic() - started))))
+
+    resp = Response(stream(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+# --------- Student: Mark Attendance ---------
+# Mark outcomes -> (message, flash category, HTTP status for the JSON API)
+_MARK_OUTCOMES = {
+    'recorded': ('Attendance recorded as present.', 'success', 200),
+    'duplicate': ('Attendance already recorded for this session.', 'info', 200),
+    'not_found': ('Session not found.', 'danger', 404),
+    'not_open': ('Session is not open for marking.', 'danger', 409),
+    'not_enrolled': ('You are not enrolled in this section.', 'danger', 403),
+    'expired': ('Session has expired for marking.', 'danger', 410),
+    'rate_limited': ('Too many attempts. Please wait a moment and try again.', 'warning', 429),
+    'invalid_code': ('Invalid code format.', 'danger', 400),
+    'wrong_code': ('Incorrect code.', 'danger', 400),
+    'invalid_token': ('This QR code is invalid or has been replaced. Scan the current code or type the 6-digit code.', 'danger', 400),
+}
+# Outcomes after which the student stays on the mark page to try again
+_MARK_RETRY_OUTCOMES = ('rate_limited', 'invalid_code', 'wrong_code', 'invalid_token')
+
+
+def _check_qr_token(session_id: int, token: str):
+    """Return (claims or None, blocking outcome or None) for a scanned QR token, without DB access."""
+    claims = verify_qr_token(token)
+    if claims is None or claims.session_id != session_id:
+        current_app.logger.warning(f"invalid_qr_token user_id={current_user.id} session_id={session_id}")
+        return None, 'invalid_token'
+    if not token_is_current(claims):
+        return None, 'expired' if time.time() > claims.expires_at else 'invalid_token'
+    return claims, None
+
+
+def _load_markable_session(session_id: int):
+    """Return (open session record or None, blocking outcome or None) for the current student."""
+    # Open sessions are served from the in-process registry; anything else falls back to the DB
+    sess = get_registry().get(session_id)
+    if sess is None:
+        db_sess = db.session.get(ClassSession, session_id)
+        if db_sess is None:
+            return None, 'not_found'
+        # Must be open
+        if db_sess.status != 'open' or not db_sess.open_code_hash:
+            return None, 'not_open'
+        sess = open_session_from_model(db_sess)
     # Must be enrolled
-    enrolled = Enrollment.query.filter_by(section_id=sess.section_id, student_id=current_user.id).first()
-    if not enrolled:
-        flash('You are not enrolled in this section.', 'danger')
-        return redirect(url_for('student.student_sessions'))
-    
+    if not get_enrollment_index().is_enrolled(sess.section_id, current_user.id):
+        return sess, 'not_enrolled'
     # Enforce TTL and scheduled_end expiry
-    now_utc = datetime.utcnow()
-    ttl_minutes = current_app.config.get('ATTENDANCE_CODE_TTL_MINUTES', 15)
-    if sess.opened_at:
-        expires_at = min(sess.scheduled_end, sess.opened_at + timedelta(minutes=ttl_minutes))
+    if datetime.utcnow() > sess.expires_at:
+        return sess, 'expired'
+    return sess, None
+
+
+def _submit_mark(sess, code: str, token: str = '') -> str:
+    # Rate limit by IP
+    ip = request.headers.get('X-Forwarded-For', request.remote_addr) or 'unknown'
+    if not _rate_limit_ok(ip):
+        current_app.logger.warning(f"rate_limited ip={ip} user_id={current_user.id}")
+        return 'rate_limited'
+    code = (code or '').strip()
+    if token and not code:
+        # A valid signed QR token stands in for the code; a typed code is checked instead
+        claims, outcome = _check_qr_token(sess.id, token)
+        if outcome:
+            return outcome
+        if claims.section_id != sess.section_id:
+            return 'invalid_token'
     else:
-        expires_at = sess.scheduled_end
-    if now_utc > expires_at:
-        flash('Session has expired for marking.', 'danger')
-        return redirect(url_for('student.student_sessions'))
-    
-    prefill_code = request.args.get('code', '')
-    # Check if attendance already recorded to adjust UI and idempotency
-    already_marked = AttendanceRecord.query.filter_by(class_session_id=sess.id, student_id=current_user.id).first() is not None
-    
-    if request.method == 'POST':
-        # Rate limit by IP
-        ip = request.headers.get('X-Forwarded-For', request.remote_addr) or 'unknown'
-        if not _rate_limit_ok(ip):
-            current_app.logger.warning(f"rate_limited ip={ip} user_id={current_user.id}")
-            flash('Too many attempts. Please wait a moment and try again.', 'warning')
-            return redirect(url_for('attendance.student_mark', session_id=session_id))
-        code = request.form.get('code', '').strip()
         if not code or len(code) != 6 or not code.isdigit():
-            flash('Invalid code format.', 'danger')
-            return redirect(url_for('attendance.student_mark', session_id=session_id))
-        if not check_password_hash(sess.open_code_hash, code):
+            return 'invalid_code'
+        if not verify_open_code(sess.code_hash, code, sess.id):
             current_app.logger.warning(f"wrong_code user_id={current_user.id} session_id={sess.id} ip={ip}")
-            flash('Incorrect code.', 'danger')
+            return 'wrong_code'
+        # Sessions opened with the old KDF hash are upgraded on the first correct code
+        if needs_rehash(sess.code_hash):
+            ClassSession.query.filter_by(id=sess.id).update({'open_code_hash': hash_open_code(code, sess.id)})
+            sessions_changed()
+            db.session.commit()
+
+    created = _record_mark(sess.id, current_user.id)
+    if not created:
+        current_app.logger.info(f"attendance_duplicate user_id={current_user.id} session_id={sess.id}")
+        return 'duplicate'
+    current_app.logger.info(f"attendance_recorded user_id={current_user.id} session_id={sess.id}")
+    get_live().record(sess.id, current_user.username, datetime.utcnow())
+    return 'recorded'
+
+
+@attendance_bp.route('/student/sessions/<int:session_id>/mark', methods=['GET', 'POST'], endpoint='student_mark')
+@login_required
+def student_mark(session_id: int):
+    guard = _require_role('student')
+    if guard:
+        return guard
+
+    # Scanned QR tokens are checked before any database read; the typed code still works
+    token = request.args.get('t', '') if request.method == 'GET' else request.form.get('token', '')
+    if token and request.method == 'GET':
+        _, outcome = _check_qr_token(session_id, token)
+        if outcome:
+            flash(_MARK_OUTCOMES[outcome][0], _MARK_OUTCOMES[outcome][1])
             return redirect(url_for('attendance.student_mark', session_id=session_id))
+
+    sess, outcome = _load_markable_session(session_id)
+    if outcome == 'not_found':
+        abort(404)
+    if outcome:
+        flash(_MARK_OUTCOMES[outcome][0], _MARK_OUTCOMES[outcome][1])
+        return redirect(url_for('student.student_sessions'))
     
-        if already_marked:
-            flash('Attendance already recorded for this session.', 'info')
-            return redirect(url_for('student.student_sessions'))
-    
-        try:
-            rec = AttendanceRecord(class_session_id=sess.id, student_id=current_user.id, status='present')
-            db.session.add(rec)
-            db.session.commit()
-        except IntegrityError:
-            db.session.rollback()
-            # Another parallel request inserted it; treat as idempotent success
-            current_app.logger.info(f"attendance_duplicate user_id={current_user.id} session_id={sess.id}")
-            flash('Attendance already recorded for this session.', 'info')
-            return redirect(url_for('student.student_sessions'))
-        current_app.logger.info(f"attendance_recorded user_id={current_user.id} session_id={sess.id}")
-        flash('Attendance recorded as present.', 'success')
+    if request.method == 'POST':
+        outcome = _submit_mark(sess, request.form.get('code', ''), token)
+        message, category, _ = _MARK_OUTCOMES[outcome]
+        flash(message, category)
+        if outcome in _MARK_RETRY_OUTCOMES:
+            return redirect(url_for('attendance.student_mark', session_id=session_id))
         return redirect(url_for('student.student_sessions'))
     
-    return render_template('student_mark_attendance.html', session=sess, prefill_code=prefill_code, already_marked=already_marked)
+    prefill_code = request.args.get('code', '')
+    # Check if attendance already recorded to adjust UI
+    already_marked = AttendanceRecord.query.filter_by(class_session_id=sess.id, student_id=current_user.id).first() is not None
+    return render_template('student_mark_attendance.html', session=sess, prefill_code=prefill_code,
+                           qr_token=token, already_marked=already_marked)
+
+
+@attendance_bp.route('/api/student/sessions/<int:session_id>/mark', methods=['POST'], endpoint='student_mark_api')
+@login_required
+def student_mark_api(session_id: int):
+    """JSON variant of student_mark: one request, one structured result, no redirect."""
+    if current_user.role != 'student':
+        return jsonify({'outcome': 'forbidden', 'message': 'Access denied.'}), 403
+
+    payload = request.get_json(silent=True) or {}
+    code = payload.get('code') or request.form.get('code', '')
+    token = payload.get('token') or request.form.get('token', '')
+    outcome = None
+    if token and not code:
+        _, outcome = _check_qr_token(session_id, token)
+    if not outcome:
+        sess, outcome = _load_markable_session(session_id)
+    if not outcome:
+        outcome = _submit_mark(sess, code, token)
+    message, _, status = _MARK_OUTCOMES[outcome]
+    return jsonify({
+        'outcome': outcome,
+        'message': message,
+        'session_id': session_id,
+        'redirect': url_for('student.student_sessions'),
+    }), status
+
 # --------- Lecturer: Session Attendance Review and CSV ---------
+def _session_roster_stmt(sess: ClassSession):
+    """(student id, username, email, present, recorded_at) per enrolled student, in enrollment order.
+
+    One LEFT JOIN of enrollment -> user -> attendance_record, so no per-student lazy loads.
+    """
+    return (select(User.id, User.username, User.email,
+                   AttendanceRecord.id.isnot(None).label('present'), AttendanceRecord.recorded_at)
+            .select_from(Enrollment)
+            .join(User, User.id == Enrollment.student_id)
+            .outerjoin(AttendanceRecord, and_(AttendanceRecord.class_session_id == sess.id,
+                                              AttendanceRecord.student_id == Enrollment.student_id))
+            .where(Enrollment.section_id == sess.section_id)
+            .order_by(Enrollment.id))
+
+
 @attendance_bp.route('/lecturer/sessions/<int:session_id>/attendance', methods=['GET'], endpoint='lecturer_session_attendance')
 @login_required
 def lecturer_session_attendance(session_id: int):
@@ -292,22 +483,15 @@ def lecturer_session_attendance(session_id: int):
         flash('You may only review attendance for your assigned sections.', 'danger')
         return redirect(url_for('ta.ta_sections') if getattr(current_user, 'role', None) == 'ta' else url_for('lecturer.lecturer_sections'))
 
-    enrollments = Enrollment.query.filter_by(section_id=section.id).all()
-    present_records = AttendanceRecord.query.filter_by(class_session_id=sess.id).all()
-    present_ids = {rec.student_id for rec in present_records}
-
-    students = []
-    for enr in enrollments:
-        stu = enr.student
-        students.append({
-            'id': stu.id,
-            'username': stu.username,
-            'email': stu.email,
-            'status': 'present' if stu.id in present_ids else 'absent'
-        })
+    students = [{
+        'id': student_id,
+        'username': username,
+        'email': email,
+        'status': 'present' if is_present else 'absent'
+    } for student_id, username, email, is_present, _ in db.session.execute(_session_roster_stmt(sess))]
 
-    total = len(enrollments)
-    present = len(present_ids)
+    total = len(students)
+    present = sum(1 for stu in students if stu['status'] == 'present')
     pct = (present / total * 100.0) if total else 0.0
 
     return render_template(
@@ -334,38 +518,25 @@ def lecturer_session_attendance_csv(session_id: int):
         flash('You may only export attendance for your assigned sections.', 'danger')
         return redirect(url_for('ta.ta_sections') if getattr(current_user, 'role', None) == 'ta' else url_for('lecturer.lecturer_sections'))
 
-    enrollments = Enrollment.query.filter_by(section_id=section.id).all()
-    recs = AttendanceRecord.query.filter_by(class_session_id=sess.id).all()
-    rec_map = {r.student_id: r for r in recs}
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
+    header = [
         'session_id', 'section_code', 'scheduled_start', 'scheduled_end',
         'student_id', 'username', 'email', 'status', 'recorded_at'
-    ])
-
-    for enr in enrollments:
-        stu = enr.student
-        rec = rec_map.get(stu.id)
-        status = 'present' if rec else 'absent'
-        recorded_at = rec.recorded_at.isoformat(timespec='seconds') if rec else ''
-        writer.writerow([
-            sess.id,
-            section.section_code,
-            sess.scheduled_start.isoformat(timespec='minutes'),
-            sess.scheduled_end.isoformat(timespec='minutes'),
-            stu.id,
-            stu.username,
-            stu.email,
-            status,
-            recorded_at
-        ])
-
-    resp = make_response(output.getvalue())
-    resp.headers['Content-Type'] = 'text/csv; charset=utf-8'
-    resp.headers['Content-Disposition'] = f'attachment; filename="session_{sess.id}_attendance.csv"'
-    return resp
+    ]
+    # One row per enrolled student, streamed straight off the cursor
+    session_cols = [
+        sess.id,
+        section.section_code,
+        sess.scheduled_start.isoformat(timespec='minutes'),
+        sess.scheduled_end.isoformat(timespec='minutes'),
+    ]
+    rows = (session_cols + [
+        student_id,
+        username,
+        email,
+        'present' if is_present else 'absent',
+        recorded_at.isoformat(timespec='seconds') if recorded_at else ''
+    ] for student_id, username, email, is_present, recorded_at in stream_rows(_session_roster_stmt(sess)))
+    return csv_response(header, rows, f'session_{sess.id}_attendance.csv')
 
 
 # --------- Admin: Section Attendance Overview and CSV ---------
@@ -376,25 +547,38 @@ def admin_section_attendance(section_id: int):
     if guard:
         return guard
 
-    section = Section.query.get_or_404(section_id)
-    sessions = ClassSession.query.filter_by(section_id=section.id).order_by(ClassSession.scheduled_start.desc()).all()
+    section = db.session.get(Section, section_id, options=[joinedload(Section.course)]) or abort(404)
+    after = request.args.get('after', type=int)
+    total_enrolled = Enrollment.query.filter_by(section_id=section.id).count()
+
+    # One keyset page of sessions, newest first, with their precomputed present counts (no summary
+    # row yet means nobody is marked)
+    present_count = func.coalesce(SessionAttendanceSummary.present_count, 0).label('present')
+    page = keyset_page(
+        db.session.query(ClassSession.id, ClassSession.scheduled_start, ClassSession.scheduled_end,
+                         ClassSession.status, present_count)
+        .outerjoin(SessionAttendanceSummary, SessionAttendanceSummary.class_session_id == ClassSession.id)
+        .filter(ClassSession.section_id == section.id),
+        ClassSession.id, after, newest_first_by=ClassSession.scheduled_start
+    )
 
     session_rows = []
-    total_enrolled = Enrollment.query.filter_by(section_id=section.id).count()
-    for sess in sessions:
-        present = AttendanceRecord.query.filter_by(class_session_id=sess.id).count()
-        pct = (present / total_enrolled * 100.0) if total_enrolled else 0.0
+    for row in page.items:
+        pct = (row.present / total_enrolled * 100.0) if total_enrolled else 0.0
         session_rows.append({
-            'session': sess,
-            'present': present,
+            'session': row,
+            'present': row.present,
             'total': total_enrolled,
             'pct': pct
         })
 
+    endpoint = 'attendance.admin_section_attendance'
     return render_template(
         'admin_attendance.html',
         section=section,
-        session_rows=session_rows
+        session_rows=session_rows,
+        next_url=url_for(endpoint, section_id=section.id, after=page.next_after) if page.next_after else None,
+        first_url=url_for(endpoint, section_id=section.id) if after else None
     )
 
 
@@ -406,41 +590,48 @@ def admin_section_attendance_csv(section_id: int):
         return guard
 
     section = Section.query.get_or_404(section_id)
-    sessions = ClassSession.query.filter_by(section_id=section.id).order_by(ClassSession.scheduled_start.asc()).all()
-    enrollments = Enrollment.query.filter_by(section_id=section.id).all()
-
-    # Preload attendance into maps for quick lookup
-    attendance_by_session = {}
-    for sess in sessions:
-        recs = AttendanceRecord.query.filter_by(class_session_id=sess.id).all()
-        attendance_by_session[sess.id] = {r.student_id: r for r in recs}
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
+    header = [
         'session_id', 'session_start', 'session_end',
         'student_id', 'username', 'email', 'status', 'recorded_at'
-    ])
-
-    for sess in sessions:
-        rec_map = attendance_by_session.get(sess.id, {})
-        for enr in enrollments:
-            stu = enr.student
-            rec = rec_map.get(stu.id)
-            status = 'present' if rec else 'absent'
-            recorded_at = rec.recorded_at.isoformat(timespec='seconds') if rec else ''
-            writer.writerow([
-                sess.id,
-                sess.scheduled_start.isoformat(timespec='minutes'),
-                sess.scheduled_end.isoformat(timespec='minutes'),
-                stu.id,
-                stu.username,
-                stu.email,
-                status,
-                recorded_at
-            ])
-
-    resp = make_response(output.getvalue())
-    resp.headers['Content-Type'] = 'text/csv; charset=utf-8'
-    resp.headers['Content-Disposition'] = f'attachment; filename="section_{section.id}_attendance.csv"'
-    return resp
\ No newline at end of file
+    ]
+    # Sessions x enrolled students with each student's record (if any), in one streamed query
+    stmt = (select(ClassSession.id, ClassSession.scheduled_start, ClassSession.scheduled_end,
+                   User.id, User.username, User.email, AttendanceRecord.recorded_at)
+            .select_from(ClassSession)
+            .join(Enrollment, Enrollment.section_id == ClassSession.section_id)
+            .join(User, User.id == Enrollment.student_id)
+            .outerjoin(AttendanceRecord, and_(AttendanceRecord.class_session_id == ClassSession.id,
+                                              AttendanceRecord.student_id == Enrollment.student_id))
+            .where(ClassSession.section_id == section.id)
+            .order_by(ClassSession.scheduled_start.asc(), ClassSession.id, Enrollment.id))
+    rows = ([
+        session_id,
+        start.isoformat(timespec='minutes'),
+        end.isoformat(timespec='minutes'),
+        student_id,
+        username,
+        email,
+        'present' if recorded_at else 'absent',
+        recorded_at.isoformat(timespec='seconds') if recorded_at else ''
+    ] for session_id, start, end, student_id, username, email, recorded_at in stream_rows(stmt))
+    return csv_response(header, rows, f'section_{section.id}_attendance.csv')
+
+@attendance_bp.route('/admin/attendance/export.csv', methods=['GET'], endpoint='admin_attendance_export')
+@login_required
+def admin_attendance_export():
+    """Institution-wide attendance matrix, optionally limited to a department/course/date range."""
+    guard = _require_role('admin')
+    if guard:
+        return guard
+
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+    except ValueError:
+        abort(400)
+    department_id = request.args.get('department_id', type=int)
+    course_id = request.args.get('course_id', type=int)
+    rows = iter_attendance_matrix(department_id, course_id, start, end)
+    scope = f'department_{department_id}' if department_id else (f'course_{course_id}' if course_id else 'all')
+    return csv_response(MATRIX_HEADER, rows, f'attendance_{scope}.csv',
+                        compress=request.args.get('gzip') == '1')
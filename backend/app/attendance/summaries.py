@@ -0,0 +1,223 @@
+"""Precomputed attendance counters read by the dashboards.
+
+Three tables are kept in step with the raw rows, inside the same transaction as the write:
+
+- section_attendance_summary: sessions per section (bumped when sessions are created)
+- session_attendance_summary: students present per session (bumped with each new mark)
+- student_section_summary: sessions a student attended per section (bumped with each new mark)
+
+A missing summary row is created from a COUNT over the raw rows, so counters self-heal the
+first time they are touched. On startup, empty summary tables in a database that already
+has sessions (the first start after upgrading) are filled with backfill_summaries.
+`flask rebuild-summaries` recomputes everything (use --check to only report drift, e.g.
+from a cron job).
+"""
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, update, insert, delete, func, literal, bindparam
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import (ClassSession, AttendanceRecord, SectionAttendanceSummary,
+                        SessionAttendanceSummary, StudentSectionSummary)
+
+_sections = SectionAttendanceSummary.__table__
+_sessions = SessionAttendanceSummary.__table__
+_students = StudentSectionSummary.__table__
+
+
+def _bump(stmt, seed):
+    """Run the counter UPDATE; if no row matched, create the row from the raw counts."""
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(seed)
+    except IntegrityError:
+        # Another writer created the row first
+        db.session.execute(stmt)
+
+
+def _session_present_count(session_id):
+    return (select(func.count(AttendanceRecord.id))
+            .where(AttendanceRecord.class_session_id == session_id)
+            .scalar_subquery())
+
+
+def _student_present_count(section_id, student_id):
+    return (select(func.count(AttendanceRecord.id))
+            .join(ClassSession, ClassSession.id == AttendanceRecord.class_session_id)
+            .where(ClassSession.section_id == section_id, AttendanceRecord.student_id == student_id)
+            .scalar_subquery())
+
+
+def _bump_session(session_id: int, n: int):
+    _bump(
+        update(_sessions).where(_sessions.c.class_session_id == session_id)
+        .values(present_count=_sessions.c.present_count + n),
+        insert(_sessions).from_select(
+            ['class_session_id', 'section_id', 'present_count'],
+            select(ClassSession.id, ClassSession.section_id, _session_present_count(ClassSession.id))
+            .where(ClassSession.id == session_id)),
+    )
+
+
+def _bump_student(section_id, student_id, n: int):
+    # section_id may be a scalar subquery (single marks resolve it from the session in SQL)
+    _bump(
+        update(_students).where(_students.c.section_id == section_id, _students.c.student_id == student_id)
+        .values(present_count=_students.c.present_count + n),
+        insert(_students).from_select(
+            ['section_id', 'student_id', 'present_count'],
+            select(section_id, literal(student_id), _student_present_count(section_id, student_id))),
+    )
+
+
+def mark_recorded(session_id: int, student_id: int):
+    """Count one newly inserted attendance row. Does not commit."""
+    _bump_session(session_id, 1)
+    section_id = (select(ClassSession.section_id).where(ClassSession.id == session_id)
+                  .scalar_subquery().correlate(None))
+    _bump_student(section_id, student_id, 1)
+
+
+def marks_recorded(pairs: Iterable[Tuple[int, int]]):
+    """Count many newly inserted (class_session_id, student_id) rows. Does not commit."""
+    pairs = list(pairs)
+    if not pairs:
+        return
+    per_session = Counter(session_id for session_id, _ in pairs)
+    section_of = dict(db.session.query(ClassSession.id, ClassSession.section_id)
+                      .filter(ClassSession.id.in_(per_session)).all())
+    for session_id, n in per_session.items():
+        _bump_session(session_id, n)
+
+    per_student = Counter((section_of[session_id], student_id) for session_id, student_id in pairs)
+    existing = set(db.session.query(StudentSectionSummary.section_id, StudentSectionSummary.student_id)
+                   .filter(StudentSectionSummary.section_id.in_({k[0] for k in per_student}),
+                           StudentSectionSummary.student_id.in_({k[1] for k in per_student})).all())
+    params = [{'b_section': sec, 'b_student': stu, 'b_n': n}
+              for (sec, stu), n in per_student.items() if (sec, stu) in existing]
+    if params:
+        db.session.execute(
+            update(_students)
+            .where(_students.c.section_id == bindparam('b_section'), _students.c.student_id == bindparam('b_student'))
+            .values(present_count=_students.c.present_count + bindparam('b_n')),
+            params)
+    for (sec, stu), n in per_student.items():
+        if (sec, stu) not in existing:
+            _bump_student(sec, stu, n)
+
+
+def sessions_created(counts: Dict[int, int]):
+    """Count newly created sessions, given {section_id: number created}. Does not commit."""
+    for section_id, n in counts.items():
+        if not n:
+            continue
+        _bump(
+            update(_sections).where(_sections.c.section_id == section_id)
+            .values(session_count=_sections.c.session_count + n),
+            insert(_sections).from_select(
+                ['section_id', 'session_count'],
+                select(literal(section_id), func.count(ClassSession.id)).where(ClassSession.section_id == section_id)),
+        )
+
+
+def section_deleted(section_id: int):
+    """Drop a section's summary rows (its sessions and records are deleted with it). Does not commit."""
+    for table in (_students, _sessions, _sections):
+        db.session.execute(delete(table).where(table.c.section_id == section_id))
+
+
+def student_deleted(student_id: int):
+    """Uncount a student's records before the student (and their records) are deleted. Does not commit."""
+    theirs = (select(func.count(AttendanceRecord.id))
+              .where(AttendanceRecord.class_session_id == _sessions.c.class_session_id,
+                     AttendanceRecord.student_id == student_id)
+              .scalar_subquery())
+    db.session.execute(
+        update(_sessions)
+        .where(_sessions.c.class_session_id.in_(
+            select(AttendanceRecord.class_session_id).where(AttendanceRecord.student_id == student_id)))
+        .values(present_count=_sessions.c.present_count - theirs))
+    db.session.execute(delete(_students).where(_students.c.student_id == student_id))
+
+
+def _expected():
+    sections = {sec: {'session_count': n} for sec, n in db.session.execute(
+        select(ClassSession.section_id, func.count(ClassSession.id)).group_by(ClassSession.section_id))}
+    sessions = {sid: {'section_id': sec, 'present_count': n} for sid, sec, n in db.session.execute(
+        select(AttendanceRecord.class_session_id, ClassSession.section_id, func.count(AttendanceRecord.id))
+        .join(ClassSession, ClassSession.id == AttendanceRecord.class_session_id)
+        .group_by(AttendanceRecord.class_session_id, ClassSession.section_id))}
+    students = {(sec, stu): {'present_count': n} for sec, stu, n in db.session.execute(
+        select(ClassSession.section_id, AttendanceRecord.student_id, func.count(AttendanceRecord.id))
+        .join(ClassSession, ClassSession.id == AttendanceRecord.class_session_id)
+        .group_by(ClassSession.section_id, AttendanceRecord.student_id))}
+    return {
+        _sections: (sections, lambda r: r.section_id),
+        _sessions: (sessions, lambda r: r.class_session_id),
+        _students: (students, lambda r: (r.section_id, r.student_id)),
+    }
+
+
+def _is_zero(values: dict) -> bool:
+    return all(v == 0 for k, v in values.items() if k.endswith('_count'))
+
+
+def rebuild_summaries(check: bool = False) -> Dict[str, int]:
+    """Recompute all summary rows from the raw tables; return mismatched rows per table.
+
+    With check=True nothing is written. Otherwise the tables are replaced. Does not commit.
+    """
+    drift = {}
+    for table, (expected, key_of) in _expected().items():
+        stored = {key_of(r): {c: getattr(r, c) for c in r._fields if c in table.c and not table.c[c].primary_key}
+                  for r in db.session.execute(select(table))}
+        # A stored all-zero row is equivalent to a missing one
+        keys = set(expected) | {k for k, v in stored.items() if not _is_zero(v)}
+        drift[table.name] = sum(1 for k in keys if stored.get(k) != expected.get(k))
+        if not check:
+            db.session.execute(delete(table))
+            pk = [c.name for c in table.primary_key.columns]
+            rows = [dict(zip(pk, k if isinstance(k, tuple) else (k,)), **v) for k, v in expected.items()]
+            if rows:
+                db.session.execute(insert(table), rows)
+    return drift
+
+
+def backfill_summaries() -> bool:
+    """Rebuild the summaries if they are empty while sessions exist; return True if it ran. Commits."""
+    if db.session.execute(select(_sections.c.section_id).limit(1)).first() is not None:
+        return False
+    if db.session.execute(select(ClassSession.id).limit(1)).first() is None:
+        return False
+    try:
+        rebuild_summaries()
+        db.session.commit()
+    except IntegrityError:
+        # Another worker starting at the same time filled them first
+        db.session.rollback()
+        return False
+    return True
+
+
+@click.command('rebuild-summaries')
+@click.option('--check', is_flag=True, help='Only report rows that disagree with the raw tables')
+@with_appcontext
+def rebuild_summaries_command(check):
+    """Recompute the attendance summary tables from attendance records and sessions."""
+    drift = rebuild_summaries(check=check)
+    if not check:
+        db.session.commit()
+    for name, count in drift.items():
+        click.echo(f'{name}: {count} row(s) {"out of date" if check else "corrected"}')
+    if check and any(drift.values()):
+        raise SystemExit(1)
+
+
+def init_app(app):
+    app.cli.add_command(rebuild_summaries_command)
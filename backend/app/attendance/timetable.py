@@ -0,0 +1,97 @@
+"""Expansion of Timetable entries into dated ClassSessions for a term.
+
+Timetable rows belong to a course; every section of that course gets one session per
+matching weekday between the term start and end dates (inclusive). Sessions that already
+exist for the same section and start time are skipped, so the generator can be re-run.
+
+    flask generate-sessions --start 2026-09-07 --end 2026-12-18 [--course-id N] [--dry-run]
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import Timetable, Section, ClassSession
+from app.attendance.summaries import sessions_created
+
+_WEEKDAYS = {name: i for i, name in enumerate(
+    ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'])}
+_INSERT_CHUNK = 1000
+
+
+def generate_term_sessions(term_start: date, term_end: date,
+                           course_ids: Optional[Iterable[int]] = None,
+                           dry_run: bool = False) -> dict:
+    """Create scheduled sessions for all sections of timetabled courses. Does not commit.
+
+    Returns counts: {'created', 'existing', 'invalid_entries'}.
+    """
+    q = (db.session.query(Timetable.day_of_week, Timetable.start_time, Timetable.end_time, Section.id)
+         .join(Section, Section.course_id == Timetable.course_id))
+    if course_ids:
+        q = q.filter(Timetable.course_id.in_(list(course_ids)))
+
+    # Dates in the term for each weekday
+    dates_by_weekday = {i: [] for i in range(7)}
+    day = term_start
+    while day <= term_end:
+        dates_by_weekday[day.weekday()].append(day)
+        day += timedelta(days=1)
+
+    candidates = {}
+    invalid = 0
+    for day_name, start_time, end_time, section_id in q.all():
+        weekday = _WEEKDAYS.get((day_name or '').strip().lower())
+        if weekday is None or end_time <= start_time:
+            invalid += 1
+            continue
+        for d in dates_by_weekday[weekday]:
+            start = datetime.combine(d, start_time)
+            candidates[(section_id, start)] = datetime.combine(d, end_time)
+
+    result = {'created': 0, 'existing': 0, 'invalid_entries': invalid}
+    if not candidates:
+        return result
+
+    # Set-based diff against sessions already in the term window
+    existing_q = (db.session.query(ClassSession.section_id, ClassSession.scheduled_start)
+                  .filter(ClassSession.scheduled_start >= datetime.combine(term_start, datetime.min.time()),
+                          ClassSession.scheduled_start < datetime.combine(term_end + timedelta(days=1),
+                                                                          datetime.min.time())))
+    if course_ids:
+        existing_q = existing_q.filter(ClassSession.section_id.in_({k[0] for k in candidates}))
+    existing = set(existing_q.all())
+
+    rows = [{'section_id': section_id, 'scheduled_start': start, 'scheduled_end': end, 'status': 'scheduled'}
+            for (section_id, start), end in sorted(candidates.items()) if (section_id, start) not in existing]
+    result['existing'] = len(candidates) - len(rows)
+    result['created'] = len(rows)
+    if dry_run:
+        return result
+    for i in range(0, len(rows), _INSERT_CHUNK):
+        db.session.execute(insert(ClassSession), rows[i:i + _INSERT_CHUNK])
+    sessions_created(Counter(r['section_id'] for r in rows))
+    return result
+
+
+@click.command('generate-sessions')
+@click.option('--start', 'start', required=True, type=click.DateTime(formats=['%Y-%m-%d']), help='First day of term')
+@click.option('--end', 'end', required=True, type=click.DateTime(formats=['%Y-%m-%d']), help='Last day of term')
+@click.option('--course-id', 'course_ids', multiple=True, type=int, help='Limit to these courses (repeatable)')
+@click.option('--dry-run', is_flag=True, help='Report counts without inserting')
+@with_appcontext
+def generate_sessions_command(start, end, course_ids, dry_run):
+    """Generate the term's class sessions from the timetable."""
+    result = generate_term_sessions(start.date(), end.date(), course_ids=course_ids or None, dry_run=dry_run)
+    if not dry_run:
+        db.session.commit()
+    click.echo(f"{'Would create' if dry_run else 'Created'} {result['created']} session(s); "
+               f"{result['existing']} already existed; {result['invalid_entries']} invalid timetable entries.")
+
+
+def init_app(app):
+    app.cli.add_command(generate_sessions_command)
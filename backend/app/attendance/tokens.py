@@ -0,0 +1,78 @@
+"""Signed QR tokens for attendance deep links.
+
+A token is "<session_id>.<section_id>.<expires_unix>.<window>.<signature>", where the
+signature is an HMAC-SHA256 over the other fields keyed with SECRET_KEY. The window is the
+rotation slot (unix time // ATTENDANCE_QR_ROTATE_SECONDS); a token is accepted during its own
+slot and the next one, so the projected QR can rotate without any database write. Forged,
+expired or stale tokens are rejected without touching the database.
+"""
+import base64
+import calendar
+import hmac
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from flask import current_app
+
+from app.security import hmac_sha256
+
+_CONTEXT = b'attendance-qr-token:v1:'
+
+
+class QRToken(NamedTuple):
+    session_id: int
+    section_id: int
+    expires_at: int
+    window: int
+
+
+def _sign(body: str) -> str:
+    digest = hmac_sha256(_CONTEXT, body.encode('ascii'))
+    return base64.urlsafe_b64encode(digest[:16]).decode('ascii').rstrip('=')
+
+
+def _rotate_seconds() -> int:
+    return int(current_app.config.get('ATTENDANCE_QR_ROTATE_SECONDS', 30))
+
+
+def current_window(now: Optional[float] = None) -> int:
+    rotate = _rotate_seconds()
+    if rotate <= 0:
+        return 0
+    return int((now if now is not None else time.time()) // rotate)
+
+
+def seconds_left_in_window(now: Optional[float] = None) -> int:
+    rotate = _rotate_seconds()
+    if rotate <= 0:
+        return 0
+    now = now if now is not None else time.time()
+    return int(rotate - (now % rotate))
+
+
+def make_qr_token(session_id: int, section_id: int, expires_at: datetime, now: Optional[float] = None) -> str:
+    # expires_at is a naive UTC datetime, like every timestamp stored by the app
+    body = f"{session_id}.{section_id}.{calendar.timegm(expires_at.utctimetuple())}.{current_window(now)}"
+    return f"{body}.{_sign(body)}"
+
+
+def verify_qr_token(token: str, now: Optional[float] = None) -> Optional[QRToken]:
+    """Return the token's claims if the signature checks out, else None (expiry is not checked)."""
+    try:
+        body, sig = (token or '').rsplit('.', 1)
+        session_id, section_id, expires_at, window = (int(p) for p in body.split('.'))
+    except ValueError:
+        return None
+    if not hmac.compare_digest(sig, _sign(body)):
+        return None
+    return QRToken(session_id, section_id, expires_at, window)
+
+
+def token_is_current(claims: QRToken, now: Optional[float] = None) -> bool:
+    now = now if now is not None else time.time()
+    if now > claims.expires_at:
+        return False
+    if _rotate_seconds() <= 0:
+        return True
+    return current_window(now) - claims.window in (0, 1)
@@ -0,0 +1,146 @@
+"""Optional write-behind batching for attendance marks.
+
+With ATTENDANCE_WRITE_BEHIND enabled, student_mark hands validated marks to a bounded
+in-process queue instead of committing its own transaction. A single flusher thread drains
+the queue every ATTENDANCE_WRITE_BEHIND_MAX_DELAY_MS or ATTENDANCE_WRITE_BEHIND_MAX_BATCH
+marks, whichever comes first, and writes the batch with one executemany and one commit.
+Each request blocks until its batch is committed, so a success response still means the
+mark is durable. When the queue is full or the wait times out, callers fall back to the
+direct idempotent insert; a mark that timed out before the flusher took it is abandoned
+and skipped by the flusher.
+
+Metrics: write_behind.queue_depth (gauge), write_behind.batch_size and write_behind.flush
+(observations), write_behind.fallbacks (counter).
+"""
+import queue
+import threading
+import time
+from typing import Optional
+
+from flask import current_app
+
+from app.extensions import db
+from app.metrics import get_metrics
+from app.attendance.marks import insert_attendance_batch
+
+_EXTENSION_KEY = 'mark_batcher'
+
+
+class _PendingMark:
+    __slots__ = ('class_session_id', 'student_id', 'state', 'done', 'created', 'error')
+
+    def __init__(self, class_session_id: int, student_id: int):
+        self.class_session_id = class_session_id
+        self.student_id = student_id
+        self.state = 'queued'  # -> 'claimed' by the flusher, or 'abandoned' by a timed-out submit
+        self.done = threading.Event()
+        self.created = None
+        self.error = None
+
+
+class MarkBatcher:
+    def __init__(self, app, max_batch: int, max_delay_ms: int, queue_size: int, timeout_seconds: float):
+        self._app = app
+        self._max_batch = max(1, max_batch)
+        self._max_delay = max(0, max_delay_ms) / 1000.0
+        self._timeout = timeout_seconds
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._start_lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='attendance-write-behind', daemon=True)
+                self._thread.start()
+
+    def submit(self, class_session_id: int, student_id: int) -> Optional[bool]:
+        """Queue a mark and wait for its batch to commit.
+
+        Returns True/False for created/duplicate, or None when the mark was not handled
+        (queue full or timed out) and the caller should write it directly.
+        """
+        self._ensure_started()
+        metrics = get_metrics()
+        item = _PendingMark(class_session_id, student_id)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            metrics.inc('write_behind.fallbacks')
+            return None
+        metrics.set_gauge('write_behind.queue_depth', self._queue.qsize())
+        if not item.done.wait(self._timeout):
+            with self._claim_lock:
+                if item.state == 'queued':
+                    item.state = 'abandoned'
+            # Once claimed the mark is part of a batch in flight, so give that batch a chance to finish
+            if item.state == 'abandoned' or not item.done.wait(self._timeout):
+                metrics.inc('write_behind.fallbacks')
+                return None
+        if item.error is not None:
+            raise item.error
+        return item.created
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._max_delay
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        with self._claim_lock:
+            batch = [item for item in batch if item.state == 'queued']
+            for item in batch:
+                item.state = 'claimed'
+        if not batch:
+            return
+        with self._app.app_context():
+            metrics = get_metrics()
+            start = time.perf_counter()
+            try:
+                created = insert_attendance_batch((i.class_session_id, i.student_id) for i in batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.exception('write_behind_flush_failed size=%d', len(batch))
+                for item in batch:
+                    item.error = e
+                    item.done.set()
+                return
+            for item in batch:
+                key = (item.class_session_id, item.student_id)
+                # The same student submitting twice within one batch gets created only once
+                item.created = key in created
+                created.discard(key)
+                item.done.set()
+            metrics.observe('write_behind.flush', time.perf_counter() - start)
+            metrics.observe('write_behind.batch_size', len(batch))
+            metrics.set_gauge('write_behind.queue_depth', self._queue.qsize())
+
+
+def init_app(app):
+    if not app.config.get('ATTENDANCE_WRITE_BEHIND'):
+        app.extensions[_EXTENSION_KEY] = None
+        return
+    app.extensions[_EXTENSION_KEY] = MarkBatcher(
+        app,
+        max_batch=app.config.get('ATTENDANCE_WRITE_BEHIND_MAX_BATCH', 200),
+        max_delay_ms=app.config.get('ATTENDANCE_WRITE_BEHIND_MAX_DELAY_MS', 20),
+        queue_size=app.config.get('ATTENDANCE_WRITE_BEHIND_QUEUE_SIZE', 5000),
+        timeout_seconds=app.config.get('ATTENDANCE_WRITE_BEHIND_TIMEOUT_SECONDS', 5.0),
+    )
+
+
+def get_mark_batcher() -> Optional[MarkBatcher]:
+    return current_app.extensions.get(_EXTENSION_KEY)
@@ -3,6 +3,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, current_user, login_required
 from app.models import User
 from app.extensions import db
+from app.ratelimit import get_limiter
+from app.auth.tokens import verify_set_password_token
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -11,6 +13,10 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
+        ip = request.headers.get('X-Forwarded-For', request.remote_addr) or 'unknown'
+        if not get_limiter('login').allow(f'{ip}:{username}'):
+            flash('Too many login attempts. Please wait a moment and try again.', 'warning')
+            return redirect(url_for('auth.login'))
         user = User.query.filter_by(username=username).first()
         if user and check_password_hash(user.password, password):
             if not user.is_approved and user.role != 'admin':
@@ -70,3 +76,23 @@ def register():
         flash('Registration successful! Await admin approval.', 'success')
         return redirect(url_for('auth.login'))
     return render_template('register.html')
+
+@auth_bp.route('/set-password/<token>', methods=['GET', 'POST'], endpoint='set_password')
+def set_password(token):
+    user = verify_set_password_token(token)
+    if user is None:
+        flash('This link is invalid, expired or has already been used.', 'danger')
+        return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        password = request.form.get('password', '')
+        if len(password) < 6:
+            flash('Password must be at least 6 characters.', 'danger')
+        elif password != request.form.get('confirm', ''):
+            flash('Passwords do not match.', 'danger')
+        else:
+            user.password = generate_password_hash(password)
+            db.session.commit()
+            flash('Password set. You can now log in.', 'success')
+            return redirect(url_for('auth.login'))
+        return redirect(url_for('auth.set_password', token=token))
+    return render_template('set_password.html', username=user.username)
@@ -0,0 +1,45 @@
+"""One-time set-password tokens for bulk-imported accounts.
+
+A token is "<user_id>.<expires_unix>.<signature>", where the signature is an HMAC-SHA256
+keyed with SECRET_KEY over the other fields and the user's current password hash. Setting a
+password changes the hash, so a token works once and nothing has to be stored for it.
+Tokens expire after SET_PASSWORD_TOKEN_MAX_AGE_HOURS.
+"""
+import base64
+import hmac
+import time
+from typing import Optional
+
+from flask import current_app
+
+from app.extensions import db
+from app.models import User
+from app.security import hmac_sha256
+
+_CONTEXT = b'set-password-token:v1:'
+
+
+def _sign(body: str, password_hash: str) -> str:
+    digest = hmac_sha256(_CONTEXT, body.encode('ascii') + b':' + (password_hash or '').encode('utf-8'))
+    return base64.urlsafe_b64encode(digest[:18]).decode('ascii')
+
+
+def make_set_password_token(user_id: int, password_hash: str, now: Optional[float] = None) -> str:
+    max_age = current_app.config.get('SET_PASSWORD_TOKEN_MAX_AGE_HOURS', 168) * 3600
+    body = f"{user_id}.{int((now if now is not None else time.time()) + max_age)}"
+    return f"{body}.{_sign(body, password_hash)}"
+
+
+def verify_set_password_token(token: str, now: Optional[float] = None) -> Optional[User]:
+    """Return the token's user if it is genuine, unexpired and unused, else None."""
+    try:
+        body, sig = (token or '').rsplit('.', 1)
+        user_id, expires_at = (int(p) for p in body.split('.'))
+    except ValueError:
+        return None
+    if (now if now is not None else time.time()) > expires_at:
+        return None
+    user = db.session.get(User, user_id)
+    if user is None or not hmac.compare_digest(sig, _sign(body, user.password)):
+        return None
+    return user
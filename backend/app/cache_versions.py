@@ -0,0 +1,28 @@
+"""Shared version counters used to invalidate per-worker in-memory caches.
+
+A writer calls bump() in the same transaction as the change it makes; readers compare
+current() with the version they loaded and rebuild when it moved.
+"""
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import CacheVersion
+
+
+def current(name: str) -> int:
+    value = db.session.query(CacheVersion.version).filter(CacheVersion.name == name).scalar()
+    return value or 0
+
+
+def bump(name: str) -> None:
+    """Increment the named counter. Does not commit; the caller's commit publishes it."""
+    stmt = update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(CacheVersion(name=name, version=1))
+    except IntegrityError:
+        # Another worker created the row first
+        db.session.execute(stmt)
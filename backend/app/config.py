@@ -9,5 +9,46 @@ class Config:
 
     # Attendance code TTL (minutes) for open sessions
     ATTENDANCE_CODE_TTL_MINUTES = int(os.environ.get('ATTENDANCE_CODE_TTL_MINUTES', '15'))
+    # How session codes are stored: 'hmac' (keyed HMAC-SHA256, cheap to verify) or 'kdf' (werkzeug password hash)
+    ATTENDANCE_CODE_HASH_METHOD = os.environ.get('ATTENDANCE_CODE_HASH_METHOD', 'hmac')
+    # Seconds each worker trusts its in-memory open-session registry before re-checking the shared version
+    OPEN_SESSION_REGISTRY_CHECK_SECONDS = float(os.environ.get('OPEN_SESSION_REGISTRY_CHECK_SECONDS', '1'))
+    # Seconds each worker trusts its in-memory enrollment membership index before re-checking the shared version
+    ENROLLMENT_INDEX_CHECK_SECONDS = float(os.environ.get('ENROLLMENT_INDEX_CHECK_SECONDS', '1'))
+    # Write-behind batching for attendance marks (off by default); see app/attendance/writebehind.py
+    ATTENDANCE_WRITE_BEHIND = os.environ.get('ATTENDANCE_WRITE_BEHIND', '0') == '1'
+    ATTENDANCE_WRITE_BEHIND_MAX_BATCH = int(os.environ.get('ATTENDANCE_WRITE_BEHIND_MAX_BATCH', '200'))
+    ATTENDANCE_WRITE_BEHIND_MAX_DELAY_MS = int(os.environ.get('ATTENDANCE_WRITE_BEHIND_MAX_DELAY_MS', '20'))
+    ATTENDANCE_WRITE_BEHIND_QUEUE_SIZE = int(os.environ.get('ATTENDANCE_WRITE_BEHIND_QUEUE_SIZE', '5000'))
+    ATTENDANCE_WRITE_BEHIND_TIMEOUT_SECONDS = float(os.environ.get('ATTENDANCE_WRITE_BEHIND_TIMEOUT_SECONDS', '5'))
+    # Rate limiting (token bucket): 'memory' keeps per-worker state, 'sqlite' shares it across workers on a host
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH', 'ratelimit.db')
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '10000'))
+    STUDENT_MARK_RATE_LIMIT_PER_MINUTE = int(os.environ.get('STUDENT_MARK_RATE_LIMIT_PER_MINUTE', '20'))
+    LOGIN_RATE_LIMIT_PER_MINUTE = int(os.environ.get('LOGIN_RATE_LIMIT_PER_MINUTE', '10'))
+    # Background auto-close of expired open sessions: run the thread in each app process (set 0 when a cron job
+    # runs `flask close-expired-sessions` instead), and seconds between runs (0 also disables the thread)
+    AUTO_CLOSE_SCHEDULER = os.environ.get('AUTO_CLOSE_SCHEDULER', '1') == '1'
+    AUTO_CLOSE_INTERVAL_SECONDS = float(os.environ.get('AUTO_CLOSE_INTERVAL_SECONDS', '60'))
+    # Live attendee counter: re-seed watched counters from the DB this often (other workers' marks), and cap SSE stream length
+    LIVE_RESYNC_SECONDS = float(os.environ.get('LIVE_RESYNC_SECONDS', '15'))
+    LIVE_STREAM_MAX_SECONDS = float(os.environ.get('LIVE_STREAM_MAX_SECONDS', '300'))
+    # Rendered QR images kept per worker (LRU entries)
+    QR_CACHE_SIZE = int(os.environ.get('QR_CACHE_SIZE', '256'))
+    # Signed, rotating QR tokens instead of the plain ?code= deep link (rotation period in seconds)
+    ATTENDANCE_QR_TOKENS = os.environ.get('ATTENDANCE_QR_TOKENS', '0') == '1'
+    ATTENDANCE_QR_ROTATE_SECONDS = int(os.environ.get('ATTENDANCE_QR_ROTATE_SECONDS', '30'))
+    # Enrollment CSV uploads larger than this many bytes are streamed and committed every N rows
+    ENROLLMENT_UPLOAD_STREAM_BYTES = int(os.environ.get('ENROLLMENT_UPLOAD_STREAM_BYTES', str(2 * 1024 * 1024)))
+    ENROLLMENT_UPLOAD_CHUNK_ROWS = int(os.environ.get('ENROLLMENT_UPLOAD_CHUNK_ROWS', '5000'))
+    # Background job threads per worker (0 runs jobs inline in the request) and where uploads are spooled for them
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+    JOB_SPOOL_DIR = os.environ.get('JOB_SPOOL_DIR') or None
+    # Lifetime of the set-password links given to bulk-imported users, and processes used to hash supplied passwords (0 = CPU count)
+    SET_PASSWORD_TOKEN_MAX_AGE_HOURS = float(os.environ.get('SET_PASSWORD_TOKEN_MAX_AGE_HOURS', '168'))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '0'))
+    # User imports with more supplied passwords than this run as a background job
+    USER_IMPORT_INLINE_PASSWORDS = int(os.environ.get('USER_IMPORT_INLINE_PASSWORDS', '200'))
     # Optional absolute base URL for QR deep links (e.g., https://example.edu); falls back to request.url_root
     BASE_URL = os.environ.get('BASE_URL')
@@ -0,0 +1,82 @@
+"""Per-section enrollment membership index.
+
+Each worker keeps a frozenset of student ids per section, built on first use with one
+query. Every enrollment write calls enrollments_changed() before committing, which bumps
+the shared 'enrollments' cache version; workers re-check it at most every
+ENROLLMENT_INDEX_CHECK_SECONDS and drop all built sections when it moved.
+
+Metrics: enrollment_index.hits / .misses (membership answered from a built set vs. a
+section that had to be built) and the enrollment_index.rebuild timing.
+"""
+import threading
+import time
+
+from flask import current_app
+
+from app import cache_versions
+from app.extensions import db
+from app.metrics import get_metrics
+from app.models import Enrollment
+
+VERSION_KEY = 'enrollments'
+_EXTENSION_KEY = 'enrollment_index'
+
+
+class EnrollmentIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sections = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._sections = {}
+            self._version = None
+            self._checked_at = 0.0
+
+    def members(self, section_id: int) -> frozenset:
+        self._maybe_refresh()
+        members = self._sections.get(section_id)
+        metrics = get_metrics()
+        if members is not None:
+            metrics.inc('enrollment_index.hits')
+            return members
+        metrics.inc('enrollment_index.misses')
+        start = time.perf_counter()
+        rows = db.session.query(Enrollment.student_id).filter(Enrollment.section_id == section_id).all()
+        members = frozenset(r[0] for r in rows)
+        metrics.observe('enrollment_index.rebuild', time.perf_counter() - start)
+        with self._lock:
+            self._sections[section_id] = members
+            metrics.set_gauge('enrollment_index.sections', len(self._sections))
+        return members
+
+    def is_enrolled(self, section_id: int, student_id: int) -> bool:
+        return student_id in self.members(section_id)
+
+    def _maybe_refresh(self):
+        interval = current_app.config.get('ENROLLMENT_INDEX_CHECK_SECONDS', 1.0)
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < interval:
+            return
+        version = cache_versions.current(VERSION_KEY)
+        with self._lock:
+            if version != self._version:
+                self._sections = {}
+                self._version = version
+            self._checked_at = now
+
+
+def init_app(app):
+    app.extensions[_EXTENSION_KEY] = EnrollmentIndex()
+
+
+def get_enrollment_index() -> EnrollmentIndex:
+    return current_app.extensions[_EXTENSION_KEY]
+
+
+def enrollments_changed():
+    """Record a change to enrollments. Call before committing the change."""
+    cache_versions.bump(VERSION_KEY)
+    get_enrollment_index().clear()
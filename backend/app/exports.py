@@ -0,0 +1,172 @@
+"""Streaming CSV exports.
+
+Export queries are read through a server-side cursor (yield_per) and the CSV is written out
+a few hundred rows at a time, so memory use and time-to-first-byte stay flat however large
+the export is.
+
+The institution-wide attendance matrix (department, course, section, session, student) is
+read in keyset-paginated chunks of sessions instead, each chunk its own short query, so a
+term-long export never holds one read transaction open. It is available to admins at
+/admin/attendance/export.csv and from the command line:
+
+    flask export-attendance [--department-id N] [--course-id N] [--start 2026-09-07]
+                            [--end 2026-12-18] [--gzip] [--output FILE]
+"""
+import csv
+import io
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, Optional, Sequence
+
+import click
+from flask import Response, stream_with_context
+from flask.cli import with_appcontext
+from sqlalchemy import select, and_
+
+from app.extensions import db
+from app.models import Department, Course, Section, ClassSession, Enrollment, User, AttendanceRecord
+
+EXPORT_YIELD_PER = 1000
+_ROWS_PER_CHUNK = 500
+SESSIONS_PER_CHUNK = 200
+
+MATRIX_HEADER = [
+    'department', 'course_code', 'course_title', 'section_code',
+    'session_id', 'scheduled_start', 'scheduled_end',
+    'student_id', 'username', 'email', 'status', 'recorded_at'
+]
+
+
+def stream_rows(stmt) -> Iterator:
+    """Yield result rows of stmt lazily, fetching EXPORT_YIELD_PER at a time."""
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_YIELD_PER))
+    try:
+        yield from result
+    finally:
+        result.close()
+
+
+def iter_csv(header: Sequence, rows: Iterable[Sequence]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    pending = 1
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= _ROWS_PER_CHUNK:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+            pending = 0
+    if pending:
+        yield buf.getvalue()
+
+
+def iter_gzip(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Gzip a stream of text chunks incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def csv_response(header: Sequence, rows: Iterable[Sequence], filename: str, compress: bool = False) -> Response:
+    if compress:
+        resp = Response(stream_with_context(iter_gzip(iter_csv(header, rows))), mimetype='application/gzip')
+        filename += '.gz'
+    else:
+        resp = Response(stream_with_context(iter_csv(header, rows)), mimetype='text/csv')
+        resp.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    resp.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return resp
+
+
+def session_conditions(department_id: Optional[int] = None, course_id: Optional[int] = None,
+                       start: Optional[date] = None, end: Optional[date] = None) -> list:
+    """WHERE conditions on ClassSession (joined to Section and Course) for the common export filters."""
+    conditions = []
+    if department_id is not None:
+        conditions.append(Course.department_id == department_id)
+    if course_id is not None:
+        conditions.append(Course.id == course_id)
+    if start is not None:
+        conditions.append(ClassSession.scheduled_start >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        conditions.append(ClassSession.scheduled_start < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return conditions
+
+
+def iter_attendance_matrix(department_id: Optional[int] = None, course_id: Optional[int] = None,
+                           start: Optional[date] = None, end: Optional[date] = None,
+                           sessions_per_chunk: int = SESSIONS_PER_CHUNK) -> Iterator[list]:
+    """Yield one CSV row (see MATRIX_HEADER) per session and enrolled student, by session id.
+
+    Sessions are paged by id (keyset, no OFFSET); each page is expanded into its rows with one
+    joined query read through yield_per, and the read transaction is ended between pages.
+    """
+    conditions = session_conditions(department_id, course_id, start, end)
+    last_id = 0
+    while True:
+        session_ids = db.session.execute(
+            select(ClassSession.id)
+            .join(Section, Section.id == ClassSession.section_id)
+            .join(Course, Course.id == Section.course_id)
+            .where(ClassSession.id > last_id, *conditions)
+            .order_by(ClassSession.id)
+            .limit(sessions_per_chunk)
+        ).scalars().all()
+        if not session_ids:
+            return
+        last_id = session_ids[-1]
+        stmt = (
+            select(Department.name, Course.code, Course.title, Section.section_code,
+                   ClassSession.id, ClassSession.scheduled_start, ClassSession.scheduled_end,
+                   User.id, User.username, User.email, AttendanceRecord.recorded_at)
+            .select_from(ClassSession)
+            .join(Section, Section.id == ClassSession.section_id)
+            .join(Course, Course.id == Section.course_id)
+            .join(Department, Department.id == Course.department_id)
+            .join(Enrollment, Enrollment.section_id == ClassSession.section_id)
+            .join(User, User.id == Enrollment.student_id)
+            .outerjoin(AttendanceRecord, and_(AttendanceRecord.class_session_id == ClassSession.id,
+                                              AttendanceRecord.student_id == Enrollment.student_id))
+            .where(ClassSession.id.in_(session_ids))
+            .order_by(ClassSession.id, Enrollment.id)
+        )
+        for dept, course_code, course_title, section_code, session_id, s_start, s_end, \
+                student_id, username, email, recorded_at in stream_rows(stmt):
+            yield [
+                dept, course_code, course_title, section_code,
+                session_id,
+                s_start.isoformat(timespec='minutes'),
+                s_end.isoformat(timespec='minutes'),
+                student_id, username, email,
+                'present' if recorded_at else 'absent',
+                recorded_at.isoformat(timespec='seconds') if recorded_at else ''
+            ]
+        db.session.rollback()
+
+
+@click.command('export-attendance')
+@click.option('--department-id', type=int, help='Only this department')
+@click.option('--course-id', type=int, help='Only this course')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='First day (session start date)')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day (session start date)')
+@click.option('--gzip', 'compress', is_flag=True, help='Write gzip-compressed output')
+@click.option('--output', default='-', type=click.Path(allow_dash=True), help='Output file (default: stdout)')
+@with_appcontext
+def export_attendance_command(department_id, course_id, start, end, compress, output):
+    """Export the attendance matrix (every session x enrolled student) as CSV."""
+    rows = iter_attendance_matrix(department_id, course_id,
+                                  start.date() if start else None, end.date() if end else None)
+    chunks = iter_csv(MATRIX_HEADER, rows)
+    with click.open_file(output, 'wb') as fh:
+        for data in (iter_gzip(chunks) if compress else (c.encode('utf-8') for c in chunks)):
+            fh.write(data)
+
+
+def init_app(app):
+    app.cli.add_command(export_attendance_command)
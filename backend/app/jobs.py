@@ -0,0 +1,146 @@
+"""In-process background jobs for long admin operations.
+
+enqueue() records a Job row (status 'queued') and hands its id to a per-app thread pool of
+JOB_WORKERS threads, so the request can return straight away; the admin progress page
+polls /admin/jobs/<id>.json. Job functions are registered by kind with @job('kind') and
+receive a JobContext for reporting progress and partial results (each report is its own
+short commit, readable from any worker). With JOB_WORKERS = 0 jobs run inline in the
+enqueuing request instead.
+
+A job runs in the process that enqueued it; if that process exits mid-job the row is left
+'running' and the operation has to be started again.
+
+Metrics: jobs.started / jobs.failed (counters) and the jobs.duration timing.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import update
+
+from app.extensions import db
+from app.metrics import get_metrics
+from app.models import Job
+
+_EXTENSION_KEY = 'job_runner'
+_KINDS: Dict[str, Callable] = {}
+
+
+def job(kind: str):
+    """Register fn(ctx, **params) as the handler for jobs of this kind; its return value is the result."""
+    def register(fn):
+        _KINDS[kind] = fn
+        return fn
+    return register
+
+
+class JobContext:
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    def progress(self, done: int, total: Optional[int] = None, result: Any = None):
+        """Record progress (and optionally a partial result). Commits the current session."""
+        values = {'progress_done': done}
+        if total is not None:
+            values['progress_total'] = total
+        if result is not None:
+            values['result'] = json.dumps(result)
+        db.session.execute(update(Job).where(Job.id == self.job_id).values(**values))
+        db.session.commit()
+
+
+class JobRunner:
+    def __init__(self, app):
+        self._app = app
+        self._start_lock = threading.Lock()
+        self._executor = None
+
+    def _ensure_started(self, workers: int):
+        if self._executor is not None:
+            return
+        with self._start_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='admin-job')
+
+    def submit(self, job_id: int):
+        workers = self._app.config.get('JOB_WORKERS', 2)
+        if workers <= 0:
+            self._run(job_id)
+            return
+        self._ensure_started(workers)
+        self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id: int):
+        with self._app.app_context():
+            metrics = get_metrics()
+            row = db.session.get(Job, job_id)
+            if row is None or row.status != 'queued':
+                return
+            fn = _KINDS.get(row.kind)
+            params = json.loads(row.params or '{}')
+            row.status = 'running'
+            row.started_at = datetime.utcnow()
+            db.session.commit()
+            metrics.inc('jobs.started')
+            start = time.perf_counter()
+            try:
+                if fn is None:
+                    raise LookupError(f'unknown job kind {row.kind!r}')
+                result = fn(JobContext(job_id), **params)
+                values = {'status': 'done'}
+                if result is not None:
+                    values['result'] = json.dumps(result)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.exception('job_failed id=%d', job_id)
+                metrics.inc('jobs.failed')
+                values = {'status': 'failed', 'error': f'{e.__class__.__name__}: {e}'}
+            values['finished_at'] = datetime.utcnow()
+            db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+            db.session.commit()
+            metrics.observe('jobs.duration', time.perf_counter() - start)
+
+
+def enqueue(kind: str, params: Optional[Dict] = None, user_id: Optional[int] = None) -> int:
+    """Create a job and start it in the background; return its id. Commits the current session."""
+    if kind not in _KINDS:
+        raise ValueError(f'unknown job kind {kind!r}')
+    row = Job(kind=kind, params=json.dumps(params or {}), created_by=user_id)
+    db.session.add(row)
+    db.session.commit()
+    job_id = row.id
+    get_job_runner().submit(job_id)
+    return job_id
+
+
+def job_info(row: Job) -> Dict:
+    """JSON-ready view of a job for the polling endpoint and progress page."""
+    percent = None
+    if row.status == 'done':
+        percent = 100.0
+    elif row.progress_total:
+        percent = min(100.0, row.progress_done * 100.0 / row.progress_total)
+    return {
+        'id': row.id,
+        'kind': row.kind,
+        'status': row.status,
+        'progress_done': row.progress_done,
+        'progress_total': row.progress_total,
+        'percent': percent,
+        'result': json.loads(row.result) if row.result else None,
+        'error': row.error,
+        'created_at': row.created_at.isoformat(timespec='seconds') if row.created_at else None,
+        'finished_at': row.finished_at.isoformat(timespec='seconds') if row.finished_at else None,
+    }
+
+
+def init_app(app):
+    app.extensions[_EXTENSION_KEY] = JobRunner(app)
+
+
+def get_job_runner() -> JobRunner:
+    return current_app.extensions[_EXTENSION_KEY]
@@ -0,0 +1,53 @@
+"""Minimal in-process metrics (counters, gauges, observations) for the running worker.
+
+Values are per process; the admin metrics endpoint reports the worker that served it.
+"""
+import threading
+
+from flask import current_app
+
+_EXTENSION_KEY = 'metrics'
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._timings = {}
+
+    def inc(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Record one observation (a duration in seconds, a batch size, ...)."""
+        with self._lock:
+            t = self._timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            t['count'] += 1
+            t['total'] += value
+            if value > t['max']:
+                t['max'] = value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            timings = {}
+            for name, t in self._timings.items():
+                timings[name] = dict(t, avg=(t['total'] / t['count']) if t['count'] else 0.0)
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'timings': timings,
+            }
+
+
+def init_app(app):
+    app.extensions[_EXTENSION_KEY] = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return current_app.extensions[_EXTENSION_KEY]
@@ -88,6 +88,10 @@ class ClassSession(db.Model):
     section = db.relationship('Section',
                               backref=db.backref('sessions', lazy=True, cascade="all, delete-orphan"))
 
+    __table_args__ = (
+        db.Index('ix_class_session_status_end', 'status', 'scheduled_end'),
+    )
+
 class AttendanceRecord(db.Model):
     __tablename__ = 'attendance_record'
     id = db.Column(db.Integer, primary_key=True)
@@ -133,3 +137,46 @@ class AlertRecipient(db.Model):
     __table_args__ = (
         db.UniqueConstraint('alert_id', 'recipient_id', name='uq_alert_recipient_once'),
     )
+
+# --- Cache coordination (cross-worker invalidation of in-process caches) ---
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_version'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# --- Attendance summaries (maintained with each mark/session write; see app/attendance/summaries.py) ---
+
+class SectionAttendanceSummary(db.Model):
+    __tablename__ = 'section_attendance_summary'
+    section_id = db.Column(db.Integer, db.ForeignKey('section.id'), primary_key=True)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+
+class SessionAttendanceSummary(db.Model):
+    __tablename__ = 'session_attendance_summary'
+    class_session_id = db.Column(db.Integer, db.ForeignKey('class_session.id'), primary_key=True)
+    section_id = db.Column(db.Integer, db.ForeignKey('section.id'), nullable=False, index=True)
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+
+class StudentSectionSummary(db.Model):
+    __tablename__ = 'student_section_summary'
+    section_id = db.Column(db.Integer, db.ForeignKey('section.id'), primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+
+# --- Background jobs (long admin operations run off the request thread; see app/jobs.py) ---
+
+class Job(db.Model):
+    __tablename__ = 'job'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued|running|done|failed
+    params = db.Column(db.Text, nullable=True)  # JSON
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON summary (partial while running)
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
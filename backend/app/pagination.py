@@ -0,0 +1,38 @@
+"""Keyset pagination for the admin list pages.
+
+Pages are addressed by the last id of the previous page (?after=<id>) rather than an
+OFFSET, so every page costs one index range scan however deep into the table it is.
+"""
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import and_, or_, select
+
+PER_PAGE = 50
+
+
+class Page(NamedTuple):
+    items: List
+    next_after: Optional[int]  # pass as ?after= to fetch the next page; None on the last page
+
+
+def keyset_page(query, key, after: Optional[int] = None, per_page: int = PER_PAGE, newest_first_by=None) -> Page:
+    """Fetch the page of query (ordered by the unique integer column key) after the given key value.
+
+    With newest_first_by (e.g. a timestamp column) the page is ordered by (newest_first_by, key)
+    descending instead; the cursor is still the key of the last row, and its sort value is looked up
+    in the same statement.
+    """
+    if newest_first_by is None:
+        if after:
+            query = query.filter(key > after)
+        query = query.order_by(key)
+    else:
+        if after:
+            anchor = select(newest_first_by).where(key == after).scalar_subquery()
+            query = query.filter(or_(newest_first_by < anchor, and_(newest_first_by == anchor, key < after)))
+        query = query.order_by(newest_first_by.desc(), key.desc())
+    items = query.limit(per_page + 1).all()
+    if len(items) <= per_page:
+        return Page(items, None)
+    items = items[:per_page]
+    return Page(items, getattr(items[-1], key.key))
@@ -0,0 +1,134 @@
+"""Token-bucket rate limiting with pluggable state backends.
+
+Each key holds two numbers (tokens left, last update time). A bucket that has been idle
+long enough to refill completely is indistinguishable from a new one, so backends drop
+such keys; the in-process backend additionally caps the number of keys (LRU).
+
+Backends:
+- 'memory' (default): per-process OrderedDict per limiter, O(1) per check.
+- 'sqlite': a small SQLite file shared by all workers on the host (RATE_LIMIT_SQLITE_PATH).
+  Connections are opened per thread on first use, so none is inherited across a fork.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+_EXTENSION_KEY = 'rate_limiters'
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBackend:
+    def __init__(self, max_keys: int = 10000):
+        self._max_keys = max(1, max_keys)
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> bool:
+        idle_full = capacity / rate if rate > 0 else float('inf')
+        with self._lock:
+            # Oldest entries sit at the front; drop those that have fully refilled
+            while self._buckets:
+                updated = next(iter(self._buckets.values()))[1]
+                if now - updated < idle_full:
+                    break
+                self._buckets.popitem(last=False)
+            state = self._buckets.pop(key, None)
+            tokens = capacity if state is None else _refill(state[0], state[1], now, capacity, rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBackend:
+    _PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()
+        self._calls = 0
+        # Set up the file on a throwaway connection: create_app may run before the server forks
+        conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            # full_at: when the bucket will have refilled completely (rows past it can be purged)
+            conn.execute('CREATE TABLE IF NOT EXISTS rate_bucket '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)')
+        finally:
+            conn.close()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection made before a fork belongs to the parent; SQLite connections must not be shared
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> bool:
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_bucket WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], now, capacity, rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            full_at = now + (capacity - tokens) / rate if rate > 0 else float('inf')
+            conn.execute('INSERT OR REPLACE INTO rate_bucket (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                         (key, tokens, now, full_at))
+            self._calls += 1
+            if self._calls % self._PURGE_EVERY == 0:
+                conn.execute('DELETE FROM rate_bucket WHERE full_at < ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed
+
+
+class TokenBucketLimiter:
+    def __init__(self, backend, capacity: float, per_seconds: float, name: str = ''):
+        # capacity requests per per_seconds, with bursts of up to capacity
+        self.backend = backend
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds if per_seconds > 0 else 0.0
+        self.name = name
+
+    def allow(self, key: str) -> bool:
+        return self.backend.take(f'{self.name}:{key}', self.capacity, self.rate, time.time())
+
+
+def init_app(app):
+    kind = app.config.get('RATE_LIMIT_BACKEND', 'memory')
+    if kind == 'sqlite':
+        shared = SQLiteBackend(app.config.get('RATE_LIMIT_SQLITE_PATH', 'ratelimit.db'))
+        make_backend = lambda: shared
+    elif kind == 'memory':
+        # One backend per limiter: idle eviction assumes every key refills at the same rate
+        make_backend = lambda: MemoryBackend(app.config.get('RATE_LIMIT_MAX_KEYS', 10000))
+    else:
+        raise ValueError(f'Unknown RATE_LIMIT_BACKEND: {kind}')
+    app.extensions[_EXTENSION_KEY] = {
+        'student_mark': TokenBucketLimiter(make_backend(), app.config.get('STUDENT_MARK_RATE_LIMIT_PER_MINUTE', 20), 60,
+                                           name='student_mark'),
+        'login': TokenBucketLimiter(make_backend(), app.config.get('LOGIN_RATE_LIMIT_PER_MINUTE', 10), 60, name='login'),
+    }
+
+
+def get_limiter(name: str) -> TokenBucketLimiter:
+    return current_app.extensions[_EXTENSION_KEY][name]
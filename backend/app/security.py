@@ -0,0 +1,21 @@
+"""SECRET_KEY-keyed HMACs shared by the attendance codes, QR tokens and set-password tokens.
+
+Each caller passes its own purpose label (e.g. b'attendance-qr-token:v1:'), which is prefixed
+to the message so a signature made for one purpose never verifies for another.
+"""
+import hashlib
+import hmac
+
+from flask import current_app
+
+
+def secret_key() -> bytes:
+    key = current_app.config.get('SECRET_KEY') or ''
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    return key
+
+
+def hmac_sha256(purpose: bytes, message: bytes) -> bytes:
+    """HMAC-SHA256 of purpose + message keyed with the app's SECRET_KEY."""
+    return hmac.new(secret_key(), purpose + message, hashlib.sha256).digest()
@@ -1,10 +1,12 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, make_response
+from flask import Blueprint, render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
-from sqlalchemy import and_
-from app.models import Enrollment, ClassSession, Section, AttendanceRecord
+from sqlalchemy import select, and_
+from sqlalchemy.orm import joinedload
+from app.models import Enrollment, ClassSession, Section, Course, AttendanceRecord
+from app.models import SectionAttendanceSummary, StudentSectionSummary
 from app.models import Alert, AlertRecipient  # alerts
 from app.extensions import db
-import io, csv
+from app.exports import stream_rows, csv_response
 
 student_bp = Blueprint('student', __name__)
 
@@ -42,6 +44,19 @@ def student_sessions():
     return render_template('student_sessions.html', open_sessions=open_sessions, attended_session_ids=attended_session_ids)
 
 
+def _history_stmt(student_id: int, *columns):
+    # Every session of the student's enrolled sections joined to its section, course and the
+    # student's own record (if any): one statement, no per-section or per-row lazy loads
+    return (select(*columns)
+            .select_from(Enrollment)
+            .join(Section, Section.id == Enrollment.section_id)
+            .join(Course, Course.id == Section.course_id)
+            .join(ClassSession, ClassSession.section_id == Section.id)
+            .outerjoin(AttendanceRecord, and_(AttendanceRecord.class_session_id == ClassSession.id,
+                                              AttendanceRecord.student_id == student_id))
+            .where(Enrollment.student_id == student_id))
+
+
 @student_bp.route('/attendance', methods=['GET'], endpoint='student_attendance')
 @login_required
 def student_attendance():
@@ -49,36 +64,21 @@ def student_attendance():
     if guard:
         return guard
 
-    # Sections the student is enrolled in
-    enrollments = Enrollment.query.filter_by(student_id=current_user.id).all()
-    sections = [enr.section for enr in enrollments]
-
-    # Gather all session ids across enrolled sections
-    all_sessions_by_section = {}
-    all_session_ids = []
-    for sec in sections:
-        secsessions = (ClassSession.query
-                       .filter_by(section_id=sec.id)
-                       .order_by(ClassSession.scheduled_start.desc())
-                       .all())
-        all_sessions_by_section[sec.id] = secsessions
-        all_session_ids.extend([s.id for s in secsessions])
-
-    # Attendance records for this student across all those sessions
-    attended_records = []
-    if all_session_ids:
-        attended_records = AttendanceRecord.query.filter(
-            AttendanceRecord.student_id == current_user.id,
-            AttendanceRecord.class_session_id.in_(all_session_ids)
-        ).all()
-    attended_by_session = {rec.class_session_id: rec for rec in attended_records}
-
-    # Build per-section summaries
+    # Per-section totals come from the precomputed attendance summaries
+    summary_rows = (
+        db.session.query(Section, SectionAttendanceSummary.session_count, StudentSectionSummary.present_count)
+        .join(Enrollment, and_(Enrollment.section_id == Section.id, Enrollment.student_id == current_user.id))
+        .outerjoin(SectionAttendanceSummary, SectionAttendanceSummary.section_id == Section.id)
+        .outerjoin(StudentSectionSummary, and_(StudentSectionSummary.section_id == Section.id,
+                                               StudentSectionSummary.student_id == current_user.id))
+        .options(joinedload(Section.course))
+        .order_by(Enrollment.id)
+        .all()
+    )
     per_section = []
-    for sec in sections:
-        sessions = all_sessions_by_section.get(sec.id, [])
-        total = len(sessions)
-        present = sum(1 for s in sessions if s.id in attended_by_session)
+    for sec, total, present in summary_rows:
+        total = total or 0
+        present = present or 0
         pct = (present / total * 100.0) if total else 0.0
         per_section.append({
             'section': sec,
@@ -87,21 +87,18 @@ def student_attendance():
             'pct': pct
         })
 
-    # Build recent sessions table across all sections (limit to 50)
-    all_sessions_sorted = sorted(
-        [s for sl in all_sessions_by_section.values() for s in sl],
-        key=lambda s: s.scheduled_start,
-        reverse=True
-    )
+    # Recent sessions across all sections (limit to 50), with section, course and record in one query
     recent_sessions = []
-    for s in all_sessions_sorted[:50]:
-        rec = attended_by_session.get(s.id)
+    for sess, sec, course, recorded_at in db.session.execute(
+            _history_stmt(current_user.id, ClassSession, Section, Course, AttendanceRecord.recorded_at)
+            .order_by(ClassSession.scheduled_start.desc(), ClassSession.id.desc())
+            .limit(50)):
         recent_sessions.append({
-            'session': s,
-            'section': s.section,
-            'course': s.section.course,
-            'status': 'present' if rec else 'absent',
-            'recorded_at': rec.recorded_at if rec else None
+            'session': sess,
+            'section': sec,
+            'course': course,
+            'status': 'present' if recorded_at else 'absent',
+            'recorded_at': recorded_at
         })
 
     return render_template(
@@ -118,58 +115,26 @@ def student_attendance_csv():
     if guard:
         return guard
 
-    # Sections and sessions
-    enrollments = Enrollment.query.filter_by(student_id=current_user.id).all()
-    sections = [enr.section for enr in enrollments]
-    all_sessions = []
-    for sec in sections:
-        all_sessions.extend(
-            ClassSession.query.filter_by(section_id=sec.id).order_by(ClassSession.scheduled_start.asc()).all()
-        )
-    session_by_id = {s.id: s for s in all_sessions}
-    session_ids = list(session_by_id.keys())
-
-    # Attendance records (only this student's)
-    recs = []
-    if session_ids:
-        recs = AttendanceRecord.query.filter(
-            AttendanceRecord.student_id == current_user.id,
-            AttendanceRecord.class_session_id.in_(session_ids)
-        ).all()
-    attended_ids = {r.class_session_id for r in recs}
-    rec_map = {r.class_session_id: r for r in recs}
-
-    # CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
+    header = [
         'section_code', 'course_code', 'course_title',
         'session_id', 'scheduled_start', 'scheduled_end',
         'status', 'recorded_at'
-    ])
-
-    # Write a row for every session across enrolled sections
-    for s in sorted(all_sessions, key=lambda x: x.scheduled_start):
-        sec = s.section
-        course = sec.course
-        rec = rec_map.get(s.id)
-        status = 'present' if s.id in attended_ids else 'absent'
-        recorded_at = rec.recorded_at.isoformat(timespec='seconds') if rec else ''
-        writer.writerow([
-            sec.section_code,
-            course.code,
-            course.title,
-            s.id,
-            s.scheduled_start.isoformat(timespec='minutes'),
-            s.scheduled_end.isoformat(timespec='minutes'),
-            status,
-            recorded_at
-        ])
-
-    resp = make_response(output.getvalue())
-    resp.headers['Content-Type'] = 'text/csv; charset=utf-8'
-    resp.headers['Content-Disposition'] = 'attachment; filename="my_attendance.csv"'
-    return resp
+    ]
+    # A row for every session across enrolled sections, with this student's record (if any)
+    stmt = (_history_stmt(current_user.id, Section.section_code, Course.code, Course.title, ClassSession.id,
+                          ClassSession.scheduled_start, ClassSession.scheduled_end, AttendanceRecord.recorded_at)
+            .order_by(ClassSession.scheduled_start.asc(), ClassSession.id))
+    rows = ([
+        section_code,
+        course_code,
+        course_title,
+        session_id,
+        start.isoformat(timespec='minutes'),
+        end.isoformat(timespec='minutes'),
+        'present' if recorded_at else 'absent',
+        recorded_at.isoformat(timespec='seconds') if recorded_at else ''
+    ] for section_code, course_code, course_title, session_id, start, end, recorded_at in stream_rows(stmt))
+    return csv_response(header, rows, 'my_attendance.csv')
 
 
 # --- Alerts: Student inbox (read-only) ---
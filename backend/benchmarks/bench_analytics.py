@@ -0,0 +1,68 @@
+"""Timing of the NumPy attendance matrix on a synthetic term (no database).
+
+Builds the matrix from id arrays for N students spread over sections, then times the
+per-student rates, absence streaks and threshold reports.
+
+Usage (from backend/):
+    python benchmarks/bench_analytics.py --students 30000 --sections 600 --sessions 40
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def _synthetic(students, sections, sessions, per_student, rng):
+    session_ids = np.arange(1, sections * sessions + 1, dtype=np.int64)
+    session_sections = np.repeat(np.arange(1, sections + 1, dtype=np.int64), sessions)
+    # Interleave sections through the term the way a timetable would
+    order = np.argsort(np.tile(np.arange(sessions), sections), kind='stable')
+    sess = np.column_stack([session_ids[order], session_sections[order]])
+
+    student_ids = np.arange(1, students + 1, dtype=np.int64)
+    enr_sections = rng.integers(1, sections + 1, size=(students, per_student))
+    enr = np.unique(np.column_stack([enr_sections.ravel(), np.repeat(student_ids, per_student)]), axis=0)
+
+    # ~80% attendance: every session of each enrolled section, thinned at random
+    sec_start = (enr[:, 0] - 1) * sessions + 1
+    rec_sessions = (sec_start[:, None] + np.arange(sessions)).ravel()
+    rec_students = np.repeat(enr[:, 1], sessions)
+    keep = rng.random(len(rec_sessions)) < 0.8
+    rec = np.column_stack([rec_sessions[keep], rec_students[keep]])
+    return sess, enr, rec
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=30000)
+    parser.add_argument('--sections', type=int, default=600)
+    parser.add_argument('--sessions', type=int, default=40, help='Sessions per section')
+    parser.add_argument('--per-student', type=int, default=5, help='Sections per student')
+    args = parser.parse_args()
+
+    from app.analytics import AttendanceMatrix
+
+    sess, enr, rec = _synthetic(args.students, args.sections, args.sessions, args.per_student,
+                                np.random.default_rng(42))
+    timings = {}
+    start = time.perf_counter()
+    m = AttendanceMatrix.from_ids(sess, enr, rec)
+    timings['build'] = time.perf_counter() - start
+    for name, fn in [('student_rates', m.student_rates), ('session_rates', m.session_rates),
+                     ('longest_streaks', m.longest_absence_streaks),
+                     ('students_below_0.75', lambda: m.students_below(0.75))]:
+        start = time.perf_counter()
+        fn()
+        timings[name] = time.perf_counter() - start
+    print(f"matrix {m.shape[0]:,} students x {m.shape[1]:,} sessions, {len(rec):,} records, "
+          f"{(m.present_bits.nbytes + m.expected_bits.nbytes) / 1e6:.0f}MB packed")
+    for name, seconds in timings.items():
+        print(f"{name:20s} {seconds * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Throughput benchmark for the institution-wide attendance export.
+
+Seeds a synthetic SQLite database (departments x courses x sections, a shared pool of
+students, a term of sessions per section, ~80% attendance) and streams the full
+session x student matrix through iter_attendance_matrix + iter_csv (optionally gzip),
+reporting rows/s, time to first byte and output size. With --memory, peak Python heap
+use during the export is traced as well (slower).
+
+Usage (from backend/):
+    python benchmarks/bench_export.py --sections 200 --students 250 --sessions 40   # 2M rows
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_INSERT_CHUNK = 20000
+
+
+def _make_app(db_path):
+    os.environ['TESTING'] = '1'
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    from app import create_app
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    return app
+
+
+def _insert(table, rows):
+    from app.extensions import db
+    from sqlalchemy import insert
+    for i in range(0, len(rows), _INSERT_CHUNK):
+        db.session.execute(insert(table), rows[i:i + _INSERT_CHUNK])
+
+
+def _seed(app, sections, students, sessions, departments=10):
+    from app.extensions import db
+    from app.models import User, Department, Course, Section, Enrollment, ClassSession, AttendanceRecord
+
+    rng = random.Random(42)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        _insert(Department.__table__, [{'id': d + 1, 'name': f'Dept {d}'} for d in range(departments)])
+        _insert(User.__table__, [{'id': 1, 'username': 'bench_lect', 'email': 'bench_lect@staff.ug.edu.gh',
+                                  'password': '!', 'role': 'lecturer', 'is_approved': True}])
+        pool = students * 4
+        _insert(User.__table__, [{'id': i + 2, 'username': f'bench_s{i}', 'email': f'bench_s{i}@st.ug.edu.gh',
+                                  'password': '!', 'role': 'student', 'is_approved': True} for i in range(pool)])
+        _insert(Course.__table__, [{'id': c + 1, 'code': f'C{c:05d}', 'title': f'Course {c}',
+                                    'department_id': c % departments + 1} for c in range(sections)])
+        _insert(Section.__table__, [{'id': s + 1, 'course_id': s + 1, 'section_code': 'A', 'instructor_id': 1}
+                                    for s in range(sections)])
+        term_start = datetime(2026, 9, 7, 9, 0)
+        session_id = 0
+        for sec in range(1, sections + 1):
+            roster = rng.sample(range(2, pool + 2), students)
+            _insert(Enrollment.__table__, [{'section_id': sec, 'student_id': stu} for stu in roster])
+            session_rows, record_rows = [], []
+            for w in range(sessions):
+                session_id += 1
+                start = term_start + timedelta(days=w * 2)
+                session_rows.append({'id': session_id, 'section_id': sec, 'scheduled_start': start,
+                                     'scheduled_end': start + timedelta(hours=1), 'status': 'closed'})
+                record_rows.extend({'class_session_id': session_id, 'student_id': stu, 'status': 'present',
+                                    'recorded_at': start + timedelta(minutes=5)}
+                                   for stu in roster if rng.random() < 0.8)
+            _insert(ClassSession.__table__, session_rows)
+            _insert(AttendanceRecord.__table__, record_rows)
+        db.session.commit()
+
+
+def _run_export(app, compress, trace_memory):
+    from app.exports import iter_attendance_matrix, iter_csv, iter_gzip, MATRIX_HEADER
+
+    with app.app_context():
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        first_byte = None
+        size = 0
+        rows = 0
+
+        def counted():
+            nonlocal rows
+            for row in iter_attendance_matrix():
+                rows += 1
+                yield row
+
+        chunks = iter_csv(MATRIX_HEADER, counted())
+        for data in (iter_gzip(chunks) if compress else chunks):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(data)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    return rows, elapsed, first_byte, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, default=200)
+    parser.add_argument('--students', type=int, default=250, help='Enrolled students per section')
+    parser.add_argument('--sessions', type=int, default=40, help='Sessions per section')
+    parser.add_argument('--memory', action='store_true', help='Trace peak Python heap during the export')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _make_app(os.path.join(tmp, 'bench.db'))
+        t0 = time.perf_counter()
+        _seed(app, args.sections, args.students, args.sessions)
+        print(f"seeded {args.sections * args.students * args.sessions:,} matrix rows in {time.perf_counter() - t0:.1f}s")
+        for compress in (False, True):
+            rows, elapsed, ttfb, size, peak = _run_export(app, compress, args.memory)
+            line = (f"{'gzip' if compress else 'csv':4s} rows={rows:,}  rows/s={rows / elapsed:,.0f}  "
+                    f"ttfb={ttfb * 1000:.1f}ms  size={size / 1e6:.1f}MB")
+            if peak is not None:
+                line += f"  peak_heap={peak / 1e6:.1f}MB"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Marks-per-second benchmark for session code verification.
+
+Runs the student_mark POST end to end (single process, single core) once with the
+legacy KDF code hash and once with the keyed HMAC digest, plus a verify-only loop.
+
+Usage (from backend/):
+    python benchmarks/bench_open_code.py --students 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def _make_app(db_path):
+    os.environ['TESTING'] = '1'
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    from app import create_app
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    return app
+
+
+def _seed(app, students):
+    from app.extensions import db
+    from app.models import User, Department, Course, Section, Enrollment, ClassSession
+    from werkzeug.security import generate_password_hash
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # One cheap hash shared by all seeded users keeps setup fast
+        pw = generate_password_hash('pass123', method='pbkdf2:sha256:1')
+        dept = Department(name='Bench')
+        db.session.add(dept)
+        db.session.flush()
+        course = Course(code='BENCH1', title='Bench', department_id=dept.id)
+        lect = User(username='bench_lect', email='bench_lect@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        db.session.add_all([course, lect])
+        db.session.flush()
+        section = Section(course_id=course.id, section_code='B', instructor_id=lect.id)
+        db.session.add(section)
+        db.session.flush()
+        for i in range(students):
+            u = User(username=f'bench_s{i}', email=f'bench_s{i}@st.ug.edu.gh', password=pw, role='student', is_approved=True)
+            db.session.add(u)
+            db.session.flush()
+            db.session.add(Enrollment(section_id=section.id, student_id=u.id))
+        sess = ClassSession(section_id=section.id,
+                            scheduled_start=datetime.utcnow(),
+                            scheduled_end=datetime.utcnow() + timedelta(hours=2),
+                            status='scheduled')
+        db.session.add(sess)
+        db.session.commit()
+        return sess.id
+
+
+def _run_marks(app, students, method):
+    app.config['ATTENDANCE_CODE_HASH_METHOD'] = method
+    session_id = _seed(app, students)
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'bench_lect', 'password': 'pass123'})
+    resp = client.post(f'/lecturer/sessions/{session_id}/open')
+    code = resp.headers['Location'].split('code=')[1].split('&')[0]
+    client.get('/auth/logout')
+
+    clients = []
+    for i in range(students):
+        c = app.test_client()
+        c.post('/auth/login', data={'username': f'bench_s{i}', 'password': 'pass123'})
+        clients.append(c)
+
+    start = time.process_time()
+    for i, c in enumerate(clients):
+        # Rotate the forwarded address so the per-IP rate limit does not interfere
+        c.post(f'/student/sessions/{session_id}/mark', data={'code': code},
+               headers={'X-Forwarded-For': f'10.0.{i // 250}.{i % 250}'})
+    elapsed = time.process_time() - start
+    return students / elapsed if elapsed else float('inf')
+
+
+def _run_verify(app, iterations, method):
+    from app.attendance.codes import hash_open_code, verify_open_code
+    with app.app_context():
+        app.config['ATTENDANCE_CODE_HASH_METHOD'] = method
+        stored = hash_open_code('123456', 1)
+        start = time.process_time()
+        for _ in range(iterations):
+            verify_open_code(stored, '123456', 1)
+        elapsed = time.process_time() - start
+    return iterations / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--verify-iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _make_app(os.path.join(tmp, 'bench.db'))
+        for method in ('kdf', 'hmac'):
+            verify_rate = _run_verify(app, args.verify_iterations if method == 'kdf' else args.verify_iterations * 1000, method)
+            mark_rate = _run_marks(app, args.students, method)
+            print(f"{method:5s} verify/s/core={verify_rate:12.1f}  marks/s/core={mark_rate:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
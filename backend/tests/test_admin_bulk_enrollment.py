@@ -157,4 +157,163 @@ def test_upload_reports_error_when_section_missing_and_no_override(app_instance,
     assert resp.status_code == 200
     assert b'Upload Summary' in resp.data
     # Expect an error listed
-    assert b'missing section_id and no override selected' in resp.data
\ No newline at end of file
+    assert b'missing section_id and no override selected' in resp.data
+
+def _upload(client, section_id, body, create_missing=True):
+    return client.post(
+        '/admin/enrollments/upload',
+        data={'csv_file': (io.BytesIO(body.encode()), 'bulk.csv'), 'section_id': str(section_id),
+              'create_missing': 'on' if create_missing else ''},
+        content_type='multipart/form-data',
+    )
+
+
+def test_upload_resolves_rows_in_bulk(app_instance, client):
+    from contextlib import contextmanager
+    from sqlalchemy import event
+    from werkzeug.security import check_password_hash
+
+    @contextmanager
+    def count_queries():
+        statements = []
+        with app_instance.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+
+    _mk_admin(app_instance)
+    _seed_base(app_instance)
+    with app_instance.app_context():
+        db.session.add_all([
+            User(username='bulk0', email='taken@st.ug.edu.gh', password='!', role='student', is_approved=True),
+            User(username='old_stu', email='old_stu@st.ug.edu.gh', password='!', role='student', is_approved=True),
+        ])
+        db.session.commit()
+        section_id = Section.query.filter_by(section_code='S1').first().id
+    _login_admin(client)
+
+    with count_queries() as small:
+        r = _upload(client, section_id, 'email,username\n' + ''.join(f'small{i}@st.ug.edu.gh,\n' for i in range(5)))
+    assert r.status_code == 200
+
+    rows = ['email,username', 'old_stu@st.ug.edu.gh,', 'old_stu@st.ug.edu.gh,', 'lect_csv@staff.ug.edu.gh,',
+            'not-an-email,']
+    rows += [f'new{i}@st.ug.edu.gh,bulk{i % 2}' for i in range(300)]
+    with count_queries() as large:
+        r = _upload(client, section_id, '\n'.join(rows) + '\n')
+    assert r.status_code == 200
+    assert len(large) <= len(small) + 6
+
+    html = r.get_data(as_text=True)
+    assert 'Line 4: user role must be student (found lecturer)' in html
+    assert 'Line 5: invalid email' in html
+    with app_instance.app_context():
+        created = User.query.filter(User.email.like('new%')).all()
+        assert len(created) == 300 and not any(u.is_approved for u in created)
+        assert len({u.username for u in created}) == 300 and 'bulk0' not in {u.username for u in created}
+        assert len({u.password for u in created}) == 1 and check_password_hash(created[0].password, 'changeme')
+        # old_stu once, 300 new, 5 from the first upload
+        assert Enrollment.query.filter_by(section_id=section_id).count() == 306
+
+
+def test_upload_numbers_usernames_repeated_within_file(app_instance, client):
+    _mk_admin(app_instance)
+    _seed_base(app_instance)
+    with app_instance.app_context():
+        # 'john' itself is free but its first numbered variant is not
+        db.session.add(User(username='john01', email='john01@st.ug.edu.gh', password='!', role='student',
+                            is_approved=True))
+        db.session.commit()
+        section_id = Section.query.filter_by(section_code='S1').first().id
+    _login_admin(client)
+
+    r = _upload(client, section_id, 'email\njohn@st.ug.edu.gh\njohn@mail.ug.edu.gh\n')
+    assert r.status_code == 200
+    with app_instance.app_context():
+        names = {u.email: u.username for u in User.query.filter(User.email.like('john@%')).all()}
+        assert names == {'john@st.ug.edu.gh': 'john', 'john@mail.ug.edu.gh': 'john02'}
+        assert Enrollment.query.filter_by(section_id=section_id).count() == 2
+
+
+def test_large_upload_streams_in_committed_chunks(app_instance, client):
+    from sqlalchemy import event
+
+    _mk_admin(app_instance)
+    _seed_base(app_instance)
+    app_instance.config['ENROLLMENT_UPLOAD_STREAM_BYTES'] = 0
+    app_instance.config['ENROLLMENT_UPLOAD_CHUNK_ROWS'] = 50
+    with app_instance.app_context():
+        section_id = Section.query.filter_by(section_code='S1').first().id
+    _login_admin(client)
+
+    with app_instance.app_context():
+        engine = db.engine
+    commits = []
+    listener = lambda conn: commits.append(1)
+    event.listen(engine, 'commit', listener)
+    try:
+        # 120 students; line 121 has undecodable bytes, so reading stops there
+        body = 'email\n' + ''.join(f'stream{i}@st.ug.edu.gh\n' for i in range(120))
+        body = body.encode() + b'bad\xff\xfe@st.ug.edu.gh\n' + b'after@st.ug.edu.gh\n'
+        r = client.post(
+            '/admin/enrollments/upload',
+            data={'csv_file': (io.BytesIO(body), 'big.csv'), 'section_id': str(section_id), 'create_missing': 'on'},
+            content_type='multipart/form-data',
+        )
+    finally:
+        event.remove(engine, 'commit', listener)
+    assert r.status_code == 200
+    html = r.get_data(as_text=True)
+    assert 'could not read file' in html
+    assert len(commits) >= 3
+    with app_instance.app_context():
+        assert Enrollment.query.filter_by(section_id=section_id).count() == 120
+        assert User.query.filter_by(email='after@st.ug.edu.gh').first() is None
+
+
+def test_sync_mode_adds_and_removes_with_dry_run(app_instance, client):
+    _mk_admin(app_instance)
+    _seed_base(app_instance)
+    with app_instance.app_context():
+        section_id = Section.query.filter_by(section_code='S1').first().id
+        students = [User(username=f'sync{i}', email=f'sync{i}@st.ug.edu.gh', password='!', role='student',
+                         is_approved=True) for i in range(4)]
+        db.session.add_all(students)
+        db.session.flush()
+        db.session.add_all([Enrollment(section_id=section_id, student_id=s.id) for s in students[:3]])
+        db.session.commit()
+    _login_admin(client)
+
+    def sync(body, dry_run):
+        return client.post(
+            '/admin/enrollments/upload',
+            data={'csv_file': (io.BytesIO(body.encode()), 'roster.csv'), 'section_id': str(section_id),
+                  'create_missing': 'on', 'mode': 'sync', 'dry_run': 'on' if dry_run else ''},
+            content_type='multipart/form-data',
+        ).get_data(as_text=True)
+
+    def roster():
+        with app_instance.app_context():
+            return sorted(u for (u,) in db.session.query(User.username).join(Enrollment, Enrollment.student_id == User.id)
+                          .filter(Enrollment.section_id == section_id))
+
+    # sync0 stays, sync1/sync2 go, sync3 and a new student come in
+    body = 'email\nsync0@st.ug.edu.gh\nsync3@st.ug.edu.gh\nfresh@st.ug.edu.gh\n'
+    html = sync(body, dry_run=True)
+    assert 'Dry run: nothing was changed' in html
+    assert roster() == ['sync0', 'sync1', 'sync2']
+    with app_instance.app_context():
+        assert User.query.filter_by(email='fresh@st.ug.edu.gh').first() is None
+
+    html = sync(body, dry_run=False)
+    assert 'Dry run: nothing was changed' not in html
+    assert roster() == ['fresh', 'sync0', 'sync3']
+
+    # An invalid row would silently drop students, so the sync is only previewed
+    html = sync('email\nsync0@st.ug.edu.gh\nnot-an-email\n', dry_run=False)
+    assert 'Sync not applied' in html
+    assert roster() == ['fresh', 'sync0', 'sync3']
@@ -0,0 +1,191 @@
+import os
+import re
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment
+from app.pagination import PER_PAGE
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_admin_lists.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+@contextmanager
+def _count_queries(app):
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _before)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before)
+
+
+def _seed(app, n_students):
+    """Two departments with one course/section each; every student is enrolled in both sections."""
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        lecturer = User(username='lect_list', email='lect_list@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        db.session.add_all([
+            User(username='admin_list', email='admin_list@ug.edu.gh', password=pw, role='admin', is_approved=True),
+            lecturer,
+        ])
+        db.session.commit()
+        ids = {}
+        for name in ('Physics', 'History'):
+            dept = Department(name=name)
+            db.session.add(dept)
+            db.session.flush()
+            course = Course(code=f'{name[:3].upper()}101', title=name, department_id=dept.id)
+            db.session.add(course)
+            db.session.flush()
+            section = Section(course_id=course.id, section_code='A', instructor_id=lecturer.id)
+            db.session.add(section)
+            db.session.flush()
+            ids[name] = {'department_id': dept.id, 'course_id': course.id, 'section_id': section.id}
+        for i in range(n_students):
+            stu = User(username=f'list_s{i}', email=f'list_s{i}@st.ug.edu.gh', password='!', role='student', is_approved=True)
+            db.session.add(stu)
+            db.session.flush()
+            for name in ids:
+                db.session.add(Enrollment(section_id=ids[name]['section_id'], student_id=stu.id))
+        db.session.commit()
+        return ids
+
+
+def _usernames(html):
+    return re.findall(r'(list_s\d+) \(', html)
+
+
+def test_enrollments_are_keyset_paginated_and_filtered(app_instance, client):
+    ids = _seed(app_instance, PER_PAGE)
+    client.post('/auth/login', data={'username': 'admin_list', 'password': 'pass123'})
+
+    first = client.get('/admin/enrollments').get_data(as_text=True)
+    assert len(_usernames(first)) == PER_PAGE
+    next_url = re.search(r'href="([^"]*after=\d+[^"]*)">Next page', first).group(1).replace('&amp;', '&')
+    second = client.get(next_url).get_data(as_text=True)
+    assert len(_usernames(second)) == PER_PAGE and 'Next page' not in second and 'First page' in second
+
+    history = client.get(f"/admin/enrollments?department_id={ids['History']['department_id']}").get_data(as_text=True)
+    assert len(_usernames(history)) == PER_PAGE and 'Next page' not in history
+    by_section = client.get(f"/admin/enrollments?section_id={ids['Physics']['section_id']}").get_data(as_text=True)
+    assert _usernames(by_section) == [f'list_s{i}' for i in range(PER_PAGE)]
+
+    sections = client.get(f"/admin/sections?course_id={ids['History']['course_id']}").get_data(as_text=True)
+    assert 'HIS101' in sections and 'PHY101 — Physics</td>' not in sections
+
+
+def test_list_pages_use_bounded_queries(app_instance, client):
+    _seed(app_instance, 3)
+    client.post('/auth/login', data={'username': 'admin_list', 'password': 'pass123'})
+    small = {}
+    for path in ('/admin/enrollments', '/admin/sections', '/admin/courses', '/admin/users/approvals'):
+        with _count_queries(app_instance) as statements:
+            assert client.get(path).status_code == 200
+        small[path] = len(statements)
+
+    with app_instance.app_context():
+        first_section = Section.query.order_by(Section.id).first().id
+        for i in range(3, PER_PAGE):
+            stu = User(username=f'list_s{i}', email=f'list_s{i}@st.ug.edu.gh', password='!', role='student', is_approved=False)
+            db.session.add(stu)
+            db.session.flush()
+            db.session.add(Enrollment(section_id=first_section, student_id=stu.id))
+        db.session.commit()
+    for path, n in small.items():
+        with _count_queries(app_instance) as statements:
+            assert client.get(path).status_code == 200
+        assert len(statements) == n, path
+
+
+def test_enroll_student_by_email(app_instance, client):
+    ids = _seed(app_instance, 1)
+    with app_instance.app_context():
+        db.session.add(User(username='new_stu', email='new_stu@st.ug.edu.gh', password='!', role='student', is_approved=True))
+        db.session.commit()
+    client.post('/auth/login', data={'username': 'admin_list', 'password': 'pass123'})
+    r = client.post('/admin/enrollments', data={'section_id': ids['Physics']['section_id'],
+                                                'student_email': 'NEW_STU@st.ug.edu.gh'})
+    assert r.status_code == 302
+    r = client.post('/admin/enrollments', data={'section_id': ids['Physics']['section_id'],
+                                                'student_email': 'nobody@st.ug.edu.gh'}, follow_redirects=True)
+    assert b'No student with that email.' in r.data
+    with app_instance.app_context():
+        stu = User.query.filter_by(username='new_stu').first()
+        assert Enrollment.query.filter_by(section_id=ids['Physics']['section_id'], student_id=stu.id).count() == 1
+
+
+def test_forms_do_not_list_the_whole_catalogue(app_instance, client):
+    ids = _seed(app_instance, 1)
+    client.post('/auth/login', data={'username': 'admin_list', 'password': 'pass123'})
+    paths = ('/admin/enrollments', '/admin/sections', '/admin/enrollments/upload')
+
+    def measure():
+        sizes = {}
+        for path in paths:
+            with _count_queries(app_instance) as statements:
+                r = client.get(path)
+            assert r.status_code == 200
+            sizes[path] = (len(statements), r.data.count(b'<option'))
+        return sizes
+
+    before = measure()
+    with app_instance.app_context():
+        extra = Department(name='Extra')
+        db.session.add(extra)
+        db.session.flush()
+        for i in range(30):
+            course = Course(code=f'EXT{i:03d}', title=f'Extra {i}', department_id=extra.id)
+            db.session.add(course)
+            db.session.flush()
+            db.session.add(Section(course_id=course.id, section_code='A',
+                                   instructor_id=User.query.filter_by(username='lect_list').one().id))
+            db.session.add(User(username=f'extra_lect{i}', email=f'extra_lect{i}@staff.ug.edu.gh', password='!',
+                                role='lecturer', is_approved=True))
+        db.session.commit()
+    # One more department option; nothing else grows with the catalogue
+    after = measure()
+    for path in paths:
+        assert after[path][0] == before[path][0], path
+        assert after[path][1] - before[path][1] <= 1, path
+
+    # Dropdowns narrow down once a department / course is chosen
+    page = client.get(f"/admin/enrollments?department_id={ids['History']['department_id']}").get_data(as_text=True)
+    assert 'HIS101 — History</option>' in page and 'PHY101 — Physics</option>' not in page
+
+    # Sections and enrollments are created from typed codes and emails
+    r = client.post('/admin/sections', data={'course_code': 'ext007', 'section_code': 'B',
+                                             'instructor_email': 'extra_lect7@staff.ug.edu.gh'})
+    assert r.status_code == 302
+    r = client.post('/admin/enrollments', data={'course_code': 'EXT007', 'section_code': 'B',
+                                                'student_email': 'list_s0@st.ug.edu.gh'})
+    assert r.status_code == 302
+    with app_instance.app_context():
+        section = Section.query.join(Course).filter(Course.code == 'EXT007', Section.section_code == 'B').one()
+        assert section.instructor.username == 'extra_lect7'
+        assert Enrollment.query.filter_by(section_id=section.id).count() == 1
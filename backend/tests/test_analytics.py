@@ -0,0 +1,146 @@
+import os
+from datetime import datetime, timedelta, date
+
+import numpy as np
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment, ClassSession, AttendanceRecord
+from app.analytics import AttendanceMatrix, load_section_matrix, load_term_matrix
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_analytics.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+def _arr(rows):
+    return np.array(rows, dtype=np.int64).reshape(-1, 2)
+
+
+def test_matrix_rates_and_streaks():
+    # Sessions 10, 11, 12, 13 of section 1 interleaved with session 20 of section 2
+    sessions = _arr([(10, 1), (20, 2), (11, 1), (12, 1), (13, 1)])
+    enrollments = _arr([(1, 100), (1, 101), (2, 100)])
+    # Student 100: present at 10 only, absent 11-13 (session 20 in between is also missed)
+    # Student 101: present at 10, 12, 13; a record for section 2's session is ignored (not enrolled)
+    records = _arr([(10, 100), (10, 101), (12, 101), (13, 101), (20, 101)])
+    m = AttendanceMatrix.from_ids(sessions, enrollments, records)
+
+    assert m.shape == (2, 5)
+    assert list(m.student_ids) == [100, 101]
+    np.testing.assert_allclose(m.student_rates(), [1 / 5, 3 / 4])
+    np.testing.assert_allclose(m.session_rates(), [1.0, 0.0, 0.0, 0.5, 0.5])
+    assert list(m.longest_absence_streaks()) == [4, 1]
+    assert list(m.current_absence_streaks()) == [4, 0]
+    assert list(m.students_below(0.5)) == [100]
+    assert list(m.sessions_below(0.6)) == [20, 11, 12, 13]
+    assert m.present_bits.shape == (2, 1) and m.expected[1].tolist() == [True, False, True, True, True]
+
+
+def test_streaks_match_row_by_row_scan():
+    rng = np.random.default_rng(7)
+    sessions = _arr([(i + 1, rng.integers(1, 4)) for i in range(30)])
+    enrollments = _arr([(sec, stu) for stu in range(1, 21) for sec in (1, 2, 3) if rng.random() < 0.6])
+    records = _arr([(sid, stu) for sid in range(1, 31) for stu in range(1, 21) if rng.random() < 0.5])
+    m = AttendanceMatrix.from_ids(sessions, enrollments, records)
+
+    present, expected = m.present, m.expected
+    longest, current = m.absence_streaks()
+    for i in range(len(m.student_ids)):
+        run = best = 0
+        for j in range(m.shape[1]):
+            if expected[i, j]:
+                run = 0 if present[i, j] else run + 1
+                best = max(best, run)
+        assert (longest[i], current[i]) == (best, run)
+
+
+def test_empty_matrix():
+    m = AttendanceMatrix.from_ids(_arr([]), _arr([]), _arr([]))
+    assert m.shape == (0, 0) and len(m.students_below(1.0)) == 0
+
+
+def test_load_from_database_and_report(app_instance):
+    with app_instance.app_context():
+        lecturer = User(username='lect_an', email='lect_an@staff.ug.edu.gh', password='!', role='lecturer', is_approved=True)
+        students = [User(username=f'stud_an{i}', email=f'stud_an{i}@st.ug.edu.gh', password='!',
+                         role='student', is_approved=True) for i in range(2)]
+        dept = Department(name='Economics')
+        db.session.add_all([lecturer, dept] + students)
+        db.session.commit()
+        course = Course(code='ECO101', title='Micro', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='E', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        db.session.add_all([Enrollment(section_id=section.id, student_id=s.id) for s in students])
+        start = datetime(2026, 9, 7, 9)
+        sessions = [ClassSession(section_id=section.id, scheduled_start=start + timedelta(days=i),
+                                 scheduled_end=start + timedelta(days=i, hours=1), status='closed') for i in range(4)]
+        db.session.add_all(sessions)
+        db.session.commit()
+        db.session.add_all([AttendanceRecord(class_session_id=s.id, student_id=students[0].id) for s in sessions])
+        db.session.add(AttendanceRecord(class_session_id=sessions[0].id, student_id=students[1].id))
+        db.session.commit()
+
+        m = load_section_matrix(section.id)
+        assert m.shape == (2, 4) and list(m.session_ids) == [s.id for s in sessions]
+        np.testing.assert_allclose(m.student_rates(), [1.0, 0.25])
+        assert load_section_matrix(section.id, start=date(2026, 9, 9)).shape == (2, 2)
+        assert load_term_matrix(date(2026, 9, 1), date(2026, 12, 1), department_id=dept.id + 1).shape == (0, 0)
+        flagged_id = students[1].id
+
+    result = app_instance.test_cli_runner().invoke(args=['absenteeism-report', '--start', '2026-09-01', '--end', '2026-12-01'])
+    assert result.exit_code == 0
+    assert result.output.splitlines() == ['student_id,rate,longest_streak,current_streak', f'{flagged_id},0.250,3,3']
+
+
+def test_future_and_unheld_sessions_are_not_absences(app_instance):
+    with app_instance.app_context():
+        lecturer = User(username='lect_fu', email='lect_fu@staff.ug.edu.gh', password='!', role='lecturer', is_approved=True)
+        student = User(username='stud_fu', email='stud_fu@st.ug.edu.gh', password='!', role='student', is_approved=True)
+        dept = Department(name='History')
+        db.session.add_all([lecturer, student, dept])
+        db.session.commit()
+        course = Course(code='HIS101', title='World History', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='H', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        db.session.add(Enrollment(section_id=section.id, student_id=student.id))
+        now = datetime.utcnow().replace(microsecond=0)
+
+        def mk(days, status):
+            sess = ClassSession(section_id=section.id, scheduled_start=now + timedelta(days=days),
+                                scheduled_end=now + timedelta(days=days, hours=1), status=status)
+            db.session.add(sess)
+            return sess
+
+        held = [mk(-3, 'closed'), mk(-2, 'closed')]
+        mk(-1, 'scheduled')  # never opened
+        future = [mk(d, 'scheduled') for d in range(1, 6)]  # rest of the generated term
+        db.session.commit()
+        db.session.add_all([AttendanceRecord(class_session_id=s.id, student_id=student.id) for s in held])
+        db.session.commit()
+
+        m = load_section_matrix(section.id)
+        assert list(m.session_ids) == [s.id for s in held]
+        np.testing.assert_allclose(m.student_rates(), [1.0])
+        longest, current = m.absence_streaks()
+        assert list(longest) == [0] and list(current) == [0]
+        # With an explicit cutoff, held sessions up to it count (the never-opened one still does not)
+        for sess in future:
+            sess.status = 'closed'
+        db.session.commit()
+        assert load_section_matrix(section.id, as_of=now + timedelta(days=2)).shape == (1, 4)
@@ -0,0 +1,93 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, ClassSession, AttendanceRecord
+from app.attendance import marks
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_attendance_insert.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+def _create_session(app):
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        lecturer = User(username='lect_ins', email='lect_ins@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        student = User(username='stud_ins', email='stud_ins@st.ug.edu.gh', password=pw, role='student', is_approved=True)
+        dept = Department(name='Geography')
+        db.session.add_all([lecturer, student, dept])
+        db.session.commit()
+        course = Course(code='GEO101', title='Physical Geography', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='G', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        sess = ClassSession(section_id=section.id,
+                            scheduled_start=datetime.utcnow(),
+                            scheduled_end=datetime.utcnow() + timedelta(hours=1),
+                            status='open')
+        db.session.add(sess)
+        db.session.commit()
+        return sess.id, student.id
+
+
+@pytest.mark.parametrize('portable', [False, True])
+def test_insert_attendance_reports_created_once(app_instance, monkeypatch, portable):
+    session_id, student_id = _create_session(app_instance)
+    if portable:
+        monkeypatch.setattr(marks, '_dialect_insert', lambda: None)
+    with app_instance.app_context():
+        assert marks.insert_attendance(session_id, student_id) is True
+        assert marks.insert_attendance(session_id, student_id) is False
+        db.session.commit()
+        assert AttendanceRecord.query.filter_by(class_session_id=session_id, student_id=student_id).count() == 1
+
+
+def test_batch_reports_only_rows_it_inserted(app_instance):
+    from sqlalchemy import event
+    from app.models import SessionAttendanceSummary
+
+    session_id, student_id = _create_session(app_instance)
+    with app_instance.app_context():
+        other = User(username='stud_ins2', email='stud_ins2@st.ug.edu.gh', password='!', role='student', is_approved=True)
+        db.session.add(other)
+        db.session.commit()
+        other_id = other.id
+        # Counter row already present, as once the session has any marks
+        db.session.add(SessionAttendanceSummary(class_session_id=session_id,
+                                                section_id=db.session.get(ClassSession, session_id).section_id,
+                                                present_count=0))
+        db.session.commit()
+        engine = db.engine
+
+        # Another writer commits the first student's mark between the SELECT and the INSERT
+        # (and counts it itself)
+        def race(conn, cursor, statement, *args):
+            if statement.startswith('INSERT INTO attendance_record') and not raced:
+                raced.append(1)
+                cursor.execute('INSERT INTO attendance_record (class_session_id, student_id, status, recorded_at) '
+                               'VALUES (?, ?, ?, ?)', (session_id, student_id, 'present', datetime.utcnow()))
+        raced = []
+        event.listen(engine, 'before_cursor_execute', race)
+        try:
+            created = marks.insert_attendance_batch([(session_id, student_id), (session_id, other_id)])
+            db.session.commit()
+        finally:
+            event.remove(engine, 'before_cursor_execute', race)
+        assert raced and created == {(session_id, other_id)}
+        db.session.expire_all()
+        assert db.session.get(SessionAttendanceSummary, session_id).present_count == 1
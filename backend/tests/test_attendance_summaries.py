@@ -0,0 +1,136 @@
+import os
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (User, Department, Course, Section, Enrollment, ClassSession, AttendanceRecord,
+                        SectionAttendanceSummary, SessionAttendanceSummary, StudentSectionSummary)
+from app.attendance.marks import insert_attendance_batch
+from app.attendance.summaries import rebuild_summaries
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_summaries.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['ATTENDANCE_CODE_TTL_MINUTES'] = 15
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+def _create_base(app):
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        lecturer = User(username='lect_sum', email='lect_sum@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        students = [User(username=f'stud_sum{i}', email=f'stud_sum{i}@st.ug.edu.gh', password=pw,
+                         role='student', is_approved=True) for i in range(3)]
+        dept = Department(name='Geography')
+        db.session.add_all([lecturer, dept] + students)
+        db.session.commit()
+        course = Course(code='GEO101', title='Maps', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='G', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        db.session.add_all([Enrollment(section_id=section.id, student_id=s.id) for s in students])
+        db.session.commit()
+        return {'section_id': section.id, 'student_ids': [s.id for s in students]}
+
+
+def _create_session(client, section_id):
+    start = datetime.utcnow().replace(second=0, microsecond=0)
+    client.post(f'/lecturer/sections/{section_id}/sessions', data={
+        'scheduled_start': start.strftime('%Y-%m-%dT%H:%M'),
+        'scheduled_end': (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+    })
+
+
+def test_summaries_follow_sessions_and_marks(app_instance, client):
+    data = _create_base(app_instance)
+    client.post('/auth/login', data={'username': 'lect_sum', 'password': 'pass123'})
+    _create_session(client, data['section_id'])
+    _create_session(client, data['section_id'])
+    with app_instance.app_context():
+        assert db.session.get(SectionAttendanceSummary, data['section_id']).session_count == 2
+        session_ids = [s.id for s in ClassSession.query.order_by(ClassSession.id)]
+
+    r = client.post(f'/lecturer/sessions/{session_ids[0]}/open')
+    code = parse_qs(urlparse(r.headers['Location']).query)['code'][0]
+    client.get('/auth/logout')
+    client.post('/auth/login', data={'username': 'stud_sum0', 'password': 'pass123'})
+    assert client.post(f'/api/student/sessions/{session_ids[0]}/mark', json={'code': code}).status_code == 200
+    # A duplicate mark does not count twice
+    client.post(f'/api/student/sessions/{session_ids[0]}/mark', json={'code': code})
+
+    with app_instance.app_context():
+        # Write-behind batches go through the same counters
+        insert_attendance_batch([(session_ids[1], data['student_ids'][0]), (session_ids[0], data['student_ids'][1])])
+        db.session.commit()
+        assert db.session.get(SessionAttendanceSummary, session_ids[0]).present_count == 2
+        assert db.session.get(SessionAttendanceSummary, session_ids[1]).present_count == 1
+        assert db.session.get(StudentSectionSummary, (data['section_id'], data['student_ids'][0])).present_count == 2
+        assert db.session.get(StudentSectionSummary, (data['section_id'], data['student_ids'][1])).present_count == 1
+        assert all(v == 0 for v in rebuild_summaries(check=True).values())
+
+    page = client.get('/student/attendance').get_data(as_text=True)
+    assert '2/2' in page and '100.0%' in page
+
+
+def test_rebuild_command_reports_and_fixes_drift(app_instance):
+    data = _create_base(app_instance)
+    with app_instance.app_context():
+        sess = ClassSession(section_id=data['section_id'], scheduled_start=datetime(2026, 2, 2, 9),
+                            scheduled_end=datetime(2026, 2, 2, 10), status='closed')
+        db.session.add(sess)
+        db.session.commit()
+        # Raw insert that bypasses the counters
+        db.session.add(AttendanceRecord(class_session_id=sess.id, student_id=data['student_ids'][2]))
+        db.session.commit()
+
+    runner = app_instance.test_cli_runner()
+    result = runner.invoke(args=['rebuild-summaries', '--check'])
+    assert result.exit_code == 1 and 'session_attendance_summary: 1 row(s) out of date' in result.output
+
+    result = runner.invoke(args=['rebuild-summaries'])
+    assert result.exit_code == 0
+    result = runner.invoke(args=['rebuild-summaries', '--check'])
+    assert result.exit_code == 0
+    with app_instance.app_context():
+        assert db.session.get(SectionAttendanceSummary, data['section_id']).session_count == 1
+        assert db.session.get(StudentSectionSummary, (data['section_id'], data['student_ids'][2])).present_count == 1
+
+
+def test_startup_backfills_empty_summaries_once(app_instance):
+    from app.attendance.summaries import backfill_summaries
+
+    data = _create_base(app_instance)
+    with app_instance.app_context():
+        sess = ClassSession(section_id=data['section_id'], scheduled_start=datetime(2026, 2, 2, 9),
+                            scheduled_end=datetime(2026, 2, 2, 10), status='closed')
+        db.session.add(sess)
+        db.session.commit()
+        # Rows from before the summary tables existed
+        db.session.add(AttendanceRecord(class_session_id=sess.id, student_id=data['student_ids'][0]))
+        db.session.commit()
+        session_id = sess.id
+
+    create_app()
+    with app_instance.app_context():
+        assert db.session.get(SectionAttendanceSummary, data['section_id']).session_count == 1
+        assert db.session.get(SessionAttendanceSummary, session_id).present_count == 1
+        # Already filled: later starts leave the counters alone
+        assert backfill_summaries() is False
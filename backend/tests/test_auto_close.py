@@ -0,0 +1,110 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, ClassSession
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_auto_close.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['ATTENDANCE_CODE_TTL_MINUTES'] = 15
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+def _create_sessions(app):
+    now = datetime.utcnow()
+    with app.app_context():
+        lecturer = User(username='lect_ac', email='lect_ac@staff.ug.edu.gh',
+                        password=generate_password_hash('pass123'), role='lecturer', is_approved=True)
+        dept = Department(name='Music')
+        db.session.add_all([lecturer, dept])
+        db.session.commit()
+        course = Course(code='MUS101', title='Music Theory', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='M', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+
+        def mk(start, end, status, opened_at=None):
+            s = ClassSession(section_id=section.id, scheduled_start=start, scheduled_end=end,
+                             status=status, opened_at=opened_at, open_code_hash='x' if opened_at else None)
+            db.session.add(s)
+            return s
+
+        ttl_expired = mk(now - timedelta(minutes=30), now + timedelta(hours=1), 'open', now - timedelta(minutes=20))
+        ended = mk(now - timedelta(hours=2), now - timedelta(hours=1), 'open', now - timedelta(hours=2, minutes=-5))
+        fresh = mk(now, now + timedelta(hours=1), 'open', now)
+        scheduled = mk(now - timedelta(hours=3), now - timedelta(hours=2), 'scheduled')
+        db.session.commit()
+        return {'section_id': section.id, 'ttl_expired': ttl_expired.id, 'ended': ended.id,
+                'fresh': fresh.id, 'scheduled': scheduled.id}
+
+
+def _statuses(app, data):
+    with app.app_context():
+        return {k: db.session.get(ClassSession, data[k]).status for k in ('ttl_expired', 'ended', 'fresh', 'scheduled')}
+
+
+def test_sessions_page_is_read_only_and_cli_closes_expired(app_instance):
+    data = _create_sessions(app_instance)
+    client = app_instance.test_client()
+    client.post('/auth/login', data={'username': 'lect_ac', 'password': 'pass123'})
+    assert client.get(f"/lecturer/sections/{data['section_id']}/sessions").status_code == 200
+    assert _statuses(app_instance, data)['ttl_expired'] == 'open'
+
+    result = app_instance.test_cli_runner().invoke(args=['close-expired-sessions'])
+    assert 'Closed 2 expired session(s).' in result.output
+    assert _statuses(app_instance, data) == {
+        'ttl_expired': 'closed', 'ended': 'closed', 'fresh': 'open', 'scheduled': 'scheduled'
+    }
+
+
+def test_closing_expired_sessions_drops_their_caches(app_instance):
+    from app.attendance.autoclose import close_expired_sessions
+    from app.attendance.live import get_live
+    from app.attendance.qr import get_qr_cache
+
+    data = _create_sessions(app_instance)
+    with app_instance.app_context():
+        for key in ('ended', 'fresh'):
+            get_live().snapshot(data[key])
+            get_qr_cache().get_or_render(data[key], 'svg', f'https://example.test/{key}')
+        assert close_expired_sessions() == 2
+        db.session.commit()
+        assert len(get_qr_cache()) == 1
+        assert set(get_live()._counters) == {data['fresh']}
+
+
+def test_scheduler_only_starts_when_enabled(app_instance):
+    from app.attendance import autoclose
+
+    app_instance.config.update(TESTING=False, AUTO_CLOSE_SCHEDULER=False)
+    autoclose.init_app(app_instance)
+    assert 'session_auto_close' not in app_instance.extensions
+
+    app_instance.config['AUTO_CLOSE_SCHEDULER'] = True
+    autoclose.init_app(app_instance)
+    stop = app_instance.extensions.pop('session_auto_close')
+    stop.set()
+
+
+
+@pytest.mark.skipif('AUTO_CLOSE_SCHEDULER' in os.environ, reason='checks the default setting')
+def test_scheduler_starts_by_default_outside_testing(app_instance):
+    from app.attendance import autoclose
+
+    app_instance.config['TESTING'] = False
+    autoclose.init_app(app_instance)
+    app_instance.extensions.pop('session_auto_close').set()
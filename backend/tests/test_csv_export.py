@@ -0,0 +1,136 @@
+import csv
+import gzip
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment, ClassSession, AttendanceRecord
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_csv_export.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+def _create_base(app):
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        admin = User(username='admin_csv', email='admin_csv@ug.edu.gh', password=pw, role='admin', is_approved=True)
+        lecturer = User(username='lect_csv', email='lect_csv@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        students = [User(username=f'stud_csv{i}', email=f'stud_csv{i}@st.ug.edu.gh', password=pw,
+                         role='student', is_approved=True) for i in range(3)]
+        dept = Department(name='History')
+        db.session.add_all([admin, lecturer, dept] + students)
+        db.session.commit()
+        course = Course(code='HIS101', title='World History', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='H', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        db.session.add_all([Enrollment(section_id=section.id, student_id=s.id) for s in students])
+        start = datetime(2026, 3, 2, 9, 0)
+        sessions = [ClassSession(section_id=section.id, scheduled_start=start + timedelta(days=7 * i),
+                                 scheduled_end=start + timedelta(days=7 * i, hours=1), status='closed')
+                    for i in range(2)]
+        db.session.add_all(sessions)
+        db.session.commit()
+        # Student 0 attended both sessions, student 1 only the first
+        db.session.add_all([
+            AttendanceRecord(class_session_id=sessions[0].id, student_id=students[0].id, recorded_at=start),
+            AttendanceRecord(class_session_id=sessions[1].id, student_id=students[0].id, recorded_at=start),
+            AttendanceRecord(class_session_id=sessions[0].id, student_id=students[1].id, recorded_at=start),
+        ])
+        db.session.commit()
+        return {'section_id': section.id, 'session_ids': [s.id for s in sessions]}
+
+
+def _rows(resp):
+    assert resp.status_code == 200 and resp.is_streamed
+    assert resp.headers['Content-Type'] == 'text/csv; charset=utf-8'
+    return list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+
+
+def test_section_and_session_exports_stream_full_matrix(app_instance, client):
+    data = _create_base(app_instance)
+
+    client.post('/auth/login', data={'username': 'admin_csv', 'password': 'pass123'})
+    rows = _rows(client.get(f"/admin/sections/{data['section_id']}/attendance.csv"))
+    assert len(rows) == 6
+    assert [r['session_id'] for r in rows] == [str(data['session_ids'][0])] * 3 + [str(data['session_ids'][1])] * 3
+    assert [r['status'] for r in rows] == ['present', 'present', 'absent', 'present', 'absent', 'absent']
+    assert rows[0]['recorded_at'] == '2026-03-02T09:00:00' and rows[2]['recorded_at'] == ''
+    client.get('/auth/logout')
+
+    client.post('/auth/login', data={'username': 'lect_csv', 'password': 'pass123'})
+    rows = _rows(client.get(f"/lecturer/sessions/{data['session_ids'][1]}/attendance.csv"))
+    assert [(r['username'], r['status']) for r in rows] == [
+        ('stud_csv0', 'present'), ('stud_csv1', 'absent'), ('stud_csv2', 'absent')]
+    assert rows[0]['section_code'] == 'H' and rows[0]['scheduled_start'] == '2026-03-09T09:00'
+
+
+def test_student_export_lists_every_session(app_instance, client):
+    _create_base(app_instance)
+    client.post('/auth/login', data={'username': 'stud_csv1', 'password': 'pass123'})
+    rows = _rows(client.get('/student/attendance.csv'))
+    assert [(r['course_code'], r['status']) for r in rows] == [('HIS101', 'present'), ('HIS101', 'absent')]
+
+
+def test_institution_export_filters_chunks_and_gzip(app_instance, client, tmp_path):
+    data = _create_base(app_instance)
+    with app_instance.app_context():
+        other = Department(name='Law')
+        db.session.add(other)
+        db.session.commit()
+        course = Course(code='LAW101', title='Contracts', department_id=other.id)
+        db.session.add(course)
+        db.session.commit()
+        lecturer = User.query.filter_by(username='lect_csv').one()
+        section = Section(course_id=course.id, section_code='L', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        student = User.query.filter_by(username='stud_csv2').one()
+        db.session.add(Enrollment(section_id=section.id, student_id=student.id))
+        db.session.add(ClassSession(section_id=section.id, scheduled_start=datetime(2026, 5, 4, 9),
+                                    scheduled_end=datetime(2026, 5, 4, 10), status='closed'))
+        db.session.commit()
+        history_dept = Department.query.filter_by(name='History').one().id
+
+        # Keyset paging across chunks yields the same rows as one big chunk
+        from app.exports import iter_attendance_matrix
+        assert list(iter_attendance_matrix(sessions_per_chunk=1)) == list(iter_attendance_matrix())
+
+    client.post('/auth/login', data={'username': 'admin_csv', 'password': 'pass123'})
+    rows = _rows(client.get('/admin/attendance/export.csv'))
+    assert len(rows) == 7 and rows[-1]['department'] == 'Law' and rows[-1]['course_code'] == 'LAW101'
+
+    rows = _rows(client.get(f'/admin/attendance/export.csv?department_id={history_dept}&start=2026-03-05'))
+    assert len(rows) == 3 and {r['session_id'] for r in rows} == {str(data['session_ids'][1])}
+
+    r = client.get('/admin/attendance/export.csv?gzip=1')
+    assert r.mimetype == 'application/gzip' and 'attendance_all.csv.gz' in r.headers['Content-Disposition']
+    text = gzip.decompress(r.data).decode('utf-8')
+    assert len(list(csv.DictReader(io.StringIO(text)))) == 7
+    assert client.get('/admin/attendance/export.csv?start=bad').status_code == 400
+
+    out = tmp_path / 'export.csv.gz'
+    result = app_instance.test_cli_runner().invoke(args=['export-attendance', '--gzip', '--output', str(out)])
+    assert result.exit_code == 0
+    assert gzip.decompress(out.read_bytes()).decode('utf-8') == text
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment
+from app.enrollment_index import get_enrollment_index
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_enrollment_index.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['ENROLLMENT_INDEX_CHECK_SECONDS'] = 0
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+def _create_base(app):
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        admin = User(username='admin_idx', email='admin_idx@staff.ug.edu.gh', password=pw, role='admin', is_approved=True)
+        lecturer = User(username='lect_idx', email='lect_idx@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        student = User(username='stud_idx', email='stud_idx@st.ug.edu.gh', password=pw, role='student', is_approved=True)
+        dept = Department(name='History')
+        db.session.add_all([admin, lecturer, student, dept])
+        db.session.commit()
+        course = Course(code='HIST101', title='World History', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='H', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        enr = Enrollment(section_id=section.id, student_id=student.id)
+        db.session.add(enr)
+        db.session.commit()
+        return {'section_id': section.id, 'student_id': student.id, 'enrollment_id': enr.id}
+
+
+def test_index_tracks_enrollment_changes_and_reports_metrics(app_instance, client):
+    data = _create_base(app_instance)
+    with app_instance.app_context():
+        index = get_enrollment_index()
+        assert index.is_enrolled(data['section_id'], data['student_id'])
+        assert index.is_enrolled(data['section_id'], data['student_id'])
+
+    client.post('/auth/login', data={'username': 'admin_idx', 'password': 'pass123'})
+    r = client.post(f"/admin/enrollments/delete/{data['enrollment_id']}", follow_redirects=False)
+    assert r.status_code in (302, 303)
+
+    with app_instance.app_context():
+        assert not get_enrollment_index().is_enrolled(data['section_id'], data['student_id'])
+
+    stats = client.get('/admin/metrics').get_json()
+    assert stats['counters']['enrollment_index.hits'] >= 1
+    assert stats['counters']['enrollment_index.misses'] >= 2
+    assert stats['timings']['enrollment_index.rebuild']['count'] >= 2
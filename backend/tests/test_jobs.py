@@ -0,0 +1,112 @@
+import io
+import os
+import time
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.jobs import job, enqueue
+from app.models import User, Department, Course, Section, Enrollment, Job
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_jobs.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['JOB_WORKERS'] = 1
+    app.config['JOB_SPOOL_DIR'] = str(tmp_path)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+@job('test_failing')
+def _failing_job(ctx, message):
+    ctx.progress(1, 2)
+    raise RuntimeError(message)
+
+
+def _seed(app):
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        lecturer = User(username='lect_job', email='lect_job@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        db.session.add_all([
+            User(username='admin_job', email='admin_job@ug.edu.gh', password=pw, role='admin', is_approved=True),
+            lecturer,
+        ])
+        dept = Department(name='Jobs')
+        db.session.add(dept)
+        db.session.commit()
+        course = Course(code='JOB101', title='Queues', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='Q', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        return section.id
+
+
+def _wait(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = client.get(f'/admin/jobs/{job_id}.json').get_json()
+        if info['status'] in ('done', 'failed'):
+            return info
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} did not finish: {info}')
+
+
+def test_background_upload_reports_progress_and_result(app_instance, client, tmp_path):
+    section_id = _seed(app_instance)
+    app_instance.config['ENROLLMENT_UPLOAD_CHUNK_ROWS'] = 40
+    client.post('/auth/login', data={'username': 'admin_job', 'password': 'pass123'})
+
+    body = 'email\n' + ''.join(f'job_s{i}@st.ug.edu.gh\n' for i in range(150)) + 'broken\n'
+    r = client.post('/admin/enrollments/upload',
+                    data={'csv_file': (io.BytesIO(body.encode()), 'bg.csv'), 'section_id': str(section_id),
+                          'create_missing': 'on', 'background': 'on'},
+                    content_type='multipart/form-data')
+    assert r.status_code == 302
+    job_id = int(r.headers['Location'].rstrip('/').split('/')[-1])
+
+    info = _wait(client, job_id)
+    assert info['status'] == 'done' and info['percent'] == 100.0
+    assert info['progress_done'] == info['progress_total'] == len(body)
+    assert info['result']['enrolled'] == 150 and info['result']['created_pending'] == 150
+    assert info['result']['errors'] == ['Line 152: invalid email']
+    assert not list(tmp_path.glob('enrollments-*.csv'))
+
+    page = client.get(f'/admin/jobs/{job_id}').get_data(as_text=True)
+    assert 'Line 152: invalid email' in page and 'enrollment_upload' in page
+    with app_instance.app_context():
+        assert Enrollment.query.filter_by(section_id=section_id).count() == 150
+
+
+def test_failed_job_is_recorded(app_instance, client):
+    _seed(app_instance)
+    app_instance.config['JOB_WORKERS'] = 0
+    with app_instance.app_context():
+        job_id = enqueue('test_failing', {'message': 'boom'})
+        # The job ran inline in its own app context (and session)
+        db.session.expire_all()
+        row = db.session.get(Job, job_id)
+        assert row.status == 'failed' and row.error == 'RuntimeError: boom'
+        assert row.progress_done == 1 and row.progress_total == 2 and row.finished_at is not None
+        with pytest.raises(ValueError):
+            enqueue('no_such_kind')
+
+    client.post('/auth/login', data={'username': 'admin_job', 'password': 'pass123'})
+    assert client.get(f'/admin/jobs/{job_id}.json').get_json()['error'] == 'RuntimeError: boom'
+    client.get('/auth/logout')
+    client.post('/auth/login', data={'username': 'lect_job', 'password': 'pass123'})
+    assert client.get(f'/admin/jobs/{job_id}.json').status_code == 302
@@ -0,0 +1,131 @@
+import json
+import os
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment, ClassSession
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_live.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['ATTENDANCE_CODE_TTL_MINUTES'] = 15
+    app.config['LIVE_STREAM_MAX_SECONDS'] = 0.2
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+def _create_base(app):
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        lecturer = User(username='lect_live', email='lect_live@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        student = User(username='stud_live', email='stud_live@st.ug.edu.gh', password=pw, role='student', is_approved=True)
+        dept = Department(name='Drama')
+        db.session.add_all([lecturer, student, dept])
+        db.session.commit()
+        course = Course(code='DRA101', title='Stagecraft', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='D', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        db.session.add(Enrollment(section_id=section.id, student_id=student.id))
+        sess = ClassSession(section_id=section.id,
+                            scheduled_start=datetime.utcnow(),
+                            scheduled_end=datetime.utcnow() + timedelta(hours=1),
+                            status='scheduled')
+        db.session.add(sess)
+        db.session.commit()
+        return sess.id
+
+
+def test_live_counter_follows_marks(app_instance):
+    session_id = _create_base(app_instance)
+    lecturer = app_instance.test_client()
+    student = app_instance.test_client()
+    lecturer.post('/auth/login', data={'username': 'lect_live', 'password': 'pass123'})
+    student.post('/auth/login', data={'username': 'stud_live', 'password': 'pass123'})
+
+    r = lecturer.post(f'/lecturer/sessions/{session_id}/open')
+    code = parse_qs(urlparse(r.headers['Location']).query)['code'][0]
+
+    snap = lecturer.get(f'/lecturer/sessions/{session_id}/live?format=json').get_json()
+    assert snap['count'] == 0
+
+    student.post(f'/api/student/sessions/{session_id}/mark', json={'code': code})
+
+    # Counter moved, so the long-poll returns immediately
+    snap2 = lecturer.get(f"/lecturer/sessions/{session_id}/live?format=json&since={snap['seq']}&wait=5").get_json()
+    assert snap2['count'] == 1
+    assert snap2['recent'][0]['username'] == 'stud_live'
+
+    r = lecturer.get(f'/lecturer/sessions/{session_id}/live')
+    assert r.mimetype == 'text/event-stream'
+    events = [line[len('data: '):] for line in r.get_data(as_text=True).splitlines() if line.startswith('data: ')]
+    assert json.loads(events[0])['count'] == 1
+
+    # Students cannot watch the counter
+    assert student.get(f'/lecturer/sessions/{session_id}/live?format=json').status_code in (302, 303)
+
+
+def test_live_stream_on_worker_with_stale_registry_stays_open(app_instance):
+    session_id = _create_base(app_instance)
+    other = create_app()
+    other.config['OPEN_SESSION_REGISTRY_CHECK_SECONDS'] = 3600
+    other.config['LIVE_STREAM_MAX_SECONDS'] = 0.2
+    lecturer = app_instance.test_client()
+    other_lecturer = other.test_client()
+    lecturer.post('/auth/login', data={'username': 'lect_live', 'password': 'pass123'})
+    other_lecturer.post('/auth/login', data={'username': 'lect_live', 'password': 'pass123'})
+    with other.app_context():
+        from app.attendance.registry import get_registry
+        assert get_registry().get(session_id) is None
+
+    lecturer.post(f'/lecturer/sessions/{session_id}/open')
+    body = other_lecturer.get(f'/lecturer/sessions/{session_id}/live').get_data(as_text=True)
+    assert 'data: ' in body and 'event: closed' not in body
+
+    lecturer.post(f'/lecturer/sessions/{session_id}/close')
+    body = other_lecturer.get(f'/lecturer/sessions/{session_id}/live').get_data(as_text=True)
+    assert 'event: closed' in body
+
+
+def test_opened_sessions_page_does_not_reload_sessions_one_by_one(app_instance):
+    from sqlalchemy import event
+
+    session_id = _create_base(app_instance)
+    with app_instance.app_context():
+        section_id = db.session.get(ClassSession, session_id).section_id
+        db.session.add_all([ClassSession(section_id=section_id,
+                                         scheduled_start=datetime.utcnow() - timedelta(days=d + 1),
+                                         scheduled_end=datetime.utcnow() - timedelta(days=d + 1) + timedelta(hours=1),
+                                         status='closed') for d in range(40)])
+        db.session.commit()
+        engine = db.engine
+    lecturer = app_instance.test_client()
+    lecturer.post('/auth/login', data={'username': 'lect_live', 'password': 'pass123'})
+    location = lecturer.post(f'/lecturer/sessions/{session_id}/open').headers['Location']
+
+    def count(url):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            assert lecturer.get(url).status_code == 200
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        return len(statements)
+
+    plain = count(f'/lecturer/sections/{section_id}/sessions')
+    # Only the live counter's seed queries on top of the plain page
+    assert count(location) <= plain + 3
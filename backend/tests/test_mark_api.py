@@ -0,0 +1,84 @@
+import os
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment, ClassSession, AttendanceRecord
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_mark_api.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['ATTENDANCE_CODE_TTL_MINUTES'] = 15
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+def _create_base(app):
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        lecturer = User(username='lect_api', email='lect_api@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        student = User(username='stud_api', email='stud_api@st.ug.edu.gh', password=pw, role='student', is_approved=True)
+        outsider = User(username='out_api', email='out_api@st.ug.edu.gh', password=pw, role='student', is_approved=True)
+        dept = Department(name='Philosophy')
+        db.session.add_all([lecturer, student, outsider, dept])
+        db.session.commit()
+        course = Course(code='PHIL101', title='Logic', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='P', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        db.session.add(Enrollment(section_id=section.id, student_id=student.id))
+        sess = ClassSession(section_id=section.id,
+                            scheduled_start=datetime.utcnow(),
+                            scheduled_end=datetime.utcnow() + timedelta(hours=1),
+                            status='scheduled')
+        db.session.add(sess)
+        db.session.commit()
+        return {'session_id': sess.id, 'student_id': student.id}
+
+
+def test_json_mark_outcomes(app_instance, client):
+    data = _create_base(app_instance)
+    url = f"/api/student/sessions/{data['session_id']}/mark"
+
+    client.post('/auth/login', data={'username': 'lect_api', 'password': 'pass123'})
+    r = client.post(f"/lecturer/sessions/{data['session_id']}/open")
+    code = parse_qs(urlparse(r.headers['Location']).query)['code'][0]
+    client.get('/auth/logout')
+
+    client.post('/auth/login', data={'username': 'out_api', 'password': 'pass123'})
+    r = client.post(url, json={'code': code})
+    assert r.status_code == 403 and r.get_json()['outcome'] == 'not_enrolled'
+    client.get('/auth/logout')
+
+    client.post('/auth/login', data={'username': 'stud_api', 'password': 'pass123'})
+    wrong = '000000' if code != '000000' else '111111'
+    r = client.post(url, json={'code': wrong})
+    assert r.status_code == 400 and r.get_json()['outcome'] == 'wrong_code'
+
+    r = client.post(url, json={'code': code})
+    assert r.status_code == 200 and r.get_json()['outcome'] == 'recorded'
+    r = client.post(url, json={'code': code})
+    assert r.status_code == 200 and r.get_json()['outcome'] == 'duplicate'
+
+    r = client.post('/api/student/sessions/9999/mark', json={'code': code})
+    assert r.status_code == 404 and r.get_json()['outcome'] == 'not_found'
+
+    with app_instance.app_context():
+        assert AttendanceRecord.query.filter_by(class_session_id=data['session_id']).count() == 1
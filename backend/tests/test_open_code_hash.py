@@ -0,0 +1,84 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment, ClassSession, AttendanceRecord
+from app.attendance.codes import hash_open_code, verify_open_code, is_hmac_hash
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_open_code.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['ATTENDANCE_CODE_TTL_MINUTES'] = 15
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+def _create_open_session(app, code_hash):
+    with app.app_context():
+        dept = Department(name='Chemistry')
+        db.session.add(dept)
+        db.session.commit()
+        course = Course(code='CHEM101', title='General Chemistry', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        lecturer = User(username='lect_code', email='lect_code@staff.ug.edu.gh',
+                        password=generate_password_hash('pass123'), role='lecturer', is_approved=True)
+        student = User(username='stud_code', email='stud_code@st.ug.edu.gh',
+                       password=generate_password_hash('pass123'), role='student', is_approved=True)
+        db.session.add_all([lecturer, student])
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='C', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        db.session.add(Enrollment(section_id=section.id, student_id=student.id))
+        sess = ClassSession(
+            section_id=section.id,
+            scheduled_start=datetime.utcnow(),
+            scheduled_end=datetime.utcnow() + timedelta(hours=1),
+            status='open',
+            open_code_hash=code_hash,
+            opened_at=datetime.utcnow(),
+        )
+        db.session.add(sess)
+        db.session.commit()
+        return {'session_id': sess.id, 'student_id': student.id}
+
+
+def test_hmac_code_roundtrip(app_instance):
+    with app_instance.app_context():
+        stored = hash_open_code('123456', 7)
+        assert is_hmac_hash(stored)
+        assert verify_open_code(stored, '123456', 7)
+        assert not verify_open_code(stored, '654321', 7)
+        # Digest is bound to the session it was issued for
+        assert not verify_open_code(stored, '123456', 8)
+
+
+def test_legacy_kdf_hash_still_verifies_and_is_upgraded(app_instance, client):
+    data = _create_open_session(app_instance, generate_password_hash('246810'))
+
+    client.post('/auth/login', data={'username': 'stud_code', 'password': 'pass123'})
+    r = client.post(f"/student/sessions/{data['session_id']}/mark", data={'code': '246810'}, follow_redirects=False)
+    assert r.status_code in (302, 303)
+
+    with app_instance.app_context():
+        assert AttendanceRecord.query.filter_by(class_session_id=data['session_id'],
+                                                student_id=data['student_id']).count() == 1
+        sess = db.session.get(ClassSession, data['session_id'])
+        assert is_hmac_hash(sess.open_code_hash)
+        assert verify_open_code(sess.open_code_hash, '246810', sess.id)
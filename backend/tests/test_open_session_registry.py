@@ -0,0 +1,98 @@
+import os
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment, ClassSession
+from app.attendance.registry import get_registry
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_registry.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['ATTENDANCE_CODE_TTL_MINUTES'] = 15
+    # Re-check the shared version on every lookup so tests see changes immediately
+    app.config['OPEN_SESSION_REGISTRY_CHECK_SECONDS'] = 0
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+def _create_base(app):
+    with app.app_context():
+        dept = Department(name='Biology')
+        db.session.add(dept)
+        db.session.commit()
+        course = Course(code='BIO101', title='Cell Biology', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        lecturer = User(username='lect_reg', email='lect_reg@staff.ug.edu.gh',
+                        password=generate_password_hash('pass123'), role='lecturer', is_approved=True)
+        student = User(username='stud_reg', email='stud_reg@st.ug.edu.gh',
+                       password=generate_password_hash('pass123'), role='student', is_approved=True)
+        db.session.add_all([lecturer, student])
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='R', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        db.session.add(Enrollment(section_id=section.id, student_id=student.id))
+        sess = ClassSession(section_id=section.id,
+                            scheduled_start=datetime.utcnow(),
+                            scheduled_end=datetime.utcnow() + timedelta(hours=1),
+                            status='scheduled')
+        db.session.add(sess)
+        db.session.commit()
+        return {'session_id': sess.id, 'section_id': section.id}
+
+
+def test_registry_follows_open_and_close(app_instance, client):
+    data = _create_base(app_instance)
+    client.post('/auth/login', data={'username': 'lect_reg', 'password': 'pass123'})
+
+    r = client.post(f"/lecturer/sessions/{data['session_id']}/open", follow_redirects=False)
+    code = parse_qs(urlparse(r.headers['Location']).query)['code'][0]
+    with app_instance.app_context():
+        entry = get_registry().get(data['session_id'])
+        assert entry is not None
+        assert entry.section_id == data['section_id']
+        assert entry.course_code == 'BIO101'
+
+    client.get('/auth/logout')
+    client.post('/auth/login', data={'username': 'stud_reg', 'password': 'pass123'})
+    r = client.get(f"/student/sessions/{data['session_id']}/mark?code={code}")
+    assert r.status_code == 200
+    assert b'BIO101' in r.data
+
+    client.get('/auth/logout')
+    client.post('/auth/login', data={'username': 'lect_reg', 'password': 'pass123'})
+    client.post(f"/lecturer/sessions/{data['session_id']}/close")
+    with app_instance.app_context():
+        assert get_registry().get(data['session_id']) is None
+
+
+def test_registry_notices_changes_from_other_workers(app_instance):
+    data = _create_base(app_instance)
+    with app_instance.app_context():
+        assert get_registry().get(data['session_id']) is None
+        # Simulate another worker opening the session: a committed row change plus version bump,
+        # without touching this process's registry object
+        ClassSession.query.filter_by(id=data['session_id']).update(
+            {'status': 'open', 'open_code_hash': 'x', 'opened_at': datetime.utcnow()})
+        from app import cache_versions
+        from app.attendance.registry import VERSION_KEY
+        cache_versions.bump(VERSION_KEY)
+        db.session.commit()
+        assert get_registry().get(data['session_id']) is not None
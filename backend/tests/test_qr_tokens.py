@@ -0,0 +1,126 @@
+import os
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment, ClassSession, AttendanceRecord
+from app.attendance.tokens import make_qr_token, verify_qr_token, token_is_current
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_qr_tokens.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['ATTENDANCE_CODE_TTL_MINUTES'] = 15
+    app.config['ATTENDANCE_QR_TOKENS'] = True
+    app.config['ATTENDANCE_QR_ROTATE_SECONDS'] = 30
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+def _create_base(app):
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        lecturer = User(username='lect_tok', email='lect_tok@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        student = User(username='stud_tok', email='stud_tok@st.ug.edu.gh', password=pw, role='student', is_approved=True)
+        dept = Department(name='Music')
+        db.session.add_all([lecturer, student, dept])
+        db.session.commit()
+        course = Course(code='MUS101', title='Harmony', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='T', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        db.session.add(Enrollment(section_id=section.id, student_id=student.id))
+        sess = ClassSession(section_id=section.id,
+                            scheduled_start=datetime.utcnow(),
+                            scheduled_end=datetime.utcnow() + timedelta(hours=1),
+                            status='scheduled')
+        db.session.add(sess)
+        db.session.commit()
+        return {'session_id': sess.id, 'section_id': section.id, 'student_id': student.id}
+
+
+def _open(client, session_id):
+    client.post('/auth/login', data={'username': 'lect_tok', 'password': 'pass123'})
+    r = client.post(f'/lecturer/sessions/{session_id}/open')
+    code = parse_qs(urlparse(r.headers['Location']).query)['code'][0]
+    client.get('/auth/logout')
+    return code
+
+
+def test_token_round_trip_and_rotation(app_instance):
+    with app_instance.app_context():
+        expires = datetime.utcnow() + timedelta(minutes=10)
+        now = time.time()
+        token = make_qr_token(5, 7, expires, now=now)
+        claims = verify_qr_token(token)
+        assert claims.session_id == 5 and claims.section_id == 7
+        assert token_is_current(claims, now=now)
+        assert token_is_current(claims, now=now + 30)
+        assert not token_is_current(claims, now=now + 90)
+        assert not token_is_current(claims, now=now + 3600)
+
+        body, sig = token.rsplit('.', 1)
+        assert verify_qr_token(body.replace('5.', '6.', 1) + '.' + sig) is None
+        assert verify_qr_token('garbage') is None
+
+
+def test_scanned_token_marks_without_code(app_instance, client):
+    data = _create_base(app_instance)
+    _open(client, data['session_id'])
+    with app_instance.app_context():
+        sess = db.session.get(ClassSession, data['session_id'])
+        expires = min(sess.scheduled_end, sess.opened_at + timedelta(minutes=15))
+        token = make_qr_token(data['session_id'], data['section_id'], expires)
+
+    client.post('/auth/login', data={'username': 'stud_tok', 'password': 'pass123'})
+    page = client.get(f"/student/sessions/{data['session_id']}/mark?t={token}")
+    assert page.status_code == 200 and token.encode() in page.data
+
+    r = client.post(f"/api/student/sessions/{data['session_id']}/mark", json={'token': token})
+    assert r.status_code == 200 and r.get_json()['outcome'] == 'recorded'
+    with app_instance.app_context():
+        assert AttendanceRecord.query.filter_by(class_session_id=data['session_id'],
+                                                student_id=data['student_id']).count() == 1
+
+
+def test_forged_and_expired_tokens_rejected(app_instance, client):
+    data = _create_base(app_instance)
+    code = _open(client, data['session_id'])
+    url = f"/api/student/sessions/{data['session_id']}/mark"
+    with app_instance.app_context():
+        good = make_qr_token(data['session_id'], data['section_id'], datetime.utcnow() + timedelta(minutes=5))
+        expired = make_qr_token(data['session_id'], data['section_id'], datetime.utcnow() - timedelta(minutes=1))
+        stale = make_qr_token(data['session_id'], data['section_id'], datetime.utcnow() + timedelta(minutes=5),
+                              now=time.time() - 120)
+        other = make_qr_token(data['session_id'] + 1, data['section_id'], datetime.utcnow() + timedelta(minutes=5))
+
+    client.post('/auth/login', data={'username': 'stud_tok', 'password': 'pass123'})
+    forged = good[:-2] + ('AA' if not good.endswith('AA') else 'BB')
+    assert client.post(url, json={'token': forged}).get_json()['outcome'] == 'invalid_token'
+    assert client.post(url, json={'token': other}).get_json()['outcome'] == 'invalid_token'
+    assert client.post(url, json={'token': stale}).get_json()['outcome'] == 'invalid_token'
+    r = client.post(url, json={'token': expired})
+    assert r.status_code == 410 and r.get_json()['outcome'] == 'expired'
+
+    # A bad scan sends the student to the plain mark page, where the typed code still works
+    r = client.get(f"/student/sessions/{data['session_id']}/mark?t={forged}")
+    assert r.status_code == 302 and r.headers['Location'].endswith(f"/student/sessions/{data['session_id']}/mark")
+    r = client.post(url, json={'code': code, 'token': forged})
+    assert r.get_json()['outcome'] == 'recorded'
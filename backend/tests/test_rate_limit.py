@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from app.ratelimit import MemoryBackend, SQLiteBackend, TokenBucketLimiter
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteBackend(str(tmp_path / 'ratelimit.db'))
+    return MemoryBackend(max_keys=100)
+
+
+def test_bucket_allows_burst_then_refills(backend):
+    limiter = TokenBucketLimiter(backend, capacity=3, per_seconds=3, name='t')
+    now = 1000.0
+    assert all(backend.take('t:ip', limiter.capacity, limiter.rate, now) for _ in range(3))
+    assert not backend.take('t:ip', limiter.capacity, limiter.rate, now)
+    # One token per second comes back
+    assert backend.take('t:ip', limiter.capacity, limiter.rate, now + 1.0)
+    assert not backend.take('t:ip', limiter.capacity, limiter.rate, now + 1.0)
+    # Other keys are independent
+    assert backend.take('t:other', limiter.capacity, limiter.rate, now)
+
+
+def test_memory_backend_memory_is_bounded():
+    backend = MemoryBackend(max_keys=50)
+    for i in range(1000):
+        backend.take(f'k{i}', 5, 1.0, 1000.0)
+    assert len(backend) == 50
+    # Keys idle long enough to refill completely are dropped
+    backend.take('fresh', 5, 1.0, 2000.0)
+    assert len(backend) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_sqlite_backend_connects_after_fork(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'ratelimit.db'))
+    # Nothing is opened at construction, so a preforking server has no connection to copy
+    assert getattr(backend._local, 'conn', None) is None
+    assert backend.take('t:ip', 1, 1.0, 1000.0)
+
+    pid = os.fork()
+    if pid == 0:
+        # The child must not reuse the parent's connection
+        ok = backend._conn() is not None and not backend.take('t:ip', 1, 1.0, 1000.0)
+        os._exit(0 if ok and backend._local.pid == os.getpid() else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
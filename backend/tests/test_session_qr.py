@@ -0,0 +1,99 @@
+import os
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, ClassSession
+from app.attendance.qr import get_qr_cache
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_qr.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['ATTENDANCE_CODE_TTL_MINUTES'] = 15
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+def _create_base(app):
+    with app.app_context():
+        lecturer = User(username='lect_qr', email='lect_qr@staff.ug.edu.gh',
+                        password=generate_password_hash('pass123'), role='lecturer', is_approved=True)
+        dept = Department(name='Architecture')
+        db.session.add_all([lecturer, dept])
+        db.session.commit()
+        course = Course(code='ARC101', title='Design Studio', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='Q', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        sess = ClassSession(section_id=section.id,
+                            scheduled_start=datetime.utcnow(),
+                            scheduled_end=datetime.utcnow() + timedelta(hours=1),
+                            status='scheduled')
+        db.session.add(sess)
+        db.session.commit()
+        return sess.id
+
+
+def test_qr_endpoint_caches_and_revalidates(app_instance, client):
+    session_id = _create_base(app_instance)
+    client.post('/auth/login', data={'username': 'lect_qr', 'password': 'pass123'})
+    r = client.post(f'/lecturer/sessions/{session_id}/open')
+    code = parse_qs(urlparse(r.headers['Location']).query)['code'][0]
+
+    page = client.get(r.headers['Location'])
+    assert f'/lecturer/sessions/{session_id}/qr.svg?code={code}'.encode() in page.data
+
+    r1 = client.get(f'/lecturer/sessions/{session_id}/qr.svg?code={code}')
+    assert r1.status_code == 200 and r1.mimetype == 'image/svg+xml'
+    assert r1.headers['ETag'] and 'private' in r1.headers['Cache-Control']
+    r2 = client.get(f'/lecturer/sessions/{session_id}/qr.svg?code={code}', headers={'If-None-Match': r1.headers['ETag']})
+    assert r2.status_code == 304
+    png = client.get(f'/lecturer/sessions/{session_id}/qr.png?code={code}')
+    assert png.data.startswith(b'\x89PNG')
+
+    # A wrong code does not render anything
+    wrong = '000000' if code != '000000' else '111111'
+    assert client.get(f'/lecturer/sessions/{session_id}/qr.svg?code={wrong}').status_code == 404
+
+    with app_instance.app_context():
+        assert len(get_qr_cache()) == 2
+    client.post(f'/lecturer/sessions/{session_id}/close')
+    with app_instance.app_context():
+        assert len(get_qr_cache()) == 0
+    assert client.get(f'/lecturer/sessions/{session_id}/qr.svg?code={code}').status_code == 404
+
+
+def test_qr_served_by_worker_whose_registry_is_stale(app_instance, client):
+    session_id = _create_base(app_instance)
+    # A second worker on the same database that has just checked its registry
+    other = create_app()
+    other.config['OPEN_SESSION_REGISTRY_CHECK_SECONDS'] = 3600
+    other_client = other.test_client()
+    other_client.post('/auth/login', data={'username': 'lect_qr', 'password': 'pass123'})
+    with other.app_context():
+        from app.attendance.registry import get_registry
+        assert get_registry().get(session_id) is None
+
+    client.post('/auth/login', data={'username': 'lect_qr', 'password': 'pass123'})
+    r = client.post(f'/lecturer/sessions/{session_id}/open')
+    code = parse_qs(urlparse(r.headers['Location']).query)['code'][0]
+
+    r = other_client.get(f'/lecturer/sessions/{session_id}/qr.svg?code={code}')
+    assert r.status_code == 200 and r.mimetype == 'image/svg+xml'
@@ -0,0 +1,111 @@
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Enrollment, ClassSession, AttendanceRecord
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_session_roster.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+@contextmanager
+def _count_queries(app):
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _before)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before)
+
+
+def _create_session(app, code, n_students):
+    """A closed session of a section with n_students enrolled; even-numbered students are present."""
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        lecturer = User(username=f'lect_{code}', email=f'lect_{code}@staff.ug.edu.gh', password=pw,
+                        role='lecturer', is_approved=True)
+        dept = Department(name=f'Dept {code}')
+        db.session.add_all([lecturer, dept])
+        db.session.commit()
+        course = Course(code=code, title='Roster', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='R', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        start = datetime(2026, 3, 2, 9)
+        sess = ClassSession(section_id=section.id, scheduled_start=start,
+                            scheduled_end=start + timedelta(hours=1), status='closed')
+        db.session.add(sess)
+        db.session.flush()
+        for i in range(n_students):
+            stu = User(username=f'{code}_s{i}', email=f'{code}_s{i}@st.ug.edu.gh', password='!',
+                       role='student', is_approved=True)
+            db.session.add(stu)
+            db.session.flush()
+            db.session.add(Enrollment(section_id=section.id, student_id=stu.id))
+            if i % 2 == 0:
+                db.session.add(AttendanceRecord(class_session_id=sess.id, student_id=stu.id,
+                                                recorded_at=start + timedelta(minutes=i)))
+        db.session.commit()
+        return sess.id
+
+
+def test_roster_queries_do_not_grow_with_enrollment(app_instance, client):
+    small = _create_session(app_instance, 'RSM100', 2)
+    large = _create_session(app_instance, 'RLG100', 40)
+
+    counts = {}
+    for code, session_id in (('RSM100', small), ('RLG100', large)):
+        client.post('/auth/login', data={'username': f'lect_{code}', 'password': 'pass123'})
+        for suffix in ('attendance', 'attendance.csv'):
+            with _count_queries(app_instance) as statements:
+                r = client.get(f'/lecturer/sessions/{session_id}/{suffix}')
+                r.get_data()
+            assert r.status_code == 200
+            counts[(code, suffix)] = len(statements)
+        client.get('/auth/logout')
+
+    for suffix in ('attendance', 'attendance.csv'):
+        assert counts[('RSM100', suffix)] == counts[('RLG100', suffix)]
+
+
+def test_roster_reports_present_and_absent(app_instance, client):
+    session_id = _create_session(app_instance, 'RST100', 5)
+    client.post('/auth/login', data={'username': 'lect_RST100', 'password': 'pass123'})
+
+    html = client.get(f'/lecturer/sessions/{session_id}/attendance').get_data(as_text=True)
+    assert 'RST100_s4' in html and '3/5' in html
+
+    lines = client.get(f'/lecturer/sessions/{session_id}/attendance.csv').get_data(as_text=True).strip().splitlines()
+    assert len(lines) == 6
+    rows = [line.split(',') for line in lines[1:]]
+    assert [r[5] for r in rows] == [f'RST100_s{i}' for i in range(5)]
+    assert [r[7] for r in rows] == ['present', 'absent', 'present', 'absent', 'present']
+    assert rows[0][8] == '2026-03-02T09:00:00' and rows[1][8] == ''
@@ -0,0 +1,62 @@
+import os
+from datetime import date, time
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, Timetable, ClassSession
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_timetable.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+def _create_timetable(app):
+    with app.app_context():
+        lecturer = User(username='lect_tt', email='lect_tt@staff.ug.edu.gh',
+                        password=generate_password_hash('pass123'), role='lecturer', is_approved=True)
+        dept = Department(name='Statistics')
+        db.session.add_all([lecturer, dept])
+        db.session.commit()
+        course = Course(code='STAT101', title='Probability', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        db.session.add_all([
+            Section(course_id=course.id, section_code='S1', instructor_id=lecturer.id),
+            Section(course_id=course.id, section_code='S2', instructor_id=lecturer.id),
+            Timetable(course_id=course.id, day_of_week='Monday', start_time=time(8, 0), end_time=time(10, 0), level='100'),
+            Timetable(course_id=course.id, day_of_week='Wednesday', start_time=time(14, 0), end_time=time(15, 0), level='100'),
+        ])
+        db.session.commit()
+
+
+def test_generate_sessions_is_idempotent(app_instance):
+    _create_timetable(app_instance)
+    runner = app_instance.test_cli_runner()
+    # 2026-09-07 is a Monday: two weeks -> 2 Mondays + 2 Wednesdays per section
+    args = ['generate-sessions', '--start', '2026-09-07', '--end', '2026-09-20']
+
+    result = runner.invoke(args=args + ['--dry-run'])
+    assert 'Would create 8 session(s)' in result.output
+    with app_instance.app_context():
+        assert ClassSession.query.count() == 0
+
+    result = runner.invoke(args=args)
+    assert 'Created 8 session(s); 0 already existed' in result.output
+    result = runner.invoke(args=args)
+    assert 'Created 0 session(s); 8 already existed' in result.output
+
+    with app_instance.app_context():
+        starts = sorted(s.scheduled_start for s in ClassSession.query.all())
+        assert starts[0].date() == date(2026, 9, 7) and starts[0].time() == time(8, 0)
+        assert all(s.status == 'scheduled' for s in ClassSession.query.all())
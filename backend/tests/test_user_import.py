@@ -0,0 +1,121 @@
+import csv
+import io
+import os
+import time
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User
+from app.admin.user_import import UNSET_PASSWORD
+from app.auth.tokens import make_set_password_token, verify_set_password_token
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_user_import.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config['PASSWORD_HASH_WORKERS'] = 2
+    app.config['BASE_URL'] = 'https://attendance.example.edu'
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all([
+            User(username='admin_imp', email='admin_imp@ug.edu.gh', password=generate_password_hash('pass123'),
+                 role='admin', is_approved=True),
+            User(username='existing', email='existing@st.ug.edu.gh', password='!', role='student', is_approved=True),
+        ])
+        db.session.commit()
+    yield app
+
+
+@pytest.fixture
+def client(app_instance):
+    return app_instance.test_client()
+
+
+def _import(client, body):
+    client.post('/auth/login', data={'username': 'admin_imp', 'password': 'pass123'})
+    return client.post('/admin/users/import', data={'csv_file': (io.BytesIO(body.encode()), 'users.csv')},
+                       content_type='multipart/form-data')
+
+
+def test_bulk_import_creates_approved_users(app_instance, client):
+    rows = ['username,email,role,password', 'fresh1,fresh1@st.ug.edu.gh,student,', 'fresh2,fresh2@st.ug.edu.gh,Student,']
+    rows += [f'staff{i},staff{i}@staff.ug.edu.gh,lecturer,secret{i:03d}' for i in range(20)]
+    rows += ['existing,other@st.ug.edu.gh,student,', 'fresh1,dup@st.ug.edu.gh,student,',
+             'boss,boss@staff.ug.edu.gh,admin,', 'wrongdomain,wd@gmail.com,student,', 'shortpw,shortpw@st.ug.edu.gh,student,abc']
+    r = _import(client, '\n'.join(rows) + '\n')
+    assert r.status_code == 200
+    html = r.get_data(as_text=True)
+    for message in ('Line 25: username or email repeated in the file', 'Line 26: role must be one of',
+                    'Line 27: student email must end with @st.ug.edu.gh', 'Line 28: password must be at least 6'):
+        assert message in html
+
+    with app_instance.app_context():
+        fresh = User.query.filter_by(username='fresh2').first()
+        assert fresh.is_approved and fresh.role == 'student' and fresh.password == UNSET_PASSWORD
+        staff = User.query.filter(User.username.like('staff%')).order_by(User.id).all()
+        assert len(staff) == 20 and all(u.is_approved and u.role == 'lecturer' for u in staff)
+        assert check_password_hash(staff[7].password, 'secret007')
+        assert User.query.filter_by(email='other@st.ug.edu.gh').first() is None
+        assert User.query.count() == 2 + 22
+
+    # Accounts without a password cannot log in
+    client.get('/auth/logout')
+    r = client.post('/auth/login', data={'username': 'fresh1', 'password': UNSET_PASSWORD}, follow_redirects=True)
+    assert b'Invalid credentials.' in r.data
+
+
+def test_set_password_link_is_one_time(app_instance, client):
+    _import(client, 'newbie,newbie@st.ug.edu.gh,student\n')
+    links = client.get('/admin/users/set-password-links.csv?role=student').get_data(as_text=True)
+    rows = list(csv.reader(io.StringIO(links)))
+    assert rows[0] == ['username', 'email', 'role', 'set_password_url']
+    assert sorted(r[0] for r in rows[1:]) == ['existing', 'newbie']
+    url = next(r[3] for r in rows[1:] if r[0] == 'newbie')
+    assert url.startswith('https://attendance.example.edu/auth/set-password/')
+    path = url[len('https://attendance.example.edu'):]
+    client.get('/auth/logout')
+
+    assert b'newbie' in client.get(path).data
+    r = client.post(path, data={'password': 'brandnew', 'confirm': 'nope'}, follow_redirects=True)
+    assert b'Passwords do not match.' in r.data
+    r = client.post(path, data={'password': 'brandnew', 'confirm': 'brandnew'})
+    assert r.status_code == 302 and r.headers['Location'].endswith('/auth/login')
+
+    r = client.get(path, follow_redirects=True)
+    assert b'already been used' in r.data
+    r = client.post('/auth/login', data={'username': 'newbie', 'password': 'brandnew'})
+    assert r.status_code == 302 and '/student/' in r.headers['Location']
+
+
+def test_set_password_tokens_expire_and_reject_forgery(app_instance):
+    with app_instance.app_context():
+        user = User.query.filter_by(username='existing').first()
+        token = make_set_password_token(user.id, user.password)
+        assert verify_set_password_token(token).id == user.id
+        hours = app_instance.config['SET_PASSWORD_TOKEN_MAX_AGE_HOURS']
+        assert verify_set_password_token(token, now=time.time() + hours * 3600 + 60) is None
+        user_id, expires, sig = token.split('.')
+        assert verify_set_password_token(f'{user_id}.{int(expires) + 3600}.{sig}') is None
+        assert verify_set_password_token('garbage') is None
+
+
+def test_import_with_many_passwords_runs_as_job(app_instance, client):
+    from app.models import Job
+
+    app_instance.config.update(JOB_WORKERS=0, USER_IMPORT_INLINE_PASSWORDS=5)
+    rows = [f'job{i},job{i}@st.ug.edu.gh,student,secret{i:03d}' for i in range(20)]
+    r = _import(client, '\n'.join(rows) + '\n')
+    assert r.status_code == 302 and '/admin/jobs/' in r.headers['Location']
+    with app_instance.app_context():
+        job = Job.query.one()
+        assert job.kind == 'user_import' and job.status == 'done', job.error
+        assert User.query.filter(User.username.like('job%')).count() == 20
+        assert check_password_hash(User.query.filter_by(username='job3').one().password, 'secret003')
+    assert b'Created' in client.get(r.headers['Location']).data
@@ -0,0 +1,118 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Department, Course, Section, ClassSession, AttendanceRecord
+from app.attendance import writebehind
+from app.attendance.writebehind import get_mark_batcher
+from app.metrics import get_metrics
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_instance(tmp_path):
+    os.environ['TESTING'] = '1'
+    db_file = tmp_path / "test_write_behind.db"
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file}"
+    app = create_app()
+    app.config.update(ATTENDANCE_WRITE_BEHIND=True,
+                      ATTENDANCE_WRITE_BEHIND_MAX_BATCH=50,
+                      ATTENDANCE_WRITE_BEHIND_MAX_DELAY_MS=50)
+    writebehind.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+def _create_session_and_students(app, n):
+    with app.app_context():
+        pw = generate_password_hash('pass123')
+        lecturer = User(username='lect_wb', email='lect_wb@staff.ug.edu.gh', password=pw, role='lecturer', is_approved=True)
+        dept = Department(name='Economics')
+        db.session.add_all([lecturer, dept])
+        db.session.commit()
+        course = Course(code='ECON101', title='Microeconomics', department_id=dept.id)
+        db.session.add(course)
+        db.session.commit()
+        section = Section(course_id=course.id, section_code='E', instructor_id=lecturer.id)
+        db.session.add(section)
+        db.session.commit()
+        students = [User(username=f'stud_wb{i}', email=f'stud_wb{i}@st.ug.edu.gh', password=pw,
+                         role='student', is_approved=True) for i in range(n)]
+        db.session.add_all(students)
+        sess = ClassSession(section_id=section.id,
+                            scheduled_start=datetime.utcnow(),
+                            scheduled_end=datetime.utcnow() + timedelta(hours=1),
+                            status='open')
+        db.session.add(sess)
+        db.session.commit()
+        return sess.id, [s.id for s in students]
+
+
+def test_concurrent_marks_are_flushed_in_batches(app_instance):
+    session_id, student_ids = _create_session_and_students(app_instance, 20)
+    results = {}
+
+    def mark(student_id):
+        with app_instance.app_context():
+            results[student_id] = get_mark_batcher().submit(session_id, student_id)
+
+    # All students submit at once; the flusher should coalesce them into a few batches
+    threads = [threading.Thread(target=mark, args=(sid,)) for sid in student_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(results[sid] is True for sid in student_ids)
+
+    with app_instance.app_context():
+        assert get_mark_batcher().submit(session_id, student_ids[0]) is False
+        assert AttendanceRecord.query.filter_by(class_session_id=session_id).count() == 20
+        stats = get_metrics().snapshot()
+        batches = stats['timings']['write_behind.batch_size']
+        assert batches['total'] == 21
+        assert batches['count'] < 21
+
+
+def test_timed_out_marks_are_abandoned_not_flushed(app_instance, monkeypatch):
+    from app.models import SessionAttendanceSummary
+
+    session_id, student_ids = _create_session_and_students(app_instance, 2)
+    release = threading.Event()
+    flushed = []
+    real_batch = writebehind.insert_attendance_batch
+
+    def slow_batch(pairs):
+        pairs = list(pairs)
+        flushed.append(pairs)
+        release.wait(5)
+        return real_batch(pairs)
+
+    monkeypatch.setattr(writebehind, 'insert_attendance_batch', slow_batch)
+    batcher = writebehind.MarkBatcher(app_instance, max_batch=1, max_delay_ms=0, queue_size=10, timeout_seconds=0.1)
+
+    def submit_first():
+        with app_instance.app_context():
+            batcher.submit(session_id, student_ids[0])
+
+    with app_instance.app_context():
+        # The first mark is claimed by a flush that stalls; the second times out while still queued
+        first = threading.Thread(target=submit_first)
+        first.start()
+        for _ in range(100):
+            if flushed:
+                break
+            threading.Event().wait(0.01)
+        assert batcher.submit(session_id, student_ids[1]) is None
+        release.set()
+        first.join()
+        # Give the flusher time to reach (and skip) the abandoned mark
+        threading.Event().wait(0.2)
+        assert flushed == [[(session_id, student_ids[0])]]
+        assert AttendanceRecord.query.filter_by(class_session_id=session_id).count() == 1
+        assert db.session.get(SessionAttendanceSummary, session_id).present_count == 1